@@ -0,0 +1,246 @@
+"""Бенчмарк всех публичных методов Movies, Ratings.Movies, Ratings.Users, Tags и Links
+на синтетических данных в формате MovieLens.
+
+Генератор создает movies.csv, ratings.csv, tags.csv и links.csv заданного размера:
+популярность фильмов и активность пользователей распределены по закону Ципфа,
+у фильмов от 1 до 4 жанров, часть названий содержит запятую и поэтому записана в кавычках.
+Рейтинги упорядочены по userId, затем по movieId, как в настоящем датасете.
+Links работает с заглушкой вместо запросов к IMDb.
+
+Пример запуска:
+    python benchmark.py --sizes 10000 1000000 25000000 --output bench_results.json
+"""
+import argparse
+import bisect
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from movielens_analysis import Links, Movies, Ratings, Tags
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama", "Fantasy",
+    "Film-Noir", "Horror", "IMAX", "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western",
+]
+GENRE_WEIGHTS = [18, 12, 6, 6, 39, 13, 5, 44, 8, 1, 10, 2, 3, 6, 16, 10, 19, 4, 2]
+IMPORT_BUDGET = {"seconds": 0.25, "rss_kb": 10 * 1024}
+RATING_VALUES = [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0]
+RATING_WEIGHTS = [1.4, 2.8, 1.8, 7.5, 5.5, 19.9, 13.0, 26.6, 8.5, 13.2]
+WORDS = [
+    "love", "night", "last", "dark", "city", "man", "woman", "story", "house", "war", "dead", "life",
+    "blue", "king", "summer", "secret", "road", "star", "girl", "boy", "game", "time", "world", "river",
+]
+TAGS = [
+    "funny", "atmospheric", "classic", "dark comedy", "based on a book", "twist ending", "sci-fi",
+    "thought-provoking", "visually appealing", "Highly quotable", "great soundtrack", "slow",
+    "social commentary", "comedy", "romantic comedy", "not funny", "black comedy", "overrated",
+]
+FIRST_TIMESTAMP = int(datetime.datetime(1996, 1, 1, tzinfo=datetime.timezone.utc).timestamp())
+LAST_TIMESTAMP = int(datetime.datetime(2018, 9, 1, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def zipf_cum_weights(size, exponent=1.0):
+    """Накопленные веса распределения Ципфа для рангов 1..size"""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def generate_dataset(directory, num_ratings, seed=0):
+    """Создает в directory четыре файла датасета примерно с num_ratings оценками.
+    Число фильмов и пользователей растет вместе с числом оценок примерно как в ml-latest-small и ML-25M"""
+    generator = random.Random(seed)
+    num_movies = max(200, int(2 * num_ratings ** 0.6))
+    num_users = max(20, num_ratings // 150)
+    os.makedirs(directory, exist_ok=True)
+
+    movie_ids = sorted(generator.sample(range(1, num_movies * 4), num_movies))
+    popularity = movie_ids[:]
+    generator.shuffle(popularity)
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8") as file:
+        file.write("movieId,title,genres\n")
+        for movie_id in movie_ids:
+            words = " ".join(generator.choice(WORDS) for _ in range(generator.randint(1, 4))).title()
+            title = f"{words} ({generator.randint(1902, 2018)})"
+            if generator.random() < 0.2:
+                title = f"\"{words}, The ({generator.randint(1902, 2018)})\""
+            genres = set(generator.choices(GENRES, weights=GENRE_WEIGHTS, k=generator.randint(1, 4)))
+            file.write(f"{movie_id},{title},{'|'.join(sorted(genres))}\n")
+
+    with open(os.path.join(directory, "links.csv"), "w", encoding="utf-8") as file:
+        file.write("movieId,imdbId,tmdbId\n")
+        for movie_id in movie_ids:
+            file.write(f"{movie_id},{generator.randint(1, 9999999):07d},{generator.randint(1, 999999)}\n")
+
+    # активность пользователей по Ципфу, в сумме num_ratings оценок
+    user_cum_weights = zipf_cum_weights(num_users, 0.8)
+    activity = [0] * num_users
+    for user in generator.choices(range(num_users), cum_weights=user_cum_weights, k=num_ratings):
+        activity[user] += 1
+    generator.shuffle(activity)
+    movie_cum_weights = zipf_cum_weights(num_movies)
+
+    with open(os.path.join(directory, "ratings.csv"), "w", encoding="utf-8") as ratings_file, \
+            open(os.path.join(directory, "tags.csv"), "w", encoding="utf-8") as tags_file:
+        ratings_file.write("userId,movieId,rating,timestamp\n")
+        tags_file.write("userId,movieId,tag,timestamp\n")
+        for user_id, count in enumerate(activity, start=1):
+            count = min(count, num_movies)
+            if count == 0:
+                continue
+            seen = set()
+            while len(seen) < count:
+                index = bisect.bisect_left(movie_cum_weights, generator.random() * movie_cum_weights[-1])
+                seen.add(popularity[min(index, num_movies - 1)])
+            start = generator.randint(FIRST_TIMESTAMP, LAST_TIMESTAMP)
+            scores = generator.choices(RATING_VALUES, weights=RATING_WEIGHTS, k=count)
+            lines = []
+            for movie_id, score in zip(sorted(seen), scores):
+                timestamp = generator.randint(start, LAST_TIMESTAMP)
+                lines.append(f"{user_id},{movie_id},{score},{timestamp}\n")
+                if generator.random() < 0.03:
+                    tags_file.write(f"{user_id},{movie_id},{generator.choice(TAGS)},{timestamp}\n")
+            ratings_file.writelines(lines)
+
+
+class StubLinks(Links):
+    """Links с заглушкой вместо загрузки страницы IMDb: данные фильма генерируются по imdbId"""
+
+    def parse_imdb(self, movie):
+        generator = random.Random(movie[1])
+        budget = generator.randint(1, 200) * 1000000
+        return [
+            movie[1],
+            f"Movie {movie[1]}",
+            f"Director {generator.randint(1, 50)}",
+            budget,
+            int(budget * generator.uniform(0.2, 5)),
+            generator.randint(70, 200),
+        ]
+
+
+def time_call(function, repeat):
+    """Вызывает function repeat раз и возвращает минимальное время вызова в секундах"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def import_cold_start(repeat):
+    """Замеряет холодный импорт movielens_analysis в новом процессе.
+    Возвращает минимальные по repeat запускам время импорта и прирост пикового RSS в КБ и бюджет IMPORT_BUDGET"""
+    code = (
+        "import json, resource, time\n"
+        "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "start = time.perf_counter()\n"
+        "import movielens_analysis\n"
+        "seconds = time.perf_counter() - start\n"
+        "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss\n"
+        "print(json.dumps({'seconds': seconds, 'rss_kb': rss}))\n"
+    )
+    directory = os.path.dirname(os.path.abspath(__file__))
+    runs = [
+        json.loads(subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True).stdout)
+        for _ in range(repeat)
+    ]
+    return {
+        "seconds": round(min(run["seconds"] for run in runs), 6),
+        "rss_kb": min(run["rss_kb"] for run in runs),
+        "budget": IMPORT_BUDGET,
+    }
+
+
+def cases(directory):
+    """Возвращает список троек (класс, метод, функция без аргументов) для всех публичных методов"""
+    movies = Movies(os.path.join(directory, "movies.csv"))
+    ratings = Ratings(os.path.join(directory, "ratings.csv"))
+    users = ratings.Users(ratings)
+    tags = Tags(os.path.join(directory, "tags.csv"))
+    links = StubLinks(os.path.join(directory, "links.csv"))
+    user_id = ratings.ratings[0]["userId"]
+    movie_id = ratings.ratings[-1]["movieId"]
+
+    return [
+        ("Movies", "__init__", lambda: Movies(os.path.join(directory, "movies.csv"))),
+        ("Movies", "dist_by_release", movies.dist_by_release),
+        ("Movies", "dist_by_genres", movies.dist_by_genres),
+        ("Movies", "most_genres", lambda: movies.most_genres(10)),
+        ("Movies", "most_genres_by_years", movies.most_genres_by_years),
+        ("Ratings", "__init__", lambda: Ratings(os.path.join(directory, "ratings.csv"))),
+        ("Ratings.Movies", "dist_by_year", ratings.inner_movies.dist_by_year),
+        ("Ratings.Movies", "dist_by_rating", ratings.inner_movies.dist_by_rating),
+        ("Ratings.Movies", "top_by_num_of_ratings", lambda: ratings.inner_movies.top_by_num_of_ratings(10)),
+        ("Ratings.Movies", "top_by_ratings[average]", lambda: ratings.inner_movies.top_by_ratings(10)),
+        ("Ratings.Movies", "top_by_ratings[mean]", lambda: ratings.inner_movies.top_by_ratings(10, "mean")),
+        ("Ratings.Movies", "top_controversial", lambda: ratings.inner_movies.top_controversial(10)),
+        ("Ratings.Users", "dist_users_by_num_of_ratings", users.dist_users_by_num_of_ratings),
+        ("Ratings.Users", "dist_users_by_rating[average]", users.dist_users_by_rating),
+        ("Ratings.Users", "dist_users_by_rating[mean]", lambda: users.dist_users_by_rating("mean")),
+        ("Ratings.Users", "top_controversial_users", lambda: users.top_controversial_users(10)),
+        ("Ratings.Users", "build_user_index", users.build_user_index),
+        ("Ratings.Users", "similar_users", lambda: users.similar_users(user_id, 10)),
+        ("Ratings.Users", "predict_rating", lambda: users.predict_rating(user_id, movie_id)),
+        ("Tags", "__init__", lambda: Tags(os.path.join(directory, "tags.csv"))),
+        ("Tags", "most_words", lambda: tags.most_words(10)),
+        ("Tags", "longest", lambda: tags.longest(10)),
+        ("Tags", "most_words_and_longest", lambda: tags.most_words_and_longest(10)),
+        ("Tags", "most_popular", lambda: tags.most_popular(10)),
+        ("Tags", "tags_with", lambda: tags.tags_with("comedy")),
+        ("Links", "__init__", lambda: StubLinks(os.path.join(directory, "links.csv"))),
+        ("Links", "get_imdb", links.get_imdb),
+        ("Links", "top_directors", lambda: links.top_directors(10)),
+        ("Links", "most_expensive", lambda: links.most_expensive(10)),
+        ("Links", "most_profitable", lambda: links.most_profitable(10)),
+        ("Links", "longest", lambda: links.longest(10)),
+        ("Links", "top_cost_per_minute", lambda: links.top_cost_per_minute(10)),
+    ]
+
+
+def run(data_dir, sizes, repeat, seed):
+    """Генерирует (или переиспользует) датасеты нужных размеров и замеряет все методы.
+    Возвращает словарь с описанием окружения и списком результатов"""
+    cold_start = import_cold_start(repeat)
+    over = [name for name, limit in IMPORT_BUDGET.items() if cold_start[name] >= limit]
+    print(f"import movielens_analysis {cold_start['seconds']:.6f} s, {cold_start['rss_kb']} KB" + (f" (over budget: {', '.join(over)})" if over else ""))
+    results = []
+    for size in sizes:
+        directory = os.path.join(data_dir, f"ratings_{size}")
+        if not os.path.exists(os.path.join(directory, "ratings.csv")):
+            start = time.perf_counter()
+            generate_dataset(directory, size, seed)
+            print(f"generated {directory} in {time.perf_counter() - start:.1f} s")
+        for class_name, method, function in cases(directory):
+            seconds = time_call(function, repeat)
+            results.append({"size": size, "class": class_name, "method": method, "seconds": round(seconds, 6)})
+            print(f"{size:>10} {class_name:>15} {method:<32} {seconds:.6f}")
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "import": cold_start,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000, 25000000])
+    parser.add_argument("--data-dir", default="./bench_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    report = run(args.data_dir, args.sizes, args.repeat, args.seed)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"saved {args.output}")
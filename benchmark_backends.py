@@ -0,0 +1,87 @@
+"""Сравнение движков вычислений (Backend) для методов Ratings.Movies и Ratings.Users на разных размерах данных.
+
+Для каждого размера берутся первые size строк ratings.csv, и одни и те же методы вызываются
+с каждым доступным движком. Эталонные циклы ("python") сложностью фильмы × оценки
+замеряются только до --reference-limit строк. Движки, для которых не установлены пакеты, пропускаются.
+
+Пример запуска:
+    python benchmark_backends.py --ratings ./bench_data/ratings_1000000/ratings.csv --sizes 1000 100000 1000000
+"""
+import argparse
+import itertools
+import json
+import time
+
+from movielens_analysis import Backend, Ratings
+
+METHODS = [
+    ("Ratings.Movies", "dist_by_year", lambda ratings: ratings.inner_movies.dist_by_year()),
+    ("Ratings.Movies", "dist_by_rating", lambda ratings: ratings.inner_movies.dist_by_rating()),
+    ("Ratings.Movies", "top_by_num_of_ratings", lambda ratings: ratings.inner_movies.top_by_num_of_ratings(10)),
+    ("Ratings.Movies", "top_by_ratings", lambda ratings: ratings.inner_movies.top_by_ratings(10)),
+    ("Ratings.Movies", "top_controversial", lambda ratings: ratings.inner_movies.top_controversial(10)),
+    ("Ratings.Users", "dist_users_by_num_of_ratings", lambda ratings: ratings.Users(ratings).dist_users_by_num_of_ratings()),
+    ("Ratings.Users", "dist_users_by_rating", lambda ratings: ratings.Users(ratings).dist_users_by_rating()),
+    ("Ratings.Users", "top_controversial_users", lambda ratings: ratings.Users(ratings).top_controversial_users(10)),
+]
+
+
+def available_backends(names):
+    """Возвращает имена движков из names, которые можно создать в текущем окружении"""
+    available = []
+    for name in names:
+        try:
+            Backend.create(name)
+        except Exception as e:
+            print(f"skip {name}: {e}")
+            continue
+        available.append(name)
+    return available
+
+
+def run(ratings_path, sizes, backends, reference_limit):
+    """Замеряет время каждого метода для каждого размера и движка.
+    Первый вызов движка включает перевод строк в столбцы, поэтому он замеряется отдельно (first_seconds),
+    а seconds - повторный вызов на тех же данных. Возвращает список словарей с результатами"""
+    rows = list(itertools.islice(Ratings(ratings_path).iter_ratings(), max(sizes)))
+    results = []
+    for size in sizes:
+        for backend in backends:
+            if backend == "python" and size > reference_limit:
+                continue
+            ratings = Ratings(ratings_path, backend=backend)
+            ratings.ratings = rows[:size]
+            for class_name, method, function in METHODS:
+                start = time.perf_counter()
+                function(ratings)
+                first = time.perf_counter() - start
+                start = time.perf_counter()
+                function(ratings)
+                seconds = time.perf_counter() - start
+                results.append({
+                    "size": size,
+                    "backend": backend,
+                    "class": class_name,
+                    "method": method,
+                    "first_seconds": round(first, 6),
+                    "seconds": round(seconds, 6),
+                })
+                print(f"{size:>10} {backend:>9} {class_name:>15} {method:<30} {first:>10.4f} {seconds:>10.4f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", default="./ml_latest_small/ratings.csv")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=list(Backend.NAMES), choices=Backend.NAMES)
+    parser.add_argument("--reference-limit", type=int, default=10000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'backend':>9} {'class':>15} {'method':<30} {'first, s':>10} {'repeat, s':>10}")
+    results = run(args.ratings, args.sizes, available_backends(args.backends), args.reference_limit)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"saved {args.output}")
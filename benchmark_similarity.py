@@ -0,0 +1,51 @@
+"""Замер времени построения таблицы соседей ItemSimilarity в зависимости от размера датасета.
+
+Пример запуска:
+    python benchmark_similarity.py --sizes 10000 50000 100000 --metric cosine --workers 4
+"""
+import argparse
+import itertools
+import time
+
+from movielens_analysis import ItemSimilarity, RatingMatrix, Ratings
+
+
+def run(ratings_path, sizes, metric, k, workers):
+    """Для каждого размера берет первые size строк ratings.csv, строит RatingMatrix и ItemSimilarity.
+    Возвращает список словарей с размерами данных и временем каждого этапа в секундах"""
+    ratings = Ratings(ratings_path)
+    results = []
+    for size in sizes:
+        rows = list(itertools.islice(ratings.iter_ratings(), size))
+
+        start = time.perf_counter()
+        matrix = RatingMatrix(rows)
+        matrix_time = time.perf_counter() - start
+
+        similarity = ItemSimilarity(matrix, metric=metric, k=k)
+        start = time.perf_counter()
+        similarity.build(workers=workers)
+        build_time = time.perf_counter() - start
+
+        results.append({
+            "ratings": len(rows),
+            "users": matrix.shape[0],
+            "movies": matrix.shape[1],
+            "matrix_seconds": round(matrix_time, 3),
+            "build_seconds": round(build_time, 3),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", default="./ml_latest_small/ratings.csv")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 25000, 50000, 100000])
+    parser.add_argument("--metric", default="cosine", choices=ItemSimilarity.METRICS)
+    parser.add_argument("-k", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'ratings':>10} {'users':>8} {'movies':>8} {'matrix, s':>10} {'build, s':>10}")
+    for row in run(args.ratings, args.sizes, args.metric, args.k, args.workers):
+        print(f"{row['ratings']:>10} {row['users']:>8} {row['movies']:>8} {row['matrix_seconds']:>10} {row['build_seconds']:>10}")
@@ -0,0 +1,144 @@
+"""Нагрузочный тест QueryService: параллельные клиенты с keep-alive соединениями
+шлют смесь запросов и замеряют задержку каждого ответа. В конце печатаются p50, p90, p99,
+максимум, пропускная способность и счетчики сервиса (попадания в кэш, coalescing).
+
+Пример запуска (сервис поднимается в отдельном процессе на свободном порту):
+    python load_generator.py --serve ./ml_latest_small --concurrency 32 --requests 5000
+Против уже запущенного сервиса:
+    python load_generator.py --port 8000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+from movielens_analysis import MovieLensDataset, QueryService
+
+QUERIES = [
+    "/movies/dist_by_genres",
+    "/movies/dist_by_release",
+    "/movies/most_genres_by_years",
+    "/ratings/dist_by_rating",
+    "/ratings/top_by_num_of_ratings?n=10",
+    "/ratings/top_by_ratings?n=10",
+    "/ratings/top_by_ratings?n=10&metric=mean",
+    "/ratings/top_controversial?n=10",
+    "/users/dist_users_by_rating",
+    "/users/top_controversial_users?n=10",
+    "/tags/most_popular?n=10",
+    "/tags/tags_with?word=comedy",
+    "/tags/tags_with?word=funny",
+]
+
+
+def serve(directory, port, cache_size, backend):
+    """Точка входа процесса с сервисом"""
+    QueryService(MovieLensDataset(directory, backend), port=port, cache_size=cache_size).run()
+
+
+def free_port():
+    """Возвращает свободный порт на localhost"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def get(reader, writer, target):
+    """Отправляет GET по открытому соединению и возвращает (код ответа, тело)"""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(port, targets, latencies, errors):
+    """Один клиент: по очереди выполняет запросы из targets по одному соединению"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for target in targets:
+            start = time.perf_counter()
+            status, _ = await get(reader, writer, target)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(target)
+    finally:
+        writer.close()
+
+
+async def wait_ready(port, timeout=120):
+    """Ждет, пока сервис начнет отвечать на /health"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await get(reader, writer, "/health")
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def percentile(values, share):
+    """Перцентиль share (0..1) по отсортированному списку"""
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+async def run(port, concurrency, requests):
+    """Запускает concurrency клиентов на requests запросов в сумме. Возвращает словарь с результатами"""
+    await wait_ready(port)
+    latencies, errors = [], []
+    targets = [QUERIES[index % len(QUERIES)] for index in range(requests)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, targets[index::concurrency], latencies, errors) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    stats = json.loads((await get(reader, writer, "/stats"))[1])
+    writer.close()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 0.9) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "service": stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", metavar="DIRECTORY", help="поднять сервис над датасетом в отдельном процессе")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--backend", default="python")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    process = None
+    if args.serve:
+        args.port = free_port()
+        process = multiprocessing.Process(target=serve, args=(args.serve, args.port, args.cache_size, args.backend), daemon=True)
+        process.start()
+    try:
+        print(json.dumps(asyncio.run(run(args.port, args.concurrency, args.requests)), indent=2))
+    finally:
+        if process is not None:
+            process.terminate()
@@ -1,10 +1,1059 @@
-import requests
+import array
+import bisect
+import builtins
 import collections
 import datetime
+import functools
+import heapq
+import io
+import itertools
+import json
+import math
+import operator
+import os
+import random
 import re
-from bs4 import BeautifulSoup
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+import zlib
 from collections import Counter
-import pytest
+
+class Profiler:
+    """Необязательная инструментация методов Movies, Ratings (и вложенных классов), Tags и Links.
+
+    Profiler.enable() оборачивает все методы этих классов, Profiler.disable() возвращает исходные,
+    поэтому в выключенном состоянии инструментация ничего не стоит.
+    Для каждого метода собираются число вызовов, время (вместе с вложенными вызовами),
+    число обработанных строк, строк в секунду и пиковый объем выделенной памяти (при memory=True, через tracemalloc).
+    Время также раскладывается по этапам: load, parse, aggregate, sort, fetch -
+    для этапа считается только собственное время методов без вложенных, поэтому сумма этапов не дублируется.
+    Этап sort - это все сортировки внутри модуля: они идут через Profiler.sorted,
+    который без инструментации сразу вызывает встроенный sorted.
+    Стек вызовов свой у каждого потока (threading.local), поэтому вызовы из потоков QueryService
+    и LinksCrawler не перемешиваются, а общие счетчики обновляются под блокировкой.
+    Кэши сообщают о попаданиях и промахах через Profiler.count_cache.
+    Результат можно получить словарем (report), таблицей (table) или в JSON (to_json)."""
+    STAGES = {
+        "__init__": "load",
+        "get_first_1000_values": "load",
+        "iter_ratings": "load",
+        "find_movies_filepath": "load",
+        "get": "load",
+        "get_movies": "load",
+        "get_ratings": "load",
+        "get_tags": "load",
+        "get_links": "load",
+        "read_file": "load",
+        "is_movies_structure": "load",
+        "is_ratings_structure": "load",
+        "is_tags_structure": "load",
+        "is_links_structure": "load",
+        "parse_movie_string": "parse",
+        "parse_budget": "parse",
+        "_get_field": "parse",
+        "get_imdb": "fetch",
+        "parse_imdb": "fetch",
+    }
+    enabled = False
+    memory = False
+    started_tracemalloc = False
+    patched = []
+    local = threading.local()
+    lock = threading.Lock()
+    methods = {}
+    stages = {}
+    caches = {}
+
+    @classmethod
+    def enable(cls, memory=False, classes=None):
+        """Включает инструментацию. memory=True дополнительно замеряет пиковую память через tracemalloc.
+        classes - список классов для инструментации, по умолчанию все классы анализа модуля"""
+        if cls.enabled:
+            return
+        if classes is None:
+            classes = [Movies, Ratings, Ratings.Movies, Ratings.Users, Ratings.Sketches, Ratings.Trends, Tags, Links, MovieLensDataset]
+        for owner in classes:
+            for name, attribute in list(vars(owner).items()):
+                if name.startswith("__") and name != "__init__":
+                    continue
+                if isinstance(attribute, staticmethod):
+                    wrapped = staticmethod(cls.wrap(owner, name, attribute.__func__))
+                elif isinstance(attribute, types.FunctionType):
+                    wrapped = cls.wrap(owner, name, attribute)
+                else:
+                    continue
+                cls.patched.append((owner, name, attribute))
+                setattr(owner, name, wrapped)
+
+        cls.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            cls.started_tracemalloc = True
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls):
+        """Выключает инструментацию и возвращает исходные методы. Собранные данные сохраняются"""
+        for owner, name, attribute in reversed(cls.patched):
+            setattr(owner, name, attribute)
+        cls.patched = []
+        if cls.started_tracemalloc:
+            tracemalloc.stop()
+            cls.started_tracemalloc = False
+        cls.enabled = False
+
+    @classmethod
+    def reset(cls):
+        """Очищает собранные данные"""
+        cls.methods = {}
+        cls.stages = {}
+        cls.caches = {}
+
+    @classmethod
+    def wrap(cls, owner, name, function):
+        """Возвращает обертку над методом function класса owner, которая записывает вызов"""
+        key = f"{owner.__qualname__}.{name}"
+        stage = cls.STAGES.get(name, "aggregate")
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return cls.call(key, stage, function, args, kwargs)
+
+        return wrapper
+
+    @classmethod
+    def sorted(cls, iterable, key=None, reverse=False):
+        """sorted для кода модуля: при включенной инструментации время сортировки идет в этап sort"""
+        if not cls.enabled:
+            return builtins.sorted(iterable, key=key, reverse=reverse)
+        return cls.call(None, "sort", builtins.sorted, (iterable,), {"key": key, "reverse": reverse})
+
+    @classmethod
+    def stack(cls):
+        """Возвращает стек вызовов текущего потока"""
+        stack = getattr(cls.local, "stack", None)
+        if stack is None:
+            stack = cls.local.stack = []
+        return stack
+
+    @classmethod
+    def call(cls, key, stage, function, args, kwargs):
+        """Вызывает function и записывает время, число строк и память.
+        Время вложенных вызовов вычитается из собственного времени вызывающего этапа"""
+        frame = {"children": 0.0, "peak": 0, "current": 0}
+        stack = cls.stack()
+        if cls.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            frame["current"] = current
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            peak = 0
+            if cls.memory:
+                frame["peak"] = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                peak = frame["peak"] - frame["current"]
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], frame["peak"])
+            if stack:
+                stack[-1]["children"] += elapsed
+
+            rows = cls.rows_of(args[0] if args else None, result, stage)
+            cls.record(key, stage, elapsed, elapsed - frame["children"], rows, peak)
+
+    @classmethod
+    def record(cls, key, stage, elapsed, own, rows, peak):
+        """Добавляет вызов в счетчики метода key и этапа stage. Счетчики общие для всех потоков"""
+        with cls.lock:
+            if key is not None:
+                record = cls.methods.setdefault(key, {"stage": stage, "calls": 0, "seconds": 0.0, "rows": 0, "peak_memory": 0})
+                record["calls"] += 1
+                record["seconds"] += elapsed
+                record["rows"] += rows
+                record["peak_memory"] = max(record["peak_memory"], peak)
+            record = cls.stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "rows": 0})
+            record["calls"] += 1
+            record["seconds"] += own
+            record["rows"] += rows
+
+    @staticmethod
+    def rows_of(instance, result, stage):
+        """Оценивает число обработанных строк: одна строка на вызов парсера,
+        длина результата для загрузки и сортировки (конструкторы - по загруженным данным),
+        иначе длина данных экземпляра (или родительского Ratings для вложенных классов)"""
+        if stage == "parse":
+            return 1
+        if stage in ("load", "sort") and result is not None:
+            return len(result) if isinstance(result, (list, RecordTable)) else 0
+        data = getattr(instance, "parent", instance)
+        for name in ("ratings", "tags", "imdb", "movie_list", "movies"):
+            value = getattr(data, name, None)
+            if isinstance(value, (list, RecordTable)):
+                return len(value)
+        return 0
+
+    @classmethod
+    def count_cache(cls, name, hit):
+        """Учитывает попадание (hit=True) или промах в кэш name"""
+        counter = cls.caches.setdefault(name, [0, 0])
+        counter[0 if hit else 1] += 1
+
+    @classmethod
+    def report(cls):
+        """Возвращает собранные данные словарем с ключами methods, stages и caches"""
+        def with_speed(record):
+            record = dict(record)
+            record["seconds"] = round(record["seconds"], 6)
+            record["rows_per_second"] = round(record["rows"] / record["seconds"]) if record["seconds"] > 0 else 0
+            return record
+
+        return {
+            "methods": {key: with_speed(record) for key, record in cls.methods.items()},
+            "stages": {stage: with_speed(record) for stage, record in cls.stages.items()},
+            "caches": {
+                name: {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4)}
+                for name, (hits, misses) in cls.caches.items()
+            },
+        }
+
+    @classmethod
+    def table(cls):
+        """Возвращает отчет в виде текстовой таблицы, методы отсортированы по убыванию времени"""
+        report = cls.report()
+        lines = [f"{'method':<45} {'stage':<9} {'calls':>7} {'seconds':>10} {'rows':>10} {'rows/s':>12} {'peak, B':>12}"]
+        for key, record in builtins.sorted(report["methods"].items(), key=lambda item: item[1]["seconds"], reverse=True):
+            lines.append(f"{key:<45} {record['stage']:<9} {record['calls']:>7} {record['seconds']:>10.4f} "
+                         f"{record['rows']:>10} {record['rows_per_second']:>12} {record['peak_memory']:>12}")
+        lines.append("")
+        lines.append(f"{'stage':<45} {'':<9} {'calls':>7} {'seconds':>10} {'rows':>10} {'rows/s':>12}")
+        for stage, record in report["stages"].items():
+            lines.append(f"{stage:<45} {'':<9} {record['calls']:>7} {record['seconds']:>10.4f} "
+                         f"{record['rows']:>10} {record['rows_per_second']:>12}")
+        if report["caches"]:
+            lines.append("")
+            lines.append(f"{'cache':<45} {'hits':>7} {'misses':>7} {'hit rate':>9}")
+            for name, record in report["caches"].items():
+                lines.append(f"{name:<45} {record['hits']:>7} {record['misses']:>7} {record['hit_rate']:>9}")
+        return "\n".join(lines)
+
+    @classmethod
+    def to_json(cls, path=None):
+        """Возвращает отчет строкой JSON, а если передан path - еще и записывает его в файл"""
+        text = json.dumps(cls.report(), indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+        return text
+
+class DataSource:
+    """Открытие файлов датасета без распаковки на диск.
+
+    Поддерживаются обычные файлы, gzip (.gz) и zstd (.zst, нужен Python 3.14+ или пакет zstandard),
+    а также файлы внутри zip-архива, в котором GroupLens распространяет MovieLens:
+    путь к ним записывается как путь к архиву плюс путь внутри него,
+    например ml-latest-small.zip/ml-latest-small/ratings.csv.
+    Сжатые данные распаковываются потоково блоками по CHUNK_SIZE байт."""
+    CHUNK_SIZE = 1024 * 1024
+    COMPRESSED_SUFFIXES = (".gz", ".zst")
+    # грубая оценка степени сжатия csv для gzip и zstd, когда распакованный размер неизвестен
+    COMPRESSION_RATIO = 4
+
+    @staticmethod
+    def split(path):
+        """Принимает путь. Если он ведет внутрь zip-архива, возвращает пару (путь к архиву, имя файла в архиве),
+        иначе - пару (path, None)"""
+        path = os.fspath(path)
+        parts = re.split(r"[\\/]", path)
+        for index in range(1, len(parts)):
+            archive = "/".join(parts[:index])
+            if archive.lower().endswith(".zip") and os.path.isfile(archive):
+                return archive, "/".join(parts[index:])
+        return path, None
+
+    @staticmethod
+    def compression(path):
+        """Возвращает вид сжатия файла: "zip", "gz", "zst" или None для обычного файла"""
+        archive, member = DataSource.split(path)
+        if member is not None:
+            return "zip"
+        for suffix in DataSource.COMPRESSED_SUFFIXES:
+            if archive.endswith(suffix):
+                return suffix[1:]
+        return None
+
+    @staticmethod
+    def is_compressed(path):
+        """Возвращает True, если файл читается через распаковку (смещения в нем не совпадают с байтами на диске)"""
+        return DataSource.compression(path) is not None
+
+    @staticmethod
+    def open(path, binary=False):
+        """Открывает файл датасета на чтение. Возвращает текстовый поток в utf-8 (или байтовый при binary=True)"""
+        kind = DataSource.compression(path)
+        if kind is None:
+            stream = builtins.open(path, "rb", buffering=DataSource.CHUNK_SIZE)
+        elif kind == "zip":
+            import zipfile
+
+            archive, member = DataSource.split(path)
+            with zipfile.ZipFile(archive) as zip_file:
+                # архив закрывается, а открытый файл в нем остается доступен до своего закрытия
+                stream = io.BufferedReader(zip_file.open(member), DataSource.CHUNK_SIZE)
+        elif kind == "gz":
+            import gzip
+
+            stream = io.BufferedReader(gzip.open(path, "rb"), DataSource.CHUNK_SIZE)
+        else:
+            try:
+                # в Python 3.14+ zstd есть в стандартной библиотеке
+                from compression import zstd
+
+                stream = io.BufferedReader(zstd.open(path, "rb"), DataSource.CHUNK_SIZE)
+            except ImportError:
+                try:
+                    import zstandard
+                except ImportError:
+                    raise Exception("Для чтения .zst файлов нужен Python 3.14+ или пакет zstandard")
+                reader = zstandard.ZstdDecompressor().stream_reader(builtins.open(path, "rb"), closefd=True)
+                stream = io.BufferedReader(reader, DataSource.CHUNK_SIZE)
+        if binary:
+            return stream
+        return io.TextIOWrapper(stream, encoding="utf-8")
+
+    @staticmethod
+    def exists(path):
+        """Возвращает True, если файл (в том числе внутри zip-архива) существует"""
+        archive, member = DataSource.split(path)
+        if member is None:
+            return os.path.isfile(archive)
+        import zipfile
+
+        with zipfile.ZipFile(archive) as zip_file:
+            return member in zip_file.namelist()
+
+    @staticmethod
+    def size(path):
+        """Возвращает размер данных файла в байтах после распаковки.
+        Для gzip и zstd распакованный размер заранее неизвестен и оценивается через COMPRESSION_RATIO"""
+        kind = DataSource.compression(path)
+        if kind == "zip":
+            import zipfile
+
+            archive, member = DataSource.split(path)
+            with zipfile.ZipFile(archive) as zip_file:
+                return zip_file.getinfo(member).file_size
+        size = os.path.getsize(path)
+        return size if kind is None else size * DataSource.COMPRESSION_RATIO
+
+    @staticmethod
+    def find(directory, name):
+        """Ищет файл name в директории или zip-архиве directory.
+        В директории проверяются также сжатые варианты name.gz и name.zst,
+        в архиве - файл name в любой вложенной папке (например ml-latest-small/name).
+        Возвращает путь для DataSource.open; если ничего не найдено - путь к name в directory"""
+        default = os.path.join(directory, name)
+        if os.path.isfile(directory):
+            import zipfile
+
+            with zipfile.ZipFile(directory) as zip_file:
+                members = [member for member in zip_file.namelist() if member.rsplit("/", 1)[-1] == name]
+            if members:
+                return directory + "/" + min(members, key=len)
+            return default
+        for suffix in ("",) + DataSource.COMPRESSED_SUFFIXES:
+            if os.path.isfile(default + suffix):
+                return default + suffix
+        return default
+
+class Backend:
+    """Движок вычислений для публичных методов Movies, Ratings.Movies, Ratings.Users и Tags.
+
+    Выбирается для каждого экземпляра параметром backend: "python" - исходные циклы по словарям (эталон),
+    "columnar" - этот класс, "numpy" - NumpyBackend, "pandas" - PandasBackend.
+    Методы движка повторяют публичные методы классов, но получают данные аргументом (списки movies, ratings, tags).
+    Вся работа со строками (годы из названий, жанры, теги) общая и написана на Python,
+    а тяжелые операции по оценкам сведены к трем ядрам, которые переопределяют движки:
+    column (столбец данных в формате движка), count (число вхождений) и histograms (гистограммы полузвезд),
+    а также years (год по timestamp в местном времени), lookup (выборка из плотного массива по индексу)
+    и combine (склейка двух целых столбцов в один ключ) для Ratings.Genres, sweep (сессии и когорты) для Ratings.Activity.
+    Статистики оценок считаются по гистограммам так же, как в Ratings.External."""
+    NAMES = ("python", "columnar", "numpy", "pandas")
+
+    @staticmethod
+    def create(name):
+        """Принимает имя движка. Возвращает экземпляр движка или None для эталонного "python" """
+        if name == "python":
+            return None
+        engines = {"columnar": Backend, "numpy": NumpyBackend, "pandas": PandasBackend}
+        if name not in engines:
+            raise Exception(f"Unknown backend {name}, expected one of {', '.join(Backend.NAMES)}")
+        return engines[name]()
+
+    def __init__(self):
+        self.columns = {}
+
+    def column(self, rows, field):
+        """Возвращает столбец field списка словарей rows в формате движка.
+        Столбцы кэшируются, пока список rows не изменился в размере. Для RecordTable берется готовый столбец"""
+        key = (id(rows), field)
+        cached = self.columns.get(key)
+        if cached is None or cached[0] is not rows or cached[1] != len(rows):
+            values = rows.column(field) if isinstance(rows, RecordTable) else [row[field] for row in rows]
+            cached = self.columns[key] = (rows, len(rows), self.make_column(values))
+        return cached[2]
+
+    def make_column(self, values):
+        """Переводит список значений в столбец движка"""
+        return values
+
+    def count(self, keys):
+        """Возвращает список пар (значение, число вхождений) в порядке первого появления значения"""
+        return list(Counter(keys).items())
+
+    def histograms(self, keys, ratings):
+        """Возвращает список пар (значение ключа, гистограмма из 10 счетчиков полузвезд) в порядке первого появления"""
+        histograms = {}
+        for key, rating in zip(keys, ratings):
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = [0] * 10
+            histogram[int(rating * 2) - 1] += 1
+        return list(histograms.items())
+
+    def years(self, timestamps):
+        """Возвращает столбец годов (в местном времени, как datetime.fromtimestamp) для столбца timestamps"""
+        return [datetime.datetime.fromtimestamp(timestamp).year for timestamp in timestamps]
+
+    def lookup(self, table, keys):
+        """Возвращает столбец table[key] для столбца целых keys (0 для ключей за пределами table)"""
+        size = len(table)
+        return [table[key] if 0 <= key < size else 0 for key in keys]
+
+    def combine(self, high, low, bits):
+        """Склеивает два столбца неотрицательных целых в один ключ high << bits | low"""
+        return [left << bits | right for left, right in zip(high, low)]
+
+    def sweep(self, user_ids, timestamps, gap):
+        """Сортирует оценки по (userId, timestamp) и одним проходом выделяет сессии (новая сессия -
+        новый пользователь или перерыв больше gap секунд), границы активности пользователей и когорты.
+        Возвращает словарь списков: по пользователям в порядке userId - users, first, last, ratings,
+        sessions, seconds (суммарная длительность сессий); sizes - пары (число оценок в сессии, число сессий)
+        по возрастанию размера; cohorts - пары ((год первой оценки, сдвиг в годах), число пользователей,
+        активных в этом году) по возрастанию"""
+        pairs = Profiler.sorted(zip(user_ids, timestamps))
+        years = self.years([timestamp for _, timestamp in pairs])
+        users, first, last, ratings, sessions, seconds = [], [], [], [], [], []
+        sizes, cohorts = Counter(), Counter()
+        previous_user = previous_time = previous_year = cohort = None
+        start = size = 0
+        for (user_id, timestamp), year in zip(pairs, years):
+            if user_id != previous_user or timestamp - previous_time > gap:
+                if previous_user is not None:
+                    sizes[size] += 1
+                    seconds[-1] += previous_time - start
+                start, size = timestamp, 0
+                if user_id != previous_user:
+                    users.append(user_id)
+                    first.append(timestamp)
+                    ratings.append(0)
+                    sessions.append(0)
+                    seconds.append(0)
+                    last.append(timestamp)
+                    cohort, previous_year = year, None
+                sessions[-1] += 1
+            if year != previous_year:
+                cohorts[(cohort, year - cohort)] += 1
+            size += 1
+            ratings[-1] += 1
+            last[-1] = timestamp
+            previous_user, previous_time, previous_year = user_id, timestamp, year
+        if previous_user is not None:
+            sizes[size] += 1
+            seconds[-1] += previous_time - start
+        return {
+            "users": users, "first": first, "last": last, "ratings": ratings, "sessions": sessions, "seconds": seconds,
+            "sizes": Profiler.sorted(sizes.items()), "cohorts": Profiler.sorted(cohorts.items()),
+        }
+
+    @staticmethod
+    def year_starts(first, last):
+        """Возвращает список timestamp начала каждого года местного времени от first до last+1 включительно"""
+        return [time.mktime((year, 1, 1, 0, 0, 0, 0, 1, -1)) for year in range(first, last + 2)]
+
+    @staticmethod
+    def top(values, n=None):
+        """Сортирует пары по убыванию значения (при равенстве сохраняется исходный порядок) и берет первые n"""
+        ordered = Profiler.sorted(values, key=lambda item: item[1], reverse=True)
+        return dict(ordered if n is None else ordered[:n])
+
+    def stats(self, ratings, field):
+        """Возвращает словарь: id (field - movieId или userId) -> (число оценок, среднее, медиана, дисперсия).
+        Дисперсия по гистограмме точная; если она лежит на границе округления, то, как в Ratings.Movies,
+        она пересчитывается суммированием с плавающей точкой по оценкам этого id в порядке списка"""
+        keys, scores = self.column(ratings, field), self.column(ratings, "rating")
+        stats, boundary = {}, set()
+        for key, histogram in self.histograms(keys, scores):
+            stats[key] = Ratings.External.summarize(histogram)
+            if Ratings.External.exact_variance(histogram, stats[key][0], stats[key][1])[1]:
+                boundary.add(key)
+        if boundary:
+            ordered = {}
+            for key, score in self.select(keys, scores, boundary):
+                ordered.setdefault(key, []).append(score)
+            for key, values in ordered.items():
+                stats[key] = stats[key][:3] + (self.ordered_variance(values, stats[key][1]),)
+        return stats
+
+    def select(self, keys, values, wanted):
+        """Возвращает список пар (ключ, значение) для ключей из множества wanted в исходном порядке"""
+        return [(key, value) for key, value in zip(keys, values) if key in wanted]
+
+    @staticmethod
+    def ordered_variance(values, average):
+        """Дисперсия, посчитанная так же, как в Ratings.Movies.calc_rating_variance: сумма квадратов по порядку"""
+        variance_sum = 0
+        for value in values:
+            variance_sum += (value - average) * (value - average)
+        return round(variance_sum / (len(values) - 1), 2)
+
+    @staticmethod
+    def check_metric(metric):
+        if metric not in ("average", "mean"):
+            raise Exception("Your should send parameter metric with the 'average' or 'mean' value")
+        return 1 if metric == "average" else 2
+
+    @staticmethod
+    def release_year(title):
+        match = re.search(r'\((\d{4})\)', title)
+        return int(match.group(1)) if match else None
+
+    # Movies
+
+    def dist_by_release(self, movies):
+        years = [year for year in (self.release_year(movie["title"]) for movie in movies) if year is not None]
+        return collections.OrderedDict(Profiler.sorted(self.count(years), key=lambda item: item[1], reverse=True))
+
+    def dist_by_genres(self, movies):
+        genres = [genre for movie in movies for genre in movie["genres"].split("|")]
+        return self.top(self.count(genres))
+
+    def most_genres(self, movies, n):
+        return self.top({movie["title"]: len(movie["genres"].split("|")) for movie in movies[:n]}.items())
+
+    def most_genres_by_years(self, movies):
+        pairs = [
+            (year, genre)
+            for year, movie in ((self.release_year(movie["title"]), movie) for movie in movies) if year is not None
+            for genre in movie["genres"].split("|")
+        ]
+        most_genres = {}
+        for (year, genre), count in Profiler.sorted(self.count(pairs), key=lambda item: item[1], reverse=True):
+            most_genres.setdefault(year, genre)
+        return dict(Profiler.sorted(most_genres.items()))
+
+    # Ratings.Movies
+
+    def dist_by_year(self, ratings):
+        return dict(Profiler.sorted(self.count(self.years(self.column(ratings, "timestamp")))))
+
+    def dist_by_rating(self, ratings):
+        return dict(Profiler.sorted(self.count(self.column(ratings, "rating"))))
+
+    def top_by_num_of_ratings(self, movies, ratings, n):
+        counts = dict(self.count(self.column(ratings, "movieId")))
+        return self.top({movie["title"]: counts.get(movie["movieId"], 0) for movie in movies}.items(), n)
+
+    def by_title(self, movies, ratings, position, n):
+        movie_stats = self.stats(ratings, "movieId")
+        values = {movie["title"]: movie_stats[movie["movieId"]][position] for movie in movies if movie["movieId"] in movie_stats}
+        return self.top(values.items(), n)
+
+    def top_by_ratings(self, movies, ratings, n, metric="average"):
+        return self.by_title(movies, ratings, self.check_metric(metric), n)
+
+    def top_controversial(self, movies, ratings, n):
+        return self.by_title(movies, ratings, 3, n)
+
+    # Ratings.Users
+
+    def dist_users_by_num_of_ratings(self, ratings):
+        return self.top(self.count(self.column(ratings, "userId")))
+
+    def dist_users_by_rating(self, ratings, metric="average"):
+        position = self.check_metric(metric)
+        return self.top((user_id, stats[position]) for user_id, stats in self.stats(ratings, "userId").items())
+
+    def top_controversial_users(self, ratings, n):
+        return self.top(((user_id, stats[3]) for user_id, stats in self.stats(ratings, "userId").items()), n)
+
+    # Tags. У эталона уникальные теги берутся через set, поэтому порядок равных значений там не определен,
+    # здесь равные значения идут в порядке первого появления тега
+
+    def most_words(self, tags, n):
+        return self.top(((tag, len(tag.split())) for tag, _ in self.count(tags)), n)
+
+    def longest(self, tags, n):
+        return Profiler.sorted((tag for tag, _ in self.count(tags)), key=len, reverse=True)[:n]
+
+    def most_words_and_longest(self, tags, n):
+        most_words = self.most_words(tags, n)
+        return [tag for tag in self.longest(tags, n) if tag in most_words]
+
+    def most_popular(self, tags, n):
+        return self.top(self.count(tags), n)
+
+    def tags_with(self, tags, word):
+        return Profiler.sorted({tag for tag in tags if word.lower() in tag.lower()})
+
+class NumpyBackend(Backend):
+    """Движок на NumPy: столбцы - массивы numpy, ядра - векторные операции.
+    NumPy - необязательная зависимость и импортируется только при создании движка"""
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import numpy
+        except ImportError:
+            raise Exception("Для backend='numpy' нужен пакет numpy")
+        self.numpy = numpy
+
+    def make_column(self, values):
+        return self.numpy.asarray(values)
+
+    def select(self, keys, values, wanted):
+        mask = self.numpy.isin(keys, list(wanted))
+        return list(zip(keys[mask].tolist(), values[mask].tolist()))
+
+    def first_seen(self, keys):
+        """Возвращает (уникальные значения в порядке первого появления, номер значения для каждого элемента)"""
+        numpy = self.numpy
+        unique, first, inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+        order = numpy.argsort(first, kind="stable")
+        rank = numpy.empty_like(order)
+        rank[order] = numpy.arange(len(order))
+        return unique[order], rank[inverse.reshape(-1)]
+
+    def count(self, keys):
+        if len(keys) == 0 or not isinstance(keys, self.numpy.ndarray) or keys.dtype == object:
+            return super().count(keys)
+        unique, codes = self.first_seen(keys)
+        return list(zip(unique.tolist(), self.numpy.bincount(codes, minlength=len(unique)).tolist()))
+
+    def histograms(self, keys, ratings):
+        numpy = self.numpy
+        if len(keys) == 0:
+            return []
+        unique, codes = self.first_seen(keys)
+        bins = codes * 10 + (numpy.asarray(ratings) * 2).astype(numpy.int64) - 1
+        counts = numpy.bincount(bins, minlength=10 * len(unique)).reshape(len(unique), 10)
+        return list(zip(unique.tolist(), counts.tolist()))
+
+    def years(self, timestamps):
+        numpy = self.numpy
+        if len(timestamps) == 0:
+            return timestamps
+        first = datetime.datetime.fromtimestamp(int(timestamps.min())).year
+        last = datetime.datetime.fromtimestamp(int(timestamps.max())).year
+        starts = numpy.asarray(self.year_starts(first, last))
+        return numpy.searchsorted(starts, timestamps, side="right") - 1 + first
+
+    def lookup(self, table, keys):
+        numpy = self.numpy
+        table = numpy.frombuffer(table, dtype=numpy.int64)
+        keys = numpy.asarray(keys, dtype=numpy.int64)
+        inside = (keys >= 0) & (keys < len(table))
+        return numpy.where(inside, table[numpy.where(inside, keys, 0)], 0)
+
+    def combine(self, high, low, bits):
+        return high << bits | low
+
+    def sweep(self, user_ids, timestamps, gap):
+        numpy = self.numpy
+        users = numpy.asarray(user_ids, dtype=numpy.int64)
+        times = numpy.asarray(timestamps, dtype=numpy.int64)
+        if len(users) == 0:
+            return super().sweep([], [], gap)
+        base, span = int(times.min()), int(times.max()) - int(times.min())
+        if span < 1 << 32 and int(users.min()) >= 0 and int(users.max()) < 1 << 31:
+            # userId и timestamp упаковываются в один int64, и сортируются сами ключи, а не перестановка:
+            # это на порядок быстрее lexsort по двум столбцам
+            keys = users << 32 | (times - base)
+            keys.sort()
+            users, times = keys >> 32, (keys & 0xFFFFFFFF) + base
+        else:
+            order = numpy.lexsort((times, users))
+            users, times = users[order], times[order]
+        count = len(users)
+        new_user = numpy.empty(count, dtype=bool)
+        new_user[0] = True
+        numpy.not_equal(users[1:], users[:-1], out=new_user[1:])
+        new_session = new_user.copy()
+        new_session[1:] |= numpy.diff(times) > gap
+
+        user_starts = numpy.flatnonzero(new_user)
+        user_ends = numpy.append(user_starts[1:], count)
+        user_index = numpy.cumsum(new_user) - 1
+        session_starts = numpy.flatnonzero(new_session)
+        session_ends = numpy.append(session_starts[1:], count)
+        session_user = user_index[session_starts]
+        durations = times[session_ends - 1] - times[session_starts]
+        sizes, size_counts = numpy.unique(session_ends - session_starts, return_counts=True)
+
+        years = self.years(times)
+        new_year = new_user.copy()
+        new_year[1:] |= years[1:] != years[:-1]
+        active = numpy.flatnonzero(new_year)
+        cohort = years[user_starts][user_index[active]]
+        keys, key_counts = numpy.unique(cohort * 1024 + (years[active] - cohort), return_counts=True)
+        return {
+            "users": users[user_starts].tolist(),
+            "first": times[user_starts].tolist(),
+            "last": times[user_ends - 1].tolist(),
+            "ratings": (user_ends - user_starts).tolist(),
+            "sessions": numpy.bincount(session_user, minlength=len(user_starts)).tolist(),
+            "seconds": numpy.bincount(session_user, weights=durations, minlength=len(user_starts)).astype(numpy.int64).tolist(),
+            "sizes": list(zip(sizes.tolist(), size_counts.tolist())),
+            "cohorts": [((key // 1024, key % 1024), amount) for key, amount in zip(keys.tolist(), key_counts.tolist())],
+        }
+
+class PandasBackend(Backend):
+    """Движок на pandas: столбцы - pandas.Series, ядра - группировки с сохранением порядка первого появления.
+    pandas - необязательная зависимость и импортируется только при создании движка"""
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import pandas
+        except ImportError:
+            raise Exception("Для backend='pandas' нужен пакет pandas")
+        self.pandas = pandas
+
+    def make_column(self, values):
+        return self.pandas.Series(values)
+
+    def select(self, keys, values, wanted):
+        if not isinstance(keys, self.pandas.Series):
+            return super().select(keys, values, wanted)
+        mask = keys.isin(wanted).to_numpy()
+        return list(zip(keys[mask].tolist(), values[mask].tolist()))
+
+    def count(self, keys):
+        if not isinstance(keys, self.pandas.Series) or len(keys) == 0:
+            return super().count(keys)
+        counts = keys.groupby(keys, sort=False).size()
+        return list(zip(counts.index.tolist(), counts.tolist()))
+
+    def histograms(self, keys, ratings):
+        pandas = self.pandas
+        if len(keys) == 0:
+            return []
+        frame = pandas.DataFrame({"key": keys.to_numpy(), "bin": (ratings.to_numpy() * 2).astype("int64")})
+        counts = frame.groupby(["key", "bin"], sort=False).size().unstack(fill_value=0)
+        counts = counts.reindex(index=pandas.unique(frame["key"]), columns=range(1, 11), fill_value=0)
+        return list(zip(counts.index.tolist(), counts.to_numpy().tolist()))
+
+    def years(self, timestamps):
+        if len(timestamps) == 0:
+            return timestamps
+        first = datetime.datetime.fromtimestamp(int(timestamps.min())).year
+        last = datetime.datetime.fromtimestamp(int(timestamps.max())).year
+        starts = self.year_starts(first, last)
+        return self.pandas.Series(self.pandas.Index(starts).searchsorted(timestamps.to_numpy(), side="right") - 1 + first)
+
+    def lookup(self, table, keys):
+        import numpy
+
+        table = numpy.frombuffer(table, dtype=numpy.int64)
+        keys = keys.to_numpy(dtype=numpy.int64)
+        inside = (keys >= 0) & (keys < len(table))
+        return self.pandas.Series(numpy.where(inside, table[numpy.where(inside, keys, 0)], 0))
+
+    def combine(self, high, low, bits):
+        return high * (1 << bits) + low
+
+    def sweep(self, user_ids, timestamps, gap):
+        # сортировка и проход по границам - операции над массивами, поэтому работа передается движку numpy
+        return NumpyBackend().sweep(user_ids.to_numpy(), timestamps.to_numpy(), gap)
+
+class Record:
+    """Легкая строка таблицы со слотами вместо словаря.
+
+    Поля хранятся в __slots__, поэтому у строки нет собственного __dict__ и она в несколько раз меньше словаря,
+    а обращение rating.rating - это чтение слота. Для совместимости с кодом, который работает со словарями,
+    поддерживаются rating["rating"], get, keys, values, items, in, len и сравнение со словарем.
+    Подклассы задают FIELDS (порядок полей) и TYPECODES (типы столбцов для RecordTable)"""
+    __slots__ = ()
+    FIELDS = ()
+    TYPECODES = ()
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def keys(self):
+        return list(self.FIELDS)
+
+    def values(self):
+        return [getattr(self, field) for field in self.FIELDS]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.FIELDS]
+
+    def to_dict(self):
+        """Возвращает строку в виде обычного словаря"""
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+class Movie(Record):
+    """Строка movies.csv (см. Record)"""
+    __slots__ = FIELDS = ("movieId", "title", "genres")
+    TYPECODES = ("q", None, None)
+
+    def __init__(self, movieId, title, genres):
+        self.movieId = movieId
+        self.title = title
+        self.genres = genres
+
+class Rating(Record):
+    """Строка ratings.csv (см. Record)"""
+    __slots__ = FIELDS = ("userId", "movieId", "rating", "timestamp")
+    TYPECODES = ("q", "q", "d", "q")
+
+    def __init__(self, userId, movieId, rating, timestamp):
+        self.userId = userId
+        self.movieId = movieId
+        self.rating = rating
+        self.timestamp = timestamp
+
+class Tag(Record):
+    """Строка tags.csv (см. Record)"""
+    __slots__ = FIELDS = ("userId", "movieId", "tag", "timestamp")
+    TYPECODES = ("q", "q", None, "q")
+
+    def __init__(self, userId, movieId, tag, timestamp):
+        self.userId = userId
+        self.movieId = movieId
+        self.tag = tag
+        self.timestamp = timestamp
+
+class RecordTable:
+    """Таблица строк одного типа Record, хранящаяся по столбцам.
+
+    Числовые столбцы - array.array (8 байт на значение), строковые - списки строк.
+    Строки Record создаются лениво при обращении по индексу или при итерации и нигде не хранятся,
+    поэтому таблицу можно передавать туда, где ожидается список словарей (self.movies, self.ratings):
+    len, индекс, срез и цикл for работают так же. Столбцы доступны напрямую через column(field),
+    их без копирования используют движки numpy (Backend.column) и Export; append после этого продолжает работать"""
+    def __init__(self, record, columns):
+        """Конструктор. Принимает класс строки и словарь столбцов в порядке record.FIELDS"""
+        self.record = record
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, record, rows):
+        """Собирает таблицу из итерируемого rows (словари или Record) за один проход,
+        не держа все строки в памяти одновременно"""
+        columns = {
+            field: array.array(typecode) if typecode else []
+            for field, typecode in zip(record.FIELDS, record.TYPECODES)
+        }
+        table = cls(record, columns)
+        for row in rows:
+            table.append(row)
+        return table
+
+    def append(self, row):
+        """Добавляет строку (словарь или Record) в конец таблицы.
+        Пока на столбец смотрит представление numpy или Arrow, array.array нельзя увеличить (BufferError):
+        тогда таблица один раз переходит на копию столбца, а старые представления остаются снимком прежних строк"""
+        for field, column in self.columns.items():
+            try:
+                column.append(row[field])
+            except BufferError:
+                column = self.columns[field] = array.array(column.typecode, column)
+                column.append(row[field])
+
+    def column(self, field):
+        """Возвращает столбец field (array.array или список) без копирования"""
+        return self.columns[field]
+
+    def __len__(self):
+        return len(self.columns[self.record.FIELDS[0]])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RecordTable(self.record, {field: column[index] for field, column in self.columns.items()})
+        return self.record(*(column[index] for column in self.columns.values()))
+
+    def __iter__(self):
+        return map(self.record, *self.columns.values())
+
+    def __eq__(self, other):
+        if isinstance(other, (RecordTable, list)):
+            return len(self) == len(other) and all(left == right for left, right in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"RecordTable({self.record.__name__}, {len(self)} rows)"
+
+class Export:
+    """Выгрузка таблиц и результатов методов в pandas.DataFrame или pyarrow.Table для ноутбука и других инструментов.
+
+    Числовые столбцы собираются один раз в типизированные буферы (array.array "q" или "d"),
+    а кадр только смотрит на эти буферы: numpy.frombuffer и DataFrame(copy=False) для pandas,
+    pyarrow.Array.from_buffers для Arrow, без второй копии и без объектов Python на каждое значение.
+    Если у экземпляра движок "numpy" или "pandas", берутся уже закэшированные столбцы движка,
+    и повторная выгрузка вообще ничего не копирует. Строковые столбцы копируются всегда.
+    Кадр получает только представления столбцов для чтения, поэтому запись в него (df.loc[...] = ...)
+    дает ошибку и не может испортить кэш движка или буферы RecordTable.
+    pandas и pyarrow - необязательные зависимости и импортируются только при выгрузке."""
+    KINDS = ("pandas", "arrow")
+    DTYPES = {"q": "int64", "d": "float64"}
+    STATS = ("count", "average", "median", "variance")
+    INTERVAL = ("estimate", "low", "high")
+
+    @staticmethod
+    def load(kind):
+        """Импортирует pandas или pyarrow. Возвращает модуль"""
+        if kind not in Export.KINDS:
+            raise Exception(f"Unknown kind {kind}, expected one of {', '.join(Export.KINDS)}")
+        name = "pyarrow" if kind == "arrow" else "pandas"
+        try:
+            return __import__(name)
+        except ImportError:
+            raise Exception(f"Для kind='{kind}' нужен пакет {name}")
+
+    @staticmethod
+    def buffer(values):
+        """Переводит список значений в типизированный буфер array.array, если все значения int или float.
+        Иначе (строки, None, смешанные типы) возвращает исходный список"""
+        values = list(values)
+        if values and all(type(value) is int for value in values):
+            typecode = "q"
+        elif values and all(type(value) in (int, float) for value in values):
+            typecode = "d"
+        else:
+            return values
+        try:
+            return array.array(typecode, values)
+        except OverflowError:
+            return values
+
+    @classmethod
+    def columns(cls, backend, rows, fields):
+        """Возвращает словарь столбцов fields списка словарей rows.
+        Для движков numpy и pandas - их закэшированные столбцы, для RecordTable - ее столбцы,
+        иначе - новые типизированные буферы"""
+        if isinstance(backend, (NumpyBackend, PandasBackend)):
+            return {field: backend.column(rows, field) for field in fields}
+        if isinstance(rows, RecordTable):
+            return {field: rows.column(field) for field in fields}
+        return {field: cls.buffer(row[field] for row in rows) for field in fields}
+
+    @classmethod
+    def readonly(cls, column):
+        """Возвращает numpy-представление столбца (array.array, numpy.ndarray или pandas.Series) без копирования
+        и без права записи. Списки возвращаются как есть"""
+        if isinstance(column, list):
+            return column
+        import numpy
+
+        if isinstance(column, array.array):
+            view = numpy.frombuffer(column, dtype=cls.DTYPES[column.typecode])
+        else:
+            view = numpy.asarray(column).view()
+        view.setflags(write=False)
+        return view
+
+    @classmethod
+    def table(cls, columns, kind="pandas"):
+        """Собирает из словаря столбцов pandas.DataFrame (kind="pandas") или pyarrow.Table (kind="arrow").
+        Числовые столбцы не копируются, а выгружаются только для чтения"""
+        module = cls.load(kind)
+        if kind == "arrow":
+            arrays = []
+            for column in columns.values():
+                if isinstance(column, array.array):
+                    arrays.append(module.Array.from_buffers(
+                        module.type_for_alias(cls.DTYPES[column.typecode]), len(column),
+                        [None, module.py_buffer(memoryview(column).toreadonly())]
+                    ))
+                else:
+                    arrays.append(module.array(cls.readonly(column)))
+            return module.Table.from_arrays(arrays, names=list(columns))
+        return module.DataFrame({name: cls.readonly(column) for name, column in columns.items()}, copy=False)
+
+    @classmethod
+    def result(cls, result, names=None, kind="pandas"):
+        """Выгружает результат метода в длинном формате: по строке на каждый лист вложенных словарей.
+        Принимает словарь (значения - числа, кортежи или словари того же вида) или список.
+        Ключи уровней идут в столбцы key, key_2, ..., элементы кортежей - в value, value_2, ...
+        (или в names, если переданы имена всех столбцов по порядку)"""
+        rows = []
+
+        def flatten(prefix, value):
+            if isinstance(value, dict):
+                for key, inner in value.items():
+                    flatten(prefix + (key,), inner)
+            elif isinstance(value, (tuple, list)):
+                rows.append(prefix + tuple(value))
+            else:
+                rows.append(prefix + (value,))
+
+        if isinstance(result, dict):
+            flatten((), result)
+        else:
+            rows = [(value,) for value in result]
+        depth = 0
+        if isinstance(result, dict):
+            depth, level = 1, next(iter(result.values()), None)
+            while isinstance(level, dict):
+                depth, level = depth + 1, next(iter(level.values()), None)
+        width = len(rows[0]) if rows else depth + 1
+        if names is None:
+            names = [f"key_{index + 1}" if index else "key" for index in range(depth)]
+            names += [f"value_{index + 1}" if index else "value" for index in range(width - depth)]
+        if len(names) != width:
+            raise Exception(f"Expected {width} column names, got {len(names)}")
+        return cls.table({name: cls.buffer(values) for name, values in zip(names, zip(*rows) if rows else [()] * width)}, kind)
 
 class Movies:
     """Информация о фильме содержится в файле `movies.csv`. Каждая строка этого файла после строки заголовка представляет один фильм и имеет следующий формат:
@@ -32,16 +1081,24 @@ class Movies:
     * Вестерн
     * (жанры не указаны)"""
 
-    def __init__(self, path_to_the_file):
-        """Constructor. Gets the filepath to the movies.csv-method"""
+    def __init__(self, path_to_the_file, movies=None, backend="python", records=False):
+        """Constructor. Gets the filepath to the movies.csv-method
+        Если передан уже загруженный список movies, файл не читается, а список используется как есть (без копирования)
+        backend - движок вычислений публичных методов (см. Backend)
+        records=True - хранить фильмы в RecordTable строк Movie вместо списка словарей"""
         self.filepath = path_to_the_file
-        self.movies = self.get_first_1000_values()
+        self.backend = Backend.create(backend)
+        self.movies = movies if movies is not None else self.get_first_1000_values()
+        if records and not isinstance(self.movies, RecordTable):
+            self.movies = RecordTable.from_rows(Movie, self.movies)
 
     def dist_by_release(self):
         """
         The method returns a dict or an OrderedDict where the keys are years and the values are counts. 
         You need to extract years from the titles. Sort it by counts descendingly.
         """
+        if self.backend is not None:
+            return self.backend.dist_by_release(self.movies)
         movies = self.movies
         year_counts = {}
 
@@ -54,7 +1111,7 @@ class Movies:
                     year_counts[year] += 1
                 else:
                     year_counts[year] = 1
-        release_years = collections.OrderedDict(sorted(year_counts.items(), key=lambda x: x[1], reverse=True))
+        release_years = collections.OrderedDict(Profiler.sorted(year_counts.items(), key=lambda x: x[1], reverse=True))
         return release_years
     
     def dist_by_genres(self):
@@ -62,6 +1119,8 @@ class Movies:
         The method returns a dict where the keys are genres and the values are counts.
      Sort it by counts descendingly.
         """
+        if self.backend is not None:
+            return self.backend.dist_by_genres(self.movies)
         movies = self.movies
         genres = {}
 
@@ -73,7 +1132,7 @@ class Movies:
                 else:
                     genres[genre] = 1
         
-        new_genres = dict(sorted(genres.items(), key=lambda item: item[1], reverse=True))
+        new_genres = dict(Profiler.sorted(genres.items(), key=lambda item: item[1], reverse=True))
         genres = new_genres
 
         return genres
@@ -83,6 +1142,8 @@ class Movies:
         The method returns a dict with top-n movies where the keys are movie titles and 
         the values are the number of genres of the movie. Sort it by numbers descendingly.
         """
+        if self.backend is not None:
+            return self.backend.most_genres(self.movies, n)
         movies_list = self.movies
         movies = {}
 
@@ -92,7 +1153,7 @@ class Movies:
             number_of_times += 1
             if number_of_times >= n: break
 
-        new_movies = dict(sorted(movies.items(), key=lambda item: item[1], reverse=True))
+        new_movies = dict(Profiler.sorted(movies.items(), key=lambda item: item[1], reverse=True))
         movies = new_movies
 
         return movies
@@ -102,15 +1163,18 @@ class Movies:
         The method returns a dict with the most popular genres in different years, where the keys
         are years and the values are the genres of the movie. Sort it by years ascendingly.
         """
+        if self.backend is not None:
+            return self.backend.most_genres_by_years(self.movies)
         movies_list = self.movies
         years_list = []
+        movie_years = []
 
         for movie in movies_list:
             title = movie["title"]
             match = re.search(r'\((\d{4})\)', title)
             year = int(match.group(1))
             years_list.append(year)
-            movie.update({"year": year})
+            movie_years.append((year, movie))
         
         years_list = set(years_list)
 
@@ -118,19 +1182,23 @@ class Movies:
 
         for year in years_list:
             years_genres = {}
-            for movie in movies_list:
-                if movie["year"] == year:
+            for movie_year, movie in movie_years:
+                if movie_year == year:
                     genres_list = movie["genres"].split("|")
                     for genre in genres_list:
                         if genre in years_genres:
                             years_genres[genre] += 1
                         else:
                             years_genres.update({genre: 1})
-            new_years_genres = dict(sorted(years_genres.items(), key=lambda item: item[1], reverse=True))
+            new_years_genres = dict(Profiler.sorted(years_genres.items(), key=lambda item: item[1], reverse=True))
             most_genres.update({year: list(new_years_genres)[0]})
 
         return most_genres
 
+    def to_frame(self, kind="pandas"):
+        """Returns the loaded movies as a pandas DataFrame or a pyarrow Table (see Export)"""
+        return Export.table(Export.columns(self.backend, self.movies, ("movieId", "title", "genres")), kind)
+
     def get_first_1000_values(self):
         """Принимает указатель на экземпляр класса.
         Возвращает список из 1000 словарей с полями:
@@ -138,24 +1206,21 @@ class Movies:
         titles
         genres
         """
-        filepath = self.filepath
-        movies = []
+        return list(itertools.islice(self.iter_movies(), 1000))
 
-        if self.is_movies_structure(): 
-            with open(filepath, "r", encoding="utf-8") as file:
-                next(file)
+    def iter_movies(self):
+        """Генератор, который лениво читает весь файл movies.csv (без ограничения в 1000 строк)
+        и отдает фильмы по одному в виде словарей с теми же полями, что и get_first_1000_values"""
+        with DataSource.open(self.filepath) as file:
+            if self.is_movies_structure(next(file, "")):
                 for line in file:
                     meta = line.strip().split(",")
                     title, genres = self.parse_movie_string(line)
-                    movie = {
+                    yield {
                         "movieId": int(meta[0]),
                         "title": title,
                         "genres": genres
                     }
-                    movies.append(movie)
-                    if len(movies) >= 1000: break
-
-        return movies
     
     def parse_movie_string(self, movie_string):
         """Принимает строку из файла movies
@@ -176,14 +1241,17 @@ class Movies:
 
         return title, genres
     
-    def is_movies_structure(self):
+    def is_movies_structure(self, header_line=None):
+        """Проверяет заголовок файла. Если строка заголовка header_line уже прочитана, файл повторно не открывается"""
         status = 1
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as file:
-                header_line = next(file).strip().split(',')
-                if header_line[0] != "movieId" or header_line[1] != "title" or header_line[2] != "genres":
-                    status = 0
-                    raise Exception("Неверная структура файла")
+            if header_line is None:
+                with DataSource.open(self.filepath) as file:
+                    header_line = next(file)
+            header_line = header_line.strip().split(',')
+            if header_line[0] != "movieId" or header_line[1] != "title" or header_line[2] != "genres":
+                status = 0
+                raise Exception("Неверная структура файла")
         except Exception as e:
             print(f"Ошибка в чтении файла: {e}")
         return status
@@ -197,25 +1265,33 @@ class Ratings:
     Строки в этом файле упорядочены сначала по userId, затем, внутри пользователя, по movieId.
     Рейтинги выставляются по 5-звездочной шкале с шагом в ползвезды (0,5 звезды - 5,0 звезды).
     Временные метки представляют секунды с полуночи по всемирному координированному времени (UTC) 1 января 1970 года."""
-    def __init__(self, path_to_the_file):
-        """Конструктор. Принимает путь к файлу ratings.csv
+    def __init__(self, path_to_the_file, movies=None, backend="python", records=False):
+        """Конструктор. Принимает путь к файлу ratings.csv или к его упакованной версии (PackedRatings)
         Определяет местоположение movies.csv, предполагая, что они в одной директории
-        Хранит 1000 строк фильмов и 1000 строк рейтинга в self.movies и self.ratings"""
+        Хранит 1000 строк фильмов и 1000 строк рейтинга в self.movies и self.ratings
+        Если передан уже загруженный список movies, movies.csv не читается
+        backend - движок вычислений методов Ratings.Movies и Ratings.Users (см. Backend)
+        records=True - хранить фильмы и рейтинги в RecordTable строк Movie и Rating вместо списков словарей"""
         self.filepath = path_to_the_file
         self.movies_filepath = self.find_movies_filepath(self.filepath)
+        self.backend = Backend.create(backend)
 
-        self.outer_movies = Movies(self.movies_filepath)
-        self.movies = self.outer_movies.get_first_1000_values()
+        self.outer_movies = Movies(self.movies_filepath, movies, backend, records)
+        self.movies = self.outer_movies.movies
 
         self.inner_movies = self.Movies(self)
         self.ratings = self.get_first_1000_values()
+        if records:
+            self.ratings = RecordTable.from_rows(Rating, self.ratings)
     
     def find_movies_filepath(self, filepath):
-        """Принимает путь к файлу ratings.csv
-        Возвращает путь к файлу movies.csv"""
-        filename_index = filepath.find("ratings.csv")
-        directory = filepath[:filename_index]
-        movies_filepath = directory+"movies.csv"
+        """Принимает путь к файлу ratings.csv (или упакованному файлу рейтингов)
+        Возвращает путь к файлу movies.csv в той же директории или папке zip-архива.
+        Для сжатого ratings.csv.gz (.zst) сначала ищется movies.csv с тем же сжатием"""
+        movies_filepath = os.path.join(os.path.dirname(filepath), "movies.csv")
+        for suffix in DataSource.COMPRESSED_SUFFIXES:
+            if filepath.endswith(suffix) and DataSource.exists(movies_filepath + suffix):
+                return movies_filepath + suffix
         return movies_filepath
     
     def get_first_1000_values(self):
@@ -223,11 +1299,12 @@ class Ratings:
         Возвращает список из 1000 рейтингов
         """
         filepath = self.filepath
+        if PackedRatings.is_packed(filepath):
+            return list(itertools.islice(PackedRatings(filepath).iter_ratings(), 1000))
         ratings = []
         
-        if self.is_ratings_structure():
-            with open(filepath, "r", encoding="utf-8") as file:
-                next(file)
+        with DataSource.open(filepath) as file:
+            if self.is_ratings_structure(next(file, "")):
                 for line in file:
                     meta = line.strip().split(",")
                     rating = {
@@ -241,14 +1318,156 @@ class Ratings:
 
         return ratings
     
-    def is_ratings_structure(self):
+    def iter_ratings(self):
+        """Принимает указатель на экземпляр класса.
+        Генератор, который лениво читает весь файл ratings.csv (без ограничения в 1000 строк)
+        и отдает рейтинги по одному в виде словарей с теми же полями, что и get_first_1000_values
+        Упакованный файл читается блоками через PackedRatings"""
+        if PackedRatings.is_packed(self.filepath):
+            yield from PackedRatings(self.filepath).iter_ratings()
+            return
+        with DataSource.open(self.filepath) as file:
+            if self.is_ratings_structure(next(file, "")):
+                for line in file:
+                    meta = line.strip().split(",")
+                    yield {
+                        "userId": int(meta[0]),
+                        "movieId": int(meta[1]),
+                        "rating": float(meta[2]),
+                        "timestamp": int(meta[3]),
+                    }
+
+    def records(self, limit=None):
+        """Читает первые limit рейтингов (по умолчанию весь файл) в RecordTable строк Rating.
+        Строки переводятся в столбцы по мере чтения, так что весь файл в виде словарей в памяти не держится"""
+        return RecordTable.from_rows(Rating, itertools.islice(self.iter_ratings(), limit))
+
+    def pack(self, path=None, block_size=65536):
+        """Принимает путь к упакованному файлу (по умолчанию рядом с ratings.csv с расширением .mlpack)
+        Упаковывает весь файл рейтингов в формат PackedRatings и возвращает путь к нему"""
+        if path is None:
+            path = os.path.splitext(self.filepath)[0] + PackedRatings.SUFFIX
+        PackedRatings.write(self.iter_ratings(), path, block_size)
+        return path
+
+    def rating_matrix(self):
+        """Принимает указатель на экземпляр класса.
+        Возвращает разреженную матрицу пользователи×фильмы (RatingMatrix)
+        в форматах CSR и CSC, построенную по self.ratings"""
+        return RatingMatrix(self.ratings)
+
+    def to_frame(self, kind="pandas"):
+        """Returns the loaded ratings as a pandas DataFrame or a pyarrow Table (see Export).
+        With the numpy or pandas backend the frame views the backend's cached columns"""
+        return Export.table(Export.columns(self.backend, self.ratings, ("userId", "movieId", "rating", "timestamp")), kind)
+
+    def report(self, statistics):
+        """Считает сразу несколько статистик Ratings.Movies и Ratings.Users за один проход по self.ratings.
+        Принимает список запрошенных статистик: имя метода или кортеж (имя метода, аргументы...), например
+        ["dist_by_year", ("top_by_ratings", 10, "mean"), ("top_controversial_users", 5)].
+        Во время прохода накапливаются распределения по годам и оценкам и общие для всех статистик
+        списки оценок каждого фильма и каждого пользователя; затем каждая статистика считается по ним.
+        Возвращает словарь: ключи - элементы statistics, значения - те же результаты, что у отдельных методов"""
+        movie_statistics = {"top_by_num_of_ratings", "top_by_ratings", "top_controversial"}
+        user_statistics = {"dist_users_by_num_of_ratings", "dist_users_by_rating", "top_controversial_users"}
+        names = {item if isinstance(item, str) else item[0] for item in statistics}
+        unknown = names - movie_statistics - user_statistics - {"dist_by_year", "dist_by_rating"}
+        if unknown:
+            raise Exception(f"Unknown statistics: {', '.join(Profiler.sorted(unknown))}")
+        self.check_report(statistics)
+
+        need_years = "dist_by_year" in names
+        need_scores = "dist_by_rating" in names
+        need_movies = bool(names & movie_statistics)
+        need_users = bool(names & user_statistics)
+        years, scores, movie_ratings, user_ratings = {}, {}, {}, {}
+
+        for rating in self.ratings:
+            score = rating["rating"]
+            if need_years:
+                year = datetime.datetime.fromtimestamp(rating["timestamp"]).year
+                years[year] = years.get(year, 0) + 1
+            if need_scores:
+                scores[score] = scores.get(score, 0) + 1
+            if need_movies:
+                movie_ratings.setdefault(rating["movieId"], []).append(score)
+            if need_users:
+                user_ratings.setdefault(rating["userId"], []).append(score)
+
+        rated_movies = {}
+        movies_with_counts = {}
+        if need_movies:
+            for movie in self.movies:
+                movie_scores = movie_ratings.get(movie["movieId"], [])
+                movies_with_counts[movie["title"]] = len(movie_scores)
+                if movie_scores: rated_movies[movie["title"]] = movie_scores
+
+        def top(values, n=None):
+            ordered = Profiler.sorted(values.items(), key=lambda item: item[1], reverse=True)
+            return dict(ordered if n is None else ordered[:n])
+
+        calc = self.inner_movies
+        result = {}
+        for item in statistics:
+            name, args = (item, ()) if isinstance(item, str) else (item[0], tuple(item[1:]))
+            if name == "dist_by_year":
+                value = dict(Profiler.sorted(years.items(), key=lambda item: item[0]))
+            elif name == "dist_by_rating":
+                value = dict(Profiler.sorted(scores.items(), key=lambda item: item[0]))
+            elif name == "top_by_num_of_ratings":
+                value = top(movies_with_counts, *args)
+            elif name == "top_by_ratings":
+                value = top(calc.calc_rating(rated_movies, args[1] if len(args) > 1 else "average"), args[0])
+            elif name == "top_controversial":
+                value = top(calc.calc_rating_variance(rated_movies), *args)
+            elif name == "dist_users_by_num_of_ratings":
+                value = top({user_id: len(user_scores) for user_id, user_scores in user_ratings.items()})
+            elif name == "dist_users_by_rating":
+                value = top(calc.calc_rating(user_ratings, args[0] if args else "average"))
+            else:
+                value = top(calc.calc_rating_variance(user_ratings), *args)
+            result[item] = value
+
+        return result
+
+    @staticmethod
+    def check_report(statistics):
+        """Проверяет аргументы статистик отчета до прохода по оценкам: top-статистикам нужно целое n >= 1,
+        метрика - "average" или "mean", лишние аргументы не допускаются"""
+        # имя статистики -> (нужно ли n, допускается ли metric)
+        signatures = {
+            "dist_by_year": (False, False), "dist_by_rating": (False, False),
+            "top_by_num_of_ratings": (True, False), "top_by_ratings": (True, True), "top_controversial": (True, False),
+            "dist_users_by_num_of_ratings": (False, False), "dist_users_by_rating": (False, True),
+            "top_controversial_users": (True, False),
+        }
+        for item in statistics:
+            name, args = (item, ()) if isinstance(item, str) else (item[0], tuple(item[1:]))
+            needs_n, takes_metric = signatures[name]
+            if needs_n:
+                if not args:
+                    raise Exception(f"Statistic '{name}' needs parameter n: pass it as ('{name}', n)")
+                n = args[0]
+                if isinstance(n, bool) or not isinstance(n, int) or n < 1:
+                    raise Exception(f"Statistic '{name}' needs parameter n to be a positive integer, got {n!r}")
+                args = args[1:]
+            if takes_metric and args:
+                Backend.check_metric(args[0])
+                args = args[1:]
+            if args:
+                raise Exception(f"Statistic '{name}' got unexpected parameters: {args!r}")
+
+    def is_ratings_structure(self, header_line=None):
+        """Проверяет заголовок файла. Если строка заголовка header_line уже прочитана, файл повторно не открывается"""
         status = 1
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as file:
-                header_line = next(file).strip().split(',')
-                if header_line[0] != "userId" or header_line[1] != "movieId" or header_line[2] != "rating" or header_line[3] != "timestamp":
-                    status = 1
-                    raise Exception("Неверная структура файла")
+            if header_line is None:
+                with DataSource.open(self.filepath) as file:
+                    header_line = next(file)
+            header_line = header_line.strip().split(',')
+            if header_line[0] != "userId" or header_line[1] != "movieId" or header_line[2] != "rating" or header_line[3] != "timestamp":
+                status = 0
+                raise Exception("Неверная структура файла")
         except Exception as e:
             print(f"Ошибка в чтении файла: {e}")
         return status
@@ -268,6 +1487,8 @@ class Ratings:
             The method returns a dict where the keys are years and the values are counts. 
             Sort it by years ascendingly. You need to extract years from timestamps.
             """
+            if self.parent.backend is not None:
+                return self.parent.backend.dist_by_year(self.parent.ratings)
             years = {}
             ratings = self.parent.ratings
             for rating in ratings:
@@ -277,7 +1498,7 @@ class Ratings:
                 else:
                     years[year] = 1
             
-            new_years = dict(sorted(years.items(), key=lambda item: item[0]))
+            new_years = dict(Profiler.sorted(years.items(), key=lambda item: item[0]))
             years = new_years
             
             return years
@@ -287,6 +1508,8 @@ class Ratings:
             The method returns a dict where the keys are ratings and the values are counts.
          Sort it by ratings ascendingly.
             """
+            if self.parent.backend is not None:
+                return self.parent.backend.dist_by_rating(self.parent.ratings)
             ratings_distribution = {}
             ratings = self.parent.ratings
             for rating in ratings:
@@ -296,7 +1519,7 @@ class Ratings:
                 else:
                     ratings_distribution[score] = 1
             
-            scores = dict(sorted(ratings_distribution.items(), key=lambda item: item[0]))
+            scores = dict(Profiler.sorted(ratings_distribution.items(), key=lambda item: item[0]))
             ratings_distribution = scores
 
             return ratings_distribution
@@ -307,6 +1530,8 @@ class Ratings:
             It is a dict where the keys are movie titles and the values are numbers.
      Sort it by numbers descendingly.
             """
+            if self.parent.backend is not None:
+                return self.parent.backend.top_by_num_of_ratings(self.parent.movies, self.parent.ratings, n)
             top_movies = {}
             movies_with_counts = {}
             movies = self.parent.movies
@@ -319,7 +1544,7 @@ class Ratings:
                         ratings_count += 1
                 movies_with_counts.update({movie["title"]: ratings_count})
 
-            scores = dict(sorted(movies_with_counts.items(), key=lambda item: item[1], reverse=True))
+            scores = dict(Profiler.sorted(movies_with_counts.items(), key=lambda item: item[1], reverse=True))
 
             times = 0
             for title, count in scores.items():
@@ -336,6 +1561,8 @@ class Ratings:
             Sort it by metric descendingly.
             The values should be rounded to 2 decimals.
             """
+            if self.parent.backend is not None:
+                return self.parent.backend.top_by_ratings(self.parent.movies, self.parent.ratings, n, metric)
             top_movies = {}
             rated_movies = {}
             movies = self.parent.movies
@@ -349,7 +1576,7 @@ class Ratings:
                 if len(ratings_list) > 0: rated_movies[movie["title"]] = ratings_list
 
             new_movies = self.calc_rating(rated_movies, metric)
-            sorted_movies = dict(sorted(new_movies.items(), key=lambda item: item[1], reverse=True))
+            sorted_movies = dict(Profiler.sorted(new_movies.items(), key=lambda item: item[1], reverse=True))
             
             times = 0
             for movie in sorted_movies.items():
@@ -366,6 +1593,8 @@ class Ratings:
           Sort it by variance descendingly.
             The values should be rounded to 2 decimals.
             """
+            if self.parent.backend is not None:
+                return self.parent.backend.top_controversial(self.parent.movies, self.parent.ratings, n)
             top_movies = {}
             rated_movies = {}
             movies = self.parent.movies
@@ -379,7 +1608,7 @@ class Ratings:
                 if len(ratings_list) > 0: rated_movies[movie["title"]] = ratings_list
 
             new_movies = self.calc_rating_variance(rated_movies)
-            sorted_movies = dict(sorted(new_movies.items(), key=lambda item: item[1], reverse=True))
+            sorted_movies = dict(Profiler.sorted(new_movies.items(), key=lambda item: item[1], reverse=True))
             
             times = 0
             for movie in sorted_movies.items():
@@ -421,7 +1650,7 @@ class Ratings:
             top_movies = {}
             for title, ratings in movies.items():
                 ratings_count = len(ratings)
-                sorted_ratings = sorted(ratings)
+                sorted_ratings = Profiler.sorted(ratings)
 
                 if ratings_count % 2 == 0:
                     mid_index1 = ratings_count // 2 - 1
@@ -440,7 +1669,6 @@ class Ratings:
             Рассчитывает дисперсию и возвращает обновленный словарь, в значениях - дисперсия"""
             top_movies = {}
             avg_rating = self.calc_avg_rating(movies)
-            variance = 0
 
             for title, ratings in movies.items():
                 ratings_count = len(ratings)
@@ -465,12 +1693,16 @@ class Ratings:
      Inherit from the class Movies. Several methods are similar to the methods from it.
         """
         def __init__(self, parent):
-            """Конструктор, принимающий ссылку на родительский класс Ratings."""
+            """Конструктор, принимающий ссылку на родительский класс Ratings.
+            Индекс похожих пользователей строится лениво при первом запросе"""
             super().__init__(parent)
+            self.user_index = None
         
         def dist_users_by_num_of_ratings(self):
             """returns the distribution of users by the number of ratings made by them.
             Хоть в задании и не указано, отсортировал от большего к меньшему"""
+            if self.parent.backend is not None:
+                return self.parent.backend.dist_users_by_num_of_ratings(self.parent.ratings)
             users = {}
             ratings = self.parent.ratings
 
@@ -481,7 +1713,7 @@ class Ratings:
                 else:
                     users[userId] = 1
             
-            sorted_users = dict(sorted(users.items(), key=lambda item: item[1], reverse=True))
+            sorted_users = dict(Profiler.sorted(users.items(), key=lambda item: item[1], reverse=True))
             users = sorted_users
 
             return users
@@ -489,6 +1721,8 @@ class Ratings:
         def dist_users_by_rating(self, metric="average"):
             """returns the distribution of users by average or median ratings made by them.
             Хоть в задании напрямую и не указано, отсортировал от большего к меньшему по рейтингу"""
+            if self.parent.backend is not None:
+                return self.parent.backend.dist_users_by_rating(self.parent.ratings, metric)
             users = {}
             users_ids = []
             ratings = self.parent.ratings
@@ -503,12 +1737,14 @@ class Ratings:
                 users.update({user_id: ratings_list})
 
             average_ratings = self.calc_rating(users, metric)
-            sorted_users = dict(sorted(average_ratings.items(), key=lambda item: item[1], reverse=True))
+            sorted_users = dict(Profiler.sorted(average_ratings.items(), key=lambda item: item[1], reverse=True))
 
             return sorted_users
 
         def top_controversial_users(self, n):
             """returns top-n users with the biggest variance of their ratings."""
+            if self.parent.backend is not None:
+                return self.parent.backend.top_controversial_users(self.parent.ratings, n)
             top_users = {}
             users = {}
             users_ids = []
@@ -524,7 +1760,7 @@ class Ratings:
                 users.update({user_id: ratings_list})
 
             controversial_users = self.calc_rating_variance(users)
-            sorted_users = dict(sorted(controversial_users.items(), key=lambda item: item[1], reverse=True))
+            sorted_users = dict(Profiler.sorted(controversial_users.items(), key=lambda item: item[1], reverse=True))
 
             times = 0
             for user in sorted_users.items():
@@ -534,6 +1770,2085 @@ class Ratings:
             
             return top_users
 
+        def build_user_index(self):
+            """Строит индекс для поиска похожих пользователей и сохраняет его в self.user_index.
+            Векторы пользователей центрируются на среднюю оценку пользователя и нормируются на единичную длину.
+            CSR-часть матрицы оценок - это разреженные векторы пользователей,
+            а CSC-часть - инвертированный список фильм -> пользователи, оценившие его"""
+            matrix = self.parent.rating_matrix()
+            users = matrix.shape[0]
+            means = array.array("d", bytes(8 * users))
+            norms = array.array("d", bytes(8 * users))
+
+            for row in range(users):
+                values = [value / 2 for value in matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]]]
+                means[row] = sum(values) / len(values)
+                norms[row] = math.sqrt(sum((value - means[row]) ** 2 for value in values))
+
+            def weight(row, value):
+                return (value / 2 - means[row]) / norms[row] if norms[row] > 0 else 0.0
+
+            weights = array.array("d", (weight(row, value) for row in range(users)
+                                        for value in matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]]))
+            col_weights = array.array("d", (weight(row, value) for row, value in zip(matrix.col_indices, matrix.col_data)))
+
+            self.user_index = {"matrix": matrix, "means": means, "weights": weights, "col_weights": col_weights}
+            return self.user_index
+
+        def user_similarities(self, user_id):
+            """Принимает userId. Возвращает словарь: ключи - индексы других пользователей в матрице,
+            значения - косинусная похожесть центрированных векторов.
+            Обходит только фильмы пользователя и списки пользователей, оценивших эти фильмы"""
+            if Profiler.enabled:
+                Profiler.count_cache("Ratings.Users.user_index", self.user_index is not None)
+            index = self.user_index or self.build_user_index()
+            matrix, weights, col_weights = index["matrix"], index["weights"], index["col_weights"]
+            user = matrix.user_index[user_id]
+            similarities = {}
+
+            for slot in range(matrix.indptr[user], matrix.indptr[user + 1]):
+                weight = weights[slot]
+                if weight == 0:
+                    continue
+                col = matrix.indices[slot]
+                for col_slot in range(matrix.col_indptr[col], matrix.col_indptr[col + 1]):
+                    other = matrix.col_indices[col_slot]
+                    if other != user:
+                        similarities[other] = similarities.get(other, 0.0) + weight * col_weights[col_slot]
+
+            return similarities
+
+        def similar_users(self, user_id, n=10):
+            """returns top-n users with the taste most similar to the user with user_id.
+            It is a dict where the keys are userIds and the values are similarities rounded to 4 decimals.
+            Sorted by similarity descendingly."""
+            similarities = self.user_similarities(user_id)
+            user_ids = self.user_index["matrix"].user_ids
+            top = heapq.nlargest(n, similarities.items(), key=lambda item: (item[1], -item[0]))
+            return {user_ids[other]: round(similarity, 4) for other, similarity in top}
+
+        def predict_rating(self, user_id, movie_id, k=20):
+            """returns the rating predicted for the user by the ratings of the k most similar users who rated the movie.
+            The prediction is the user average plus the weighted deviations of the neighbours from their averages.
+            If nobody similar rated the movie, the user average is returned. The value is rounded to 2 decimals."""
+            similarities = self.user_similarities(user_id)
+            matrix, means = self.user_index["matrix"], self.user_index["means"]
+            user = matrix.user_index[user_id]
+
+            neighbours = []
+            col = matrix.movie_index.get(movie_id)
+            if col is not None:
+                for col_slot in range(matrix.col_indptr[col], matrix.col_indptr[col + 1]):
+                    other = matrix.col_indices[col_slot]
+                    if similarities.get(other, 0.0) > 0:
+                        neighbours.append((similarities[other], matrix.col_data[col_slot] / 2 - means[other]))
+
+            top = heapq.nlargest(k, neighbours)
+            weight_sum = sum(similarity for similarity, _ in top)
+            if weight_sum == 0:
+                return round(means[user], 2)
+            return round(means[user] + sum(similarity * deviation for similarity, deviation in top) / weight_sum, 2)
+
+    class Genres:
+        """Статистики оценок по жанрам и по парам жанр × год оценки для self.parent.ratings.
+
+        Соединение с movies.csv делается один раз: join строит плотный массив lookup, где по индексу movieId
+        лежит битовая маска жанров фильма (бит i - жанр self.genres[i]). Маски оценок получаются
+        одной выборкой по индексу вместо вложенных циклов по movieId, затем маска и год оценки
+        склеиваются в один ключ (mask << 12 | год) и по нему за один проход считаются гистограммы полузвезд
+        ядром histograms движка. Различных сочетаний жанров немного, поэтому разнесение гистограмм
+        по отдельным жанрам уже ничего не стоит. Статистики по гистограммам - как в Ratings.External.
+        Движок берется у родителя; для эталонного "python" используются ядра Backend на чистом Python."""
+        YEAR_BITS = 12
+
+        def __init__(self, parent):
+            """Конструктор
+            Принимает ссылку на экземпляр родительского класса Ratings"""
+            self.parent = parent
+            self.backend = parent.backend if parent.backend is not None else Backend()
+            self.genres = []
+            self.lookup = None
+            self.cached = None
+
+        def join(self):
+            """Строит список жанров и массив lookup: movieId -> битовая маска жанров (0 для неизвестных фильмов).
+            Фильмы читаются потоком из всего movies.csv, а не только первые 1000 из self.parent.movies,
+            иначе оценки остальных фильмов не попадали бы ни в один жанр"""
+            movies = [(movie["movieId"], movie["genres"].split("|")) for movie in self.parent.outer_movies.iter_movies()]
+            self.genres = Profiler.sorted({genre for _, genres in movies for genre in genres})
+            if len(self.genres) > 63 - self.YEAR_BITS:
+                raise Exception(f"Too many genres for a bitmask: {len(self.genres)}")
+            bits = {genre: 1 << index for index, genre in enumerate(self.genres)}
+            size = max((movie_id for movie_id, _ in movies), default=0) + 1
+            self.lookup = array.array("q", bytes(8 * size))
+            for movie_id, genres in movies:
+                mask = 0
+                for genre in genres:
+                    mask |= bits[genre]
+                self.lookup[movie_id] = mask
+            return self.lookup
+
+        def masks(self):
+            """Возвращает столбец масок жанров для self.parent.ratings в формате движка"""
+            if self.lookup is None:
+                self.join()
+            return self.backend.lookup(self.lookup, self.backend.column(self.parent.ratings, "movieId"))
+
+        def aggregate(self):
+            """Возвращает пару (гистограммы по жанрам, гистограммы по (жанр, год)).
+            Результат кэшируется, пока список self.parent.ratings не изменился"""
+            ratings = self.parent.ratings
+            if self.cached is not None and self.cached[0] is ratings and self.cached[1] == len(ratings):
+                return self.cached[2]
+            backend = self.backend
+            years = backend.years(backend.column(ratings, "timestamp"))
+            keys = backend.combine(self.masks(), years, self.YEAR_BITS)
+            by_genre, by_year = {}, {}
+            year_mask = (1 << self.YEAR_BITS) - 1
+            for key, histogram in backend.histograms(keys, backend.column(ratings, "rating")):
+                mask, year = key >> self.YEAR_BITS, key & year_mask
+                for index, genre in enumerate(self.genres):
+                    if mask >> index & 1:
+                        total = by_genre.setdefault(genre, [0] * 10)
+                        year_total = by_year.setdefault(genre, {}).setdefault(year, [0] * 10)
+                        for position, amount in enumerate(histogram):
+                            total[position] += amount
+                            year_total[position] += amount
+            by_genre = {genre: by_genre[genre] for genre in self.genres if genre in by_genre}
+            by_year = {genre: dict(Profiler.sorted(by_year[genre].items())) for genre in by_genre}
+            self.cached = (ratings, len(ratings), (by_genre, by_year))
+            return self.cached[2]
+
+        @staticmethod
+        def distribution(histogram):
+            return {(index + 1) / 2: amount for index, amount in enumerate(histogram) if amount}
+
+        def dist_by_rating(self):
+            """
+            The method returns a dict where the keys are genres and the values are dicts
+            of rating value -> count (see Ratings.Movies.dist_by_rating). Genres are sorted by name.
+            """
+            return {genre: self.distribution(histogram) for genre, histogram in self.aggregate()[0].items()}
+
+        def dist_by_year_and_rating(self):
+            """
+            The method returns a dict genre -> year -> dict of rating value -> count.
+            Genres are sorted by name, years ascendingly.
+            """
+            return {
+                genre: {year: self.distribution(histogram) for year, histogram in years.items()}
+                for genre, years in self.aggregate()[1].items()
+            }
+
+        def stats(self):
+            """
+            The method returns a dict genre -> (number of ratings, average, median, variance).
+            Values are rounded to 2 decimals.
+            """
+            return {genre: Ratings.External.summarize(histogram) for genre, histogram in self.aggregate()[0].items()}
+
+        def stats_by_year(self):
+            """
+            The method returns a dict genre -> year -> (number of ratings, average, median, variance).
+            """
+            return {
+                genre: {year: Ratings.External.summarize(histogram) for year, histogram in years.items()}
+                for genre, years in self.aggregate()[1].items()
+            }
+
+        def top_by_ratings(self, n, metric="average"):
+            """
+            The method returns top-n genres by the average or median of their ratings, sorted descendingly.
+            """
+            position = Backend.check_metric(metric)
+            return Backend.top(((genre, stats[position]) for genre, stats in self.stats().items()), n)
+
+        def top_controversial(self, n):
+            """
+            The method returns top-n genres by the variance of their ratings, sorted descendingly.
+            """
+            return Backend.top(((genre, stats[3]) for genre, stats in self.stats().items()), n)
+
+        def to_frame(self, by_year=False, kind="pandas"):
+            """Returns stats() (or stats_by_year()) in long format as a pandas DataFrame or a pyarrow Table"""
+            if by_year:
+                return Export.result(self.stats_by_year(), ("genre", "year") + Export.STATS, kind)
+            return Export.result(self.stats(), ("genre",) + Export.STATS, kind)
+
+    class Activity:
+        """Сессии, периоды активности пользователей и когорты по году первой оценки для self.parent.ratings.
+
+        Сессия - подряд идущие по времени оценки пользователя, между которыми не больше gap секунд.
+        Все считается одним проходом ядра sweep движка: оценки сортируются по (userId, timestamp),
+        затем границы пользователей, сессий и лет находятся сравнением соседних строк
+        (у движков numpy и pandas - векторно, без циклов по пользователям).
+        Для эталонного "python" используются ядра Backend на чистом Python.
+        Чтобы считать по всему файлу, а не по первым 1000 строкам, можно подставить
+        ratings.ratings = ratings.records() и взять движок numpy: столбцы тогда не копируются."""
+        def __init__(self, parent, gap=30 * 60):
+            """Конструктор
+            Принимает ссылку на экземпляр родительского класса Ratings и порог перерыва между сессиями в секундах"""
+            self.parent = parent
+            self.gap = gap
+            self.backend = parent.backend if parent.backend is not None else Backend()
+            self.cached = None
+
+        def aggregate(self):
+            """Возвращает результат Backend.sweep. Кэшируется, пока список self.parent.ratings не изменился"""
+            ratings = self.parent.ratings
+            if self.cached is not None and self.cached[0] is ratings and self.cached[1] == len(ratings):
+                return self.cached[2]
+            backend = self.backend
+            result = backend.sweep(backend.column(ratings, "userId"), backend.column(ratings, "timestamp"), self.gap)
+            self.cached = (ratings, len(ratings), result)
+            return result
+
+        def user_sessions(self):
+            """
+            The method returns a dict where the keys are userIds and the values are tuples
+            (number of sessions, average ratings per session, average session length in minutes).
+            Sort it by the number of sessions descendingly, then by userId.
+            """
+            result = self.aggregate()
+            values = {
+                user_id: (sessions, round(ratings / sessions, 2), round(seconds / sessions / 60, 2))
+                for user_id, ratings, sessions, seconds in zip(result["users"], result["ratings"], result["sessions"], result["seconds"])
+            }
+            return dict(Profiler.sorted(values.items(), key=lambda item: item[1][0], reverse=True))
+
+        def dist_sessions_by_size(self):
+            """
+            The method returns a dict where the keys are numbers of ratings in a session
+            and the values are numbers of such sessions. Sort it by the session size ascendingly.
+            """
+            return dict(self.aggregate()["sizes"])
+
+        def activity_spans(self):
+            """
+            The method returns a dict where the keys are userIds and the values are tuples
+            (date of the first rating, date of the last rating, days between them).
+            Sort it by days descendingly, then by userId.
+            """
+            result = self.aggregate()
+            values = {
+                user_id: (
+                    datetime.date.fromtimestamp(first),
+                    datetime.date.fromtimestamp(last),
+                    round((last - first) / 86400, 2),
+                )
+                for user_id, first, last in zip(result["users"], result["first"], result["last"])
+            }
+            return dict(Profiler.sorted(values.items(), key=lambda item: item[1][2], reverse=True))
+
+        def cohort_sizes(self):
+            """
+            The method returns a dict where the keys are years of the first rating (cohorts)
+            and the values are numbers of users in the cohort. Sort it by years ascendingly.
+            """
+            return {cohort: users for (cohort, offset), users in self.aggregate()["cohorts"] if offset == 0}
+
+        def cohort_retention(self, relative=True):
+            """
+            The method returns a dict cohort year -> dict years since the first rating -> share of the cohort's users
+            who rated anything in that year (rounded to 2 decimals), or their number if relative is False.
+            """
+            sizes = self.cohort_sizes()
+            retention = {}
+            for (cohort, offset), users in self.aggregate()["cohorts"]:
+                retention.setdefault(cohort, {})[offset] = round(users / sizes[cohort], 2) if relative else users
+            return retention
+
+    class Sketches:
+        """Приближенный режим статистик по неограниченному потоку оценок в фиксированной памяти.
+        Вместо точных словарей по всем фильмам и пользователям хранятся:
+        Space-Saving по фильмам и по пользователям, Count-Min Sketch по пользователям
+        и HyperLogLog для числа различных пользователей.
+        Частичные скетчи с разных обработчиков потока объединяются методом merge."""
+        def __init__(self, parent, capacity=1000, width=2048, depth=5, precision=12):
+            """Конструктор
+            Принимает ссылку на экземпляр родительского класса Ratings и параметры скетчей"""
+            self.parent = parent
+            self.movie_counts = SpaceSaving(capacity)
+            self.user_counts = SpaceSaving(capacity)
+            self.user_sketch = CountMinSketch(width, depth)
+            self.users = HyperLogLog(precision)
+
+        def update(self, ratings=None):
+            """Учитывает оценки из итерируемого ratings (например, Ratings.iter_ratings() или живого потока).
+            По умолчанию берет self.parent.ratings"""
+            for rating in self.parent.ratings if ratings is None else ratings:
+                self.movie_counts.add(rating["movieId"])
+                self.user_counts.add(rating["userId"])
+                self.user_sketch.add(rating["userId"])
+                self.users.add(rating["userId"])
+            return self
+
+        def merge(self, other):
+            """Объединяет со скетчами other, собранными по другой части потока"""
+            self.movie_counts.merge(other.movie_counts)
+            self.user_counts.merge(other.user_counts)
+            self.user_sketch.merge(other.user_sketch)
+            self.users.merge(other.users)
+            return self
+
+        def top_by_num_of_ratings(self, n):
+            """
+            The method returns approximate top-n movies by the number of ratings.
+            It is a dict where the keys are movie titles and the values are estimated numbers.
+            Movies missing from the parent movies are skipped. Sort it by numbers descendingly.
+            """
+            titles = {movie["movieId"]: movie["title"] for movie in self.parent.movies}
+            top_movies = {}
+            for movie_id, count, _ in self.movie_counts.top(self.movie_counts.capacity):
+                if movie_id in titles:
+                    top_movies[titles[movie_id]] = count
+                if len(top_movies) >= n: break
+            return top_movies
+
+        def dist_users_by_num_of_ratings(self):
+            """returns the approximate distribution of the most active users by the number of ratings made by them.
+            Only the users tracked by Space-Saving (at most capacity) are returned, sorted descendingly."""
+            return {user_id: count for user_id, count, _ in self.user_counts.top(self.user_counts.capacity)}
+
+        def num_of_ratings(self, user_id):
+            """Возвращает оценку сверху для числа оценок любого пользователя по Count-Min Sketch"""
+            return self.user_sketch.estimate(user_id)
+
+        def distinct_users(self):
+            """Возвращает оценку числа различных пользователей по HyperLogLog"""
+            return self.users.estimate()
+
+        def error_bounds(self):
+            """Возвращает словарь с гарантиями точности:
+            movies / users - максимальное завышение счетчиков Space-Saving,
+            user_sketch - максимальное завышение Count-Min Sketch и вероятность его превысить,
+            distinct_users - относительная стандартная ошибка HyperLogLog"""
+            return {
+                "movies": self.movie_counts.error_bound(),
+                "users": self.user_counts.error_bound(),
+                "user_sketch": self.user_sketch.error_bound(),
+                "distinct_users": self.users.error_bound(),
+            }
+
+    class External:
+        """Внешняя (out-of-core) группировка оценок по фильмам и пользователям для файлов больше памяти.
+        Весь ratings.csv читается одним проходом. Если данные не помещаются в бюджет памяти memory_budget (в байтах),
+        пары (id, оценка) раскладываются по хешу id на партиции во временных файлах,
+        после чего каждая партиция агрегируется отдельно и результаты объединяются.
+        Для каждого id хранится гистограмма из 10 счетчиков по полузвездам,
+        по ней точно считаются число оценок, среднее, медиана и дисперсия.
+        Методы возвращают то же, что и одноименные методы Ratings.Movies и Ratings.Users, но по всему файлу."""
+        RECORD = struct.Struct("<iB")
+        BYTES_PER_LINE = 20
+        BYTES_PER_KEY = 240
+        MAX_PARTITIONS = 256
+
+        def __init__(self, parent, memory_budget=256 * 1024 * 1024, temp_dir=None):
+            """Конструктор
+            Принимает ссылку на экземпляр родительского класса Ratings, бюджет памяти в байтах
+            и директорию для временных файлов (по умолчанию системная)"""
+            self.parent = parent
+            self.memory_budget = memory_budget
+            self.temp_dir = temp_dir
+            self.partitions = 0
+            self.movie_stats = None
+            self.user_stats = None
+            self.movie_titles = None
+
+        def num_partitions(self):
+            """Оценивает число партиций так, чтобы гистограммы одной партиции помещались в половину бюджета"""
+            if PackedRatings.is_packed(self.parent.filepath):
+                rows = PackedRatings(self.parent.filepath).count()
+            else:
+                rows = DataSource.size(self.parent.filepath) / self.BYTES_PER_LINE
+            return min(self.MAX_PARTITIONS, max(1, math.ceil(rows * self.BYTES_PER_KEY / (self.memory_budget / 2))))
+
+        def aggregate(self):
+            """Один проход по файлу и агрегация по фильмам и пользователям.
+            Сохраняет в self.movie_stats и self.user_stats словари: ключи - id,
+            значения - кортежи (число оценок, среднее, медиана, дисперсия)"""
+            self.partitions = self.num_partitions()
+            if self.partitions == 1 and PackedRatings.is_packed(self.parent.filepath):
+                movies, users = PackedRatings(self.parent.filepath).histograms()
+                self.movie_stats = {key: self.summarize(histogram) for key, histogram in movies.items()}
+                self.user_stats = {key: self.summarize(histogram) for key, histogram in users.items()}
+                return self
+            if self.partitions == 1:
+                movies, users = {}, {}
+                for rating in self.parent.iter_ratings():
+                    index = int(rating["rating"] * 2) - 1
+                    movies.setdefault(rating["movieId"], [0] * 10)[index] += 1
+                    users.setdefault(rating["userId"], [0] * 10)[index] += 1
+                self.movie_stats = {key: self.summarize(histogram) for key, histogram in movies.items()}
+                self.user_stats = {key: self.summarize(histogram) for key, histogram in users.items()}
+                return self
+
+            with tempfile.TemporaryDirectory(dir=self.temp_dir) as directory:
+                paths = {
+                    name: [os.path.join(directory, f"{name}_{index}.bin") for index in range(self.partitions)]
+                    for name in ("movieId", "userId")
+                }
+                self.spill(paths)
+                self.movie_stats = self.merge(paths["movieId"])
+                self.user_stats = self.merge(paths["userId"])
+            return self
+
+        def spill(self, paths):
+            """Раскладывает пары (id, число полузвезд) по партициям. Буферы сбрасываются на диск,
+            когда их общий размер доходит до четверти бюджета памяти"""
+            files = {name: [open(path, "wb") for path in name_paths] for name, name_paths in paths.items()}
+            buffers = {name: [bytearray() for _ in name_paths] for name, name_paths in paths.items()}
+            limit = self.memory_budget // 4
+            buffered = 0
+            try:
+                for rating in self.parent.iter_ratings():
+                    half_stars = int(rating["rating"] * 2)
+                    for name, name_buffers in buffers.items():
+                        key = rating[name]
+                        name_buffers[HyperLogLog.hash64(key) % self.partitions] += self.RECORD.pack(key, half_stars)
+                    buffered += 2 * self.RECORD.size
+                    if buffered >= limit:
+                        self.flush(files, buffers)
+                        buffered = 0
+                self.flush(files, buffers)
+            finally:
+                for name_files in files.values():
+                    for file in name_files:
+                        file.close()
+
+        @staticmethod
+        def flush(files, buffers):
+            """Дописывает буферы в файлы партиций и очищает их"""
+            for name, name_buffers in buffers.items():
+                for file, buffer in zip(files[name], name_buffers):
+                    file.write(buffer)
+                    buffer.clear()
+
+        def merge(self, paths):
+            """Агрегирует партиции по одной и объединяет результаты в один словарь"""
+            stats = {}
+            for path in paths:
+                histograms = {}
+                with open(path, "rb") as file:
+                    while True:
+                        chunk = file.read(self.RECORD.size * 65536)
+                        if not chunk:
+                            break
+                        for key, half_stars in self.RECORD.iter_unpack(chunk):
+                            histograms.setdefault(key, [0] * 10)[half_stars - 1] += 1
+                for key, histogram in histograms.items():
+                    stats[key] = self.summarize(histogram)
+                os.remove(path)
+            return stats
+
+        @staticmethod
+        def summarize(histogram):
+            """По гистограмме полузвезд возвращает (число оценок, среднее, медиана, дисперсия).
+            Как и в Ratings.Movies, значения округляются до 2 знаков, а дисперсия считается от округленного среднего,
+            но точно (см. exact_variance). Ratings.Movies суммирует числа с плавающей точкой по порядку оценок,
+            поэтому там, где точная дисперсия ровно на середине между сотыми, она может отличаться на 0.01"""
+            count = sum(histogram)
+            total = sum(amount * (index + 1) / 2 for index, amount in enumerate(histogram))
+            average = round(total / count, 2)
+
+            def nth(position):
+                for index, amount in enumerate(histogram):
+                    position -= amount
+                    if position < 0:
+                        return (index + 1) / 2
+
+            if count % 2 == 0:
+                median = round((nth(count // 2 - 1) + nth(count // 2)) / 2, 2)
+            else:
+                median = round(nth(count // 2), 2)
+            return count, average, median, Ratings.External.exact_variance(histogram, count, average)[0]
+
+        @staticmethod
+        def exact_variance(histogram, count, average):
+            """По гистограмме полузвезд, числу оценок и округленному среднему возвращает пару
+            (дисперсия, округленная до 2 знаков половин к четному, лежит ли она на границе округления).
+            Считается в целых сотых, поэтому не зависит от порядка оценок. На границе (с запасом на ошибку
+            суммирования с плавающей точкой) результат Ratings.Movies зависит от порядка оценок"""
+            if count < 2:
+                return 0.00, False
+            mean = round(average * 100)
+            squares = sum(amount * (50 * (index + 1) - mean) ** 2 for index, amount in enumerate(histogram))
+            # squares / 10000 / (count - 1) в сотых
+            denominator = 100 * (count - 1)
+            quotient, remainder = divmod(squares, denominator)
+            if 2 * remainder > denominator or (2 * remainder == denominator and quotient % 2):
+                quotient += 1
+            boundary = abs(2 * remainder - denominator) <= denominator * count * 2e-11 * (quotient / 100 + 1)
+            return quotient / 100, boundary
+
+        def stats(self):
+            """Возвращает пару словарей (movie_stats, user_stats), при первом вызове запускает агрегацию"""
+            if self.movie_stats is None:
+                self.aggregate()
+            return self.movie_stats, self.user_stats
+
+        def titles(self):
+            """Словарь movieId -> название по всему movies.csv (а не только по первым 1000 фильмам self.parent.movies).
+            Файл читается потоком один раз, результат кешируется"""
+            if self.movie_titles is None:
+                self.movie_titles = {movie["movieId"]: movie["title"] for movie in self.parent.outer_movies.iter_movies()}
+            return self.movie_titles
+
+        def by_title(self, position, n, rated_only=True):
+            """Сопоставляет статистику фильмов с названиями из всего movies.csv
+            и возвращает top-n по убыванию значения с индексом position в кортеже статистики"""
+            movie_stats = self.stats()[0]
+            values = {}
+            for movie_id, title in self.titles().items():
+                if movie_id in movie_stats:
+                    values[title] = movie_stats[movie_id][position]
+                elif not rated_only:
+                    values[title] = 0
+            return dict(Profiler.sorted(values.items(), key=lambda item: item[1], reverse=True)[:n])
+
+        def by_user(self, position, n=None):
+            """Возвращает пользователей по убыванию значения с индексом position (при равенстве - по userId)"""
+            user_stats = self.stats()[1]
+            values = Profiler.sorted(((user_id, stats[position]) for user_id, stats in user_stats.items()), key=lambda item: item[0])
+            ordered = Profiler.sorted(values, key=lambda item: item[1], reverse=True)
+            return dict(ordered if n is None else ordered[:n])
+
+        def top_by_num_of_ratings(self, n):
+            """top-n movies by the number of ratings over the whole file (see Ratings.Movies.top_by_num_of_ratings)"""
+            return self.by_title(0, n, rated_only=False)
+
+        def top_by_ratings(self, n, metric="average"):
+            """top-n movies by the average or median of the ratings over the whole file (see Ratings.Movies.top_by_ratings)"""
+            return self.by_title(Backend.check_metric(metric), n)
+
+        def top_controversial(self, n):
+            """top-n movies by the variance of the ratings over the whole file (see Ratings.Movies.top_controversial)"""
+            return self.by_title(3, n)
+
+        def dist_users_by_num_of_ratings(self):
+            """distribution of users by the number of ratings over the whole file, sorted descendingly"""
+            return self.by_user(0)
+
+        def dist_users_by_rating(self, metric="average"):
+            """distribution of users by average or median ratings over the whole file, sorted descendingly"""
+            return self.by_user(Backend.check_metric(metric))
+
+        def top_controversial_users(self, n):
+            """top-n users with the biggest variance of their ratings over the whole file"""
+            return self.by_user(3, n)
+
+    class UserOffsets:
+        """Разреженный индекс смещений ratings.csv по userId.
+        Файл упорядочен по userId, поэтому все оценки пользователя идут подряд: для каждого пользователя
+        достаточно хранить смещение в байтах первой его строки. Индекс строится за один проход,
+        сохраняется рядом с файлом и по нему оценки одного пользователя читаются одним seek и одним read.
+        Статистики по всем пользователям считаются группировкой подряд идущих строк (run-length), без хеш-таблицы."""
+        MAGIC = b"MLUIDX1\n"
+        HEADER = struct.Struct("<qqq")
+
+        def __init__(self, parent, index_path=None):
+            """Конструктор
+            Принимает ссылку на экземпляр родительского класса Ratings и путь к файлу индекса
+            (по умолчанию ratings.csv.offsets рядом с ratings.csv)"""
+            self.parent = parent
+            self.index_path = index_path or parent.filepath + ".offsets"
+            self.user_ids = None
+            self.offsets = None
+
+        def build(self):
+            """Строит индекс одним проходом по файлу: user_ids - userId по возрастанию,
+            offsets - смещение первой строки каждого пользователя, последний элемент - размер файла.
+            Если файл не упорядочен по userId или сжат (смещения в байтах на диске тогда не имеют смысла),
+            выбрасывает исключение"""
+            if DataSource.is_compressed(self.parent.filepath):
+                raise Exception("Индекс смещений строится только для несжатого ratings.csv")
+            user_ids = array.array("q")
+            offsets = array.array("q")
+            with open(self.parent.filepath, "rb") as file:
+                if not self.parent.is_ratings_structure(file.readline().decode("utf-8")):
+                    raise Exception("Неверная структура файла")
+                offset = file.tell()
+                previous = None
+                for line in file:
+                    user_id = int(line[:line.index(b",")])
+                    if user_id != previous:
+                        if previous is not None and user_id < previous:
+                            raise Exception("ratings.csv is not sorted by userId")
+                        user_ids.append(user_id)
+                        offsets.append(offset)
+                        previous = user_id
+                    offset += len(line)
+                offsets.append(offset)
+            self.user_ids, self.offsets = user_ids, offsets
+            return self
+
+        def save(self):
+            """Сохраняет индекс в self.index_path вместе с размером и временем изменения ratings.csv"""
+            status = os.stat(self.parent.filepath)
+            with open(self.index_path, "wb") as file:
+                file.write(self.MAGIC)
+                file.write(self.HEADER.pack(status.st_size, status.st_mtime_ns, len(self.user_ids)))
+                self.user_ids.tofile(file)
+                self.offsets.tofile(file)
+            return self
+
+        def load(self):
+            """Загружает сохраненный индекс. Если его нет или ratings.csv с тех пор изменился,
+            строит индекс заново и сохраняет"""
+            status = os.stat(self.parent.filepath)
+            try:
+                with open(self.index_path, "rb") as file:
+                    if file.read(len(self.MAGIC)) != self.MAGIC:
+                        raise Exception("Неверная структура файла индекса")
+                    size, mtime, count = self.HEADER.unpack(file.read(self.HEADER.size))
+                    if (size, mtime) != (status.st_size, status.st_mtime_ns):
+                        raise Exception("Индекс устарел")
+                    user_ids, offsets = array.array("q"), array.array("q")
+                    user_ids.fromfile(file, count)
+                    offsets.fromfile(file, count + 1)
+                self.user_ids, self.offsets = user_ids, offsets
+            except Exception:
+                self.build().save()
+            return self
+
+        def user_ratings(self, user_id):
+            """Принимает userId. Возвращает список словарей с оценками пользователя
+            (как в Ratings.ratings), прочитанных одним seek. Для неизвестного пользователя - пустой список"""
+            if self.user_ids is None:
+                self.load()
+            position = bisect.bisect_left(self.user_ids, user_id)
+            if position == len(self.user_ids) or self.user_ids[position] != user_id:
+                return []
+            start, end = self.offsets[position], self.offsets[position + 1]
+            with open(self.parent.filepath, "rb") as file:
+                file.seek(start)
+                lines = file.read(end - start).decode("utf-8").splitlines()
+            ratings = []
+            for line in lines:
+                meta = line.split(",")
+                ratings.append({
+                    "userId": int(meta[0]),
+                    "movieId": int(meta[1]),
+                    "rating": float(meta[2]),
+                    "timestamp": int(meta[3]),
+                })
+            return ratings
+
+        def user_stats(self):
+            """Генератор по всем пользователям в порядке файла: кортежи (userId, число оценок, среднее, медиана, дисперсия).
+            Строки одного пользователя идут подряд, поэтому гистограмма нужна только для текущего пользователя"""
+            rows = self.parent.iter_ratings()
+            for user_id, user_rows in itertools.groupby(rows, key=lambda rating: rating["userId"]):
+                histogram = [0] * 10
+                for rating in user_rows:
+                    histogram[int(rating["rating"] * 2) - 1] += 1
+                yield (user_id, *Ratings.External.summarize(histogram))
+
+    class Sample:
+        """Приближенные статистики Ratings.Movies и Ratings.Users по случайной выборке с доверительными интервалами.
+
+        ratings.csv упорядочен по userId, поэтому первые строки файла - это выборка только первых пользователей.
+        Здесь файл читается блоками по block_size байт в случайном порядке, так что любая прочитанная часть -
+        случайная выборка блоков всего файла, и ответ уточняется по мере чтения (refine, stream).
+        Из прочитанных строк хранится выборка ограниченного размера size:
+        by=None - равномерная выборка (reservoir sampling) из size оценок;
+        by="movieId" или "userId" - стратифицированная: по reservoir из size оценок для каждого фильма (пользователя),
+        а число оценок в страте считается точно по прочитанной части.
+        Методы возвращают словари того же вида, что и точные методы, но значения - кортежи
+        (оценка, нижняя граница, верхняя граница) доверительного интервала уровня confidence, округленные до 2 знаков.
+        Строки одного блока - в основном оценки нескольких соседних пользователей и не независимы,
+        поэтому выборка двухступенчатая: дисперсия складывается из ошибки выборки блоков
+        (блок - кластер, оценка отношения линеаризацией) и ошибки простой случайной выборки строк.
+        Для медианы интервал строится по порядковым статистикам, для дисперсии - через s²·sqrt(2/(m-1)),
+        оба расширяются во столько же раз, во сколько полная ошибка среднего больше ошибки выборки строк.
+        Ошибка по блокам оценена по числу прочитанных блоков, поэтому вместо нормального квантиля берется
+        квантиль t-распределения с (число блоков - 1) степенями свободы, а пока прочитано меньше 2 блоков,
+        разброс оценить нельзя и интервал - весь возможный диапазон значений."""
+        LOWEST, HIGHEST = 0.5, 5.0
+        MIN_LINE_BYTES = len("1,1,5,0\n")
+
+        def __init__(self, parent, size=100000, by=None, block_size=64 * 1024, seed=0, confidence=0.95):
+            """Конструктор
+            Принимает ссылку на экземпляр родительского класса Ratings, размер выборки,
+            признак стратификации (None, "movieId" или "userId"), размер блока чтения, seed и уровень доверия"""
+            if by not in (None, "movieId", "userId"):
+                raise Exception("Your should send parameter by with None, 'movieId' or 'userId' value")
+            if DataSource.is_compressed(parent.filepath) or PackedRatings.is_packed(parent.filepath):
+                raise Exception("Sample reads random blocks and needs an uncompressed ratings.csv")
+            from statistics import NormalDist
+
+            self.parent = parent
+            self.size = size
+            self.by = by
+            self.block_size = block_size
+            self.random = random.Random(seed)
+            self.confidence = confidence
+            self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+            self.quantiles = {}
+            self.file_size = os.path.getsize(parent.filepath)
+            self.num_blocks = max(1, -(-self.file_size // block_size))
+            self.block_rows = []
+            self.bytes_read = 0
+            self.rows_read = 0
+            self.done = False
+            self.reservoir = []
+            self.strata = {}
+            self.seen = Counter()
+            self.lines = self.iter_rows()
+
+        def iter_rows(self):
+            """Генератор строк (userId, movieId, rating, timestamp, номер блока по порядку чтения)
+            из блоков файла в случайном порядке. Строка относится к блоку, в котором она начинается,
+            поэтому каждая строка читается ровно один раз"""
+            starts = list(range(0, self.file_size, self.block_size))
+            self.random.shuffle(starts)
+            with open(self.parent.filepath, "rb") as file:
+                for block, start in enumerate(starts):
+                    end = min(start + self.block_size, self.file_size)
+                    self.block_rows.append(0)
+                    if start == 0:
+                        file.seek(0)
+                        header = file.readline()
+                        if not self.parent.is_ratings_structure(header.decode("utf-8")):
+                            raise Exception("Неверная структура файла")
+                        self.bytes_read += len(header)
+                    else:
+                        file.seek(start - 1)
+                        file.readline()
+                    while file.tell() < end:
+                        line = file.readline()
+                        meta = line.split(b",")
+                        if len(meta) < 4:
+                            break
+                        self.bytes_read += len(line)
+                        self.block_rows[block] += 1
+                        yield int(meta[0]), int(meta[1]), float(meta[2]), int(meta[3]), block
+            self.done = True
+
+        def refine(self, rows=None):
+            """Читает еще до rows строк (по умолчанию - весь оставшийся файл) и обновляет выборку. Возвращает self"""
+            size, generator = self.size, self.random
+            position = 0 if self.by == "userId" else 1
+            for row in itertools.islice(self.lines, rows):
+                self.rows_read += 1
+                if self.by is None:
+                    if len(self.reservoir) < size:
+                        self.reservoir.append(row)
+                    else:
+                        index = generator.randrange(self.rows_read)
+                        if index < size:
+                            self.reservoir[index] = row
+                    continue
+                key = row[position]
+                self.seen[key] += 1
+                stratum = self.strata.get(key)
+                if stratum is None:
+                    stratum = self.strata[key] = []
+                if len(stratum) < size:
+                    stratum.append((row[2], row[4]))
+                else:
+                    index = generator.randrange(self.seen[key])
+                    if index < size:
+                        stratum[index] = (row[2], row[4])
+            return self
+
+        def stream(self, chunk_rows=100000):
+            """Генератор прогрессивного уточнения: после каждых chunk_rows строк отдает self,
+            по которому можно сразу получить текущие оценки"""
+            while not self.done:
+                self.refine(chunk_rows)
+                yield self
+
+        def progress(self):
+            """Возвращает долю прочитанного файла от 0 до 1"""
+            return 1.0 if self.done else self.bytes_read / self.file_size
+
+        def total_rows(self):
+            """Оценка числа строк во всем файле по прочитанной части"""
+            if self.done or self.bytes_read == 0:
+                return self.rows_read
+            return self.rows_read * self.file_size / self.bytes_read
+
+        def rows(self):
+            """Возвращает равномерную выборку в виде списка словарей, как Ratings.ratings.
+            Ее можно подставить в ratings.ratings вместо первых 1000 строк, чтобы точные методы считались без смещения"""
+            if self.by is not None:
+                raise Exception("rows() is available for a uniform sample (by=None)")
+            return [
+                {"userId": user_id, "movieId": movie_id, "rating": rating, "timestamp": timestamp}
+                for user_id, movie_id, rating, timestamp, _ in self.reservoir
+            ]
+
+        @staticmethod
+        def interval(value, error):
+            return round(value, 2), round(value - error, 2), round(value + error, 2)
+
+        @staticmethod
+        def correction(sampled, population):
+            """Поправка на конечность совокупности для выборки без возвращения"""
+            return math.sqrt(max(0.0, population - sampled) / (population - 1)) if population > 1 else 0.0
+
+        def quantile(self, clusters):
+            """Двусторонний квантиль уровня confidence t-распределения с clusters - 1 степенями свободы.
+            До 200 степеней свободы считается точно (функция распределения для целых степеней свободы -
+            конечная сумма по cos θ, см. Abramowitz, Stegun 26.7.3-4, квантиль - бисекцией по θ),
+            дальше - разложением Корниша-Фишера (26.7.5). Если блок один, ошибка по блокам равна нулю
+            и используется нормальный квантиль"""
+            freedom = clusters - 1
+            if freedom < 1:
+                return self.z
+            if freedom not in self.quantiles:
+                if freedom > 200:
+                    z = self.z
+                    terms = (
+                        (z ** 3 + z) / 4,
+                        (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96,
+                        (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384,
+                        (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160,
+                    )
+                    self.quantiles[freedom] = z + sum(term / freedom ** power for power, term in enumerate(terms, 1))
+                else:
+                    low, high = 0.0, math.pi / 2
+                    for _ in range(60):
+                        theta = (low + high) / 2
+                        if self.t_probability(theta, freedom) < self.confidence:
+                            low = theta
+                        else:
+                            high = theta
+                    self.quantiles[freedom] = math.sqrt(freedom) * math.tan((low + high) / 2)
+            return self.quantiles[freedom]
+
+        @staticmethod
+        def t_probability(theta, freedom):
+            """P(|T| < t) для t-распределения с целым числом степеней свободы freedom, где theta = atan(t / sqrt(freedom))"""
+            cosine = math.cos(theta) ** 2
+            term, total = 1.0, 1.0
+            if freedom % 2:
+                for power in range(1, (freedom - 1) // 2):
+                    term *= cosine * 2 * power / (2 * power + 1)
+                    total += term
+                series = math.sin(theta) * math.cos(theta) * total if freedom > 1 else 0.0
+                return 2 / math.pi * (theta + series)
+            for power in range(1, freedom // 2):
+                term *= cosine * (2 * power - 1) / (2 * power)
+                total += term
+            return math.sin(theta) * total
+
+        def unknown(self, clusters):
+            """Возвращает True, если прочитано меньше 2 блоков и разброс между блоками оценить нельзя"""
+            return clusters < 2 and not self.done
+
+        def cluster_error(self, y, x, clusters):
+            """Стандартная ошибка отношения sum(y)/sum(x), где y и x - суммы по блокам (словари блок -> сумма),
+            clusters - число блоков в выборке. Блоки без строк домена дают нулевой вклад"""
+            total = sum(x.values())
+            if clusters < 2 or total == 0:
+                return 0.0
+            ratio = sum(y.values()) / total
+            squares = sum((y.get(block, 0) - ratio * value) ** 2 for block, value in x.items())
+            correction = max(0.0, 1 - len(self.block_rows) / self.num_blocks)
+            return math.sqrt(correction * clusters / (clusters - 1) * squares) / total
+
+        def count(self, y, x, clusters):
+            """Оценка и интервал числа строк домена во всем файле по суммам по блокам:
+            y - строки домена в выборке, x - все строки выборки"""
+            population, sampled = self.total_rows(), sum(x.values())
+            if sampled == 0:
+                return self.interval(0, 0)
+            share = sum(y.values()) / sampled
+            if self.unknown(clusters):
+                # известно только, что уже прочитанные строки есть, а остаток файла может целиком принадлежать домену
+                rest = (self.file_size - self.bytes_read) / self.MIN_LINE_BYTES
+                return round(share * population, 2), round(sum(y.values()), 2), round(sum(y.values()) + rest, 2)
+            error = math.hypot(
+                math.sqrt(share * (1 - share) / sampled) * self.correction(sampled, population),
+                self.cluster_error(y, x, clusters),
+            )
+            return self.interval(share * population, self.quantile(clusters) * error * population)
+
+        def inflation(self, pairs, population, clusters):
+            """Среднее оценок pairs (пары (оценка, блок)), несмещенная дисперсия, ошибка среднего
+            и во сколько раз она больше ошибки простой случайной выборки строк"""
+            count = len(pairs)
+            average = sum(rating for rating, _ in pairs) / count
+            variance = sum((rating - average) ** 2 for rating, _ in pairs) / (count - 1) if count > 1 else 0.0
+            simple = math.sqrt(variance / count) * self.correction(count, population)
+            y, x = Counter(), Counter()
+            for rating, block in pairs:
+                y[block] += rating
+                x[block] += 1
+            error = math.hypot(simple, self.cluster_error(y, x, clusters))
+            return average, variance, error, error / simple if simple > 0 else 1.0
+
+        def mean(self, pairs, population, clusters):
+            """Среднее выборки из страты размером population и его интервал"""
+            average, variance, error, _ = self.inflation(pairs, population, clusters)
+            if (len(pairs) < 2 and population > 1) or self.unknown(clusters):
+                # по одной оценке (или одному блоку) о разбросе ничего не известно: интервал - вся шкала
+                return round(average, 2), self.LOWEST, self.HIGHEST
+            return self.interval(average, self.quantile(clusters) * error)
+
+        def median(self, pairs, population, clusters):
+            """Медиана выборки и интервал по порядковым статистикам (биномиальное приближение)"""
+            ordered = Profiler.sorted(rating for rating, _ in pairs)
+            count = len(ordered)
+            if count % 2 == 0:
+                median = (ordered[count // 2 - 1] + ordered[count // 2]) / 2
+            else:
+                median = ordered[count // 2]
+            if count >= population and self.done:
+                return self.interval(median, 0)
+            if count < 2 or self.unknown(clusters):
+                return round(median, 2), self.LOWEST, self.HIGHEST
+            half = self.quantile(clusters) * math.sqrt(count) / 2 * self.inflation(pairs, population, clusters)[3]
+            low = ordered[max(0, math.floor(count / 2 - half) - 1)]
+            high = ordered[min(count - 1, math.ceil(count / 2 + half))]
+            return round(median, 2), round(low, 2), round(high, 2)
+
+        def variance(self, pairs, population, clusters):
+            """Несмещенная дисперсия выборки и ее интервал"""
+            count = len(pairs)
+            if count < 2 and population < 2:
+                return self.interval(0.0, 0.0)
+            if count < 2 or self.unknown(clusters):
+                # наибольшая несмещенная дисперсия population значений на шкале [LOWEST, HIGHEST]
+                largest = (self.HIGHEST - self.LOWEST) ** 2 / 4 * population / (population - 1)
+                value = self.inflation(pairs, population, clusters)[1] if count > 1 else 0.0
+                return round(value, 2), 0.0, round(largest, 2)
+            _, variance, _, inflation = self.inflation(pairs, population, clusters)
+            error = self.quantile(clusters) * variance * math.sqrt(2 / (count - 1)) * self.correction(count, population) * inflation
+            return self.interval(variance, error)
+
+        def groups(self, key):
+            """Возвращает словарь: id (key - movieId или userId) ->
+            (интервал числа оценок, выборка пар (оценка, блок), оценка размера страты), и число блоков в выборке"""
+            if self.rows_read == 0:
+                self.refine(self.size)
+            position = 0 if key == "userId" else 1
+            if self.by is None:
+                pairs, y = {}, {}
+                for row in self.reservoir:
+                    pairs.setdefault(row[position], []).append((row[2], row[4]))
+                    counts = y.setdefault(row[position], Counter())
+                    counts[row[4]] += 1
+                x = Counter(row[4] for row in self.reservoir)
+                clusters, scale = len(x), self.total_rows() / len(self.reservoir)
+                return {
+                    id_: (self.count(y[id_], x, clusters), values, len(values) * scale)
+                    for id_, values in pairs.items()
+                }, clusters
+            if self.by != key:
+                raise Exception(f"The sample is stratified by {self.by}, not by {key}")
+            x = dict(enumerate(self.block_rows))
+            clusters, scale = len(x), self.total_rows() / self.rows_read
+            groups = {}
+            for id_, values in self.strata.items():
+                weight = self.seen[id_] / len(values)
+                y = Counter()
+                for _, block in values:
+                    y[block] += weight
+                groups[id_] = (self.count(y, x, clusters), values, self.seen[id_] * scale)
+            return groups, clusters
+
+        def statistic(self, name, values, population, clusters):
+            if name == "average":
+                return self.mean(values, population, clusters)
+            if name == "mean":
+                return self.median(values, population, clusters)
+            if name == "variance":
+                return self.variance(values, population, clusters)
+            Backend.check_metric(name)
+
+        def by_title(self, name, n):
+            """top-n фильмов из self.parent.movies по убыванию оценки статистики name"""
+            groups, clusters = self.groups("movieId")
+            values = {}
+            for movie in self.parent.movies:
+                if movie["movieId"] in groups:
+                    count, ratings, population = groups[movie["movieId"]]
+                    values[movie["title"]] = count if name == "count" else self.statistic(name, ratings, population, clusters)
+            return dict(Profiler.sorted(values.items(), key=lambda item: item[1][0], reverse=True)[:n])
+
+        def by_user(self, name, n=None):
+            """Пользователи по убыванию оценки статистики name (при равенстве - по userId)"""
+            groups, clusters = self.groups("userId")
+            values = []
+            for user_id, (count, ratings, population) in Profiler.sorted(groups.items()):
+                values.append((user_id, count if name == "count" else self.statistic(name, ratings, population, clusters)))
+            ordered = Profiler.sorted(values, key=lambda item: item[1][0], reverse=True)
+            return dict(ordered if n is None else ordered[:n])
+
+        def distribution(self, key_of):
+            """Оценки числа строк по значениям key_of(row) для равномерной выборки, по возрастанию значения"""
+            if self.by is not None:
+                raise Exception("Distributions are available for a uniform sample (by=None)")
+            if self.rows_read == 0:
+                self.refine(self.size)
+            x, y = Counter(), {}
+            for row in self.reservoir:
+                x[row[4]] += 1
+                counts = y.setdefault(key_of(row), Counter())
+                counts[row[4]] += 1
+            return {value: self.count(counts, x, len(x)) for value, counts in Profiler.sorted(y.items())}
+
+        def dist_by_year(self):
+            """approximate distribution of ratings by years (see Ratings.Movies.dist_by_year)"""
+            return self.distribution(lambda row: datetime.datetime.fromtimestamp(row[3]).year)
+
+        def dist_by_rating(self):
+            """approximate distribution of ratings by values (see Ratings.Movies.dist_by_rating)"""
+            return self.distribution(lambda row: row[2])
+
+        def top_by_num_of_ratings(self, n):
+            """approximate top-n movies by the number of ratings (see Ratings.Movies.top_by_num_of_ratings)"""
+            return self.by_title("count", n)
+
+        def top_by_ratings(self, n, metric="average"):
+            """approximate top-n movies by the average or median of the ratings (see Ratings.Movies.top_by_ratings)"""
+            Backend.check_metric(metric)
+            return self.by_title(metric, n)
+
+        def top_controversial(self, n):
+            """approximate top-n movies by the variance of the ratings (see Ratings.Movies.top_controversial)"""
+            return self.by_title("variance", n)
+
+        def dist_users_by_num_of_ratings(self):
+            """approximate distribution of users by the number of ratings (see Ratings.Users)"""
+            return self.by_user("count")
+
+        def dist_users_by_rating(self, metric="average"):
+            """approximate distribution of users by average or median ratings (see Ratings.Users)"""
+            Backend.check_metric(metric)
+            return self.by_user(metric)
+
+        def top_controversial_users(self, n):
+            """approximate top-n users with the biggest variance of their ratings (see Ratings.Users)"""
+            return self.by_user("variance", n)
+
+    class Trends:
+        """Скользящие (оконные) тренды рейтингов по фильмам и жанрам.
+        Все окна считаются за один проход по рейтингам, отсортированным по timestamp:
+        при сдвиге окна новые оценки добавляются в накопители, а вышедшие за окно - вычитаются,
+        поэтому статистика не пересчитывается заново для каждого окна."""
+        SECONDS_IN_DAY = 86400
+
+        def __init__(self, parent):
+            """Конструктор
+            Принимает ссылку на экземпляр родительского класса Ratings"""
+            self.parent = parent
+
+        def rolling_by_movie(self, window_days=30, step_days=1):
+            """
+            The method returns rolling counts and average ratings of every movie over a sliding window.
+            It is a dict where the keys are movie titles and the values are dicts
+            with window end dates as keys and (count, average) tuples as values.
+            Dates are sorted ascendingly. The averages are rounded to 2 decimals.
+            """
+            movies_by_id = {movie["movieId"]: movie for movie in self.parent.movies}
+
+            def keys_of(rating):
+                movie = movies_by_id.get(rating["movieId"])
+                return [movie["title"]] if movie else []
+
+            return self.rolling(keys_of, window_days, step_days)
+
+        def rolling_by_genre(self, window_days=30, step_days=1):
+            """
+            The method returns rolling counts and average ratings of every genre over a sliding window.
+            A rating counts towards every genre of the rated movie.
+            It is a dict where the keys are genres and the values are dicts
+            with window end dates as keys and (count, average) tuples as values.
+            Dates are sorted ascendingly. The averages are rounded to 2 decimals.
+            """
+            genres_by_id = {movie["movieId"]: movie["genres"].split("|") for movie in self.parent.movies}
+
+            def keys_of(rating):
+                return genres_by_id.get(rating["movieId"], [])
+
+            return self.rolling(keys_of, window_days, step_days)
+
+        def rolling(self, keys_of, window_days, step_days):
+            """Общий проход скользящего окна.
+            Принимает функцию keys_of, возвращающую список ключей (фильмов, жанров) для оценки,
+            ширину окна window_days и шаг step_days в днях.
+            Окно заканчивается на границе шага (полночь UTC) и включает оценки за последние window_days дней.
+            Точка добавляется только для тех ключей, чья статистика изменилась на этом шаге.
+            Если все оценки ключа вышли из окна, в точку пишется (0, 0.0)"""
+            if window_days <= 0 or step_days <= 0:
+                raise Exception("window_days and step_days should be positive")
+
+            window = window_days * self.SECONDS_IN_DAY
+            step = step_days * self.SECONDS_IN_DAY
+            events = Profiler.sorted(
+                ((rating["timestamp"], keys_of(rating), rating["rating"]) for rating in self.parent.ratings),
+                key=lambda event: event[0]
+            )
+            events = [event for event in events if event[1]]
+            trends = {}
+            if not events:
+                return trends
+
+            totals = {}
+            added = 0
+            removed = 0
+            end = (events[0][0] // step + 1) * step
+
+            while removed < len(events):
+                changed = set()
+
+                while added < len(events) and events[added][0] < end:
+                    timestamp, keys, score = events[added]
+                    for key in keys:
+                        total = totals.setdefault(key, [0, 0.0])
+                        total[0] += 1
+                        total[1] += score
+                        changed.add(key)
+                    added += 1
+
+                while removed < added and events[removed][0] < end - window:
+                    timestamp, keys, score = events[removed]
+                    for key in keys:
+                        total = totals[key]
+                        total[0] -= 1
+                        total[1] -= score
+                        changed.add(key)
+                    removed += 1
+
+                date = datetime.datetime.fromtimestamp(end, datetime.timezone.utc).date()
+                for key in changed:
+                    count, score_sum = totals[key]
+                    if count > 0:
+                        point = (count, round(score_sum / count, 2))
+                    else:
+                        point = (0, 0.0)
+                        del totals[key]
+                    trends.setdefault(key, {})[date] = point
+
+                # пропускаем шаги, на которых окно не меняется
+                next_times = [events[removed][0] + window] if removed < added else []
+                if added < len(events):
+                    next_times.append(events[added][0])
+                if not next_times:
+                    break
+                end = max(end + step, (min(next_times) // step + 1) * step)
+
+            return trends
+
+class RatingMatrix:
+    """Разреженная матрица оценок пользователи×фильмы.
+    userId и movieId перенумеровываются в непрерывные индексы 0..n-1, обе перенумерации хранятся
+    (user_ids/movie_ids - из индекса в id, user_index/movie_index - из id в индекс).
+
+    Матрица хранится сразу в двух видах:
+    CSR (по строкам-пользователям): indptr, indices, data
+    CSC (по столбцам-фильмам): col_indptr, col_indices, col_data
+
+    Индексы хранятся в array('i') по 4 байта, а оценки - в array('B') по 1 байту в виде числа полузвезд
+    (рейтинг * 2), т.к. шкала идет с шагом в ползвезды. Вместе с указателями строк и столбцов
+    это около 10-12 байт на оценку для обоих видов сразу."""
+
+    def __init__(self, ratings):
+        """Конструктор. Принимает список словарей рейтингов (как в Ratings.ratings).
+        Строит обе перенумерации и оба вида матрицы сортировкой подсчетом за линейное время"""
+        user_ids = Profiler.sorted({rating["userId"] for rating in ratings})
+        movie_ids = Profiler.sorted({rating["movieId"] for rating in ratings})
+        self.user_ids = array.array("i", user_ids)
+        self.movie_ids = array.array("i", movie_ids)
+        self.user_index = {user_id: index for index, user_id in enumerate(user_ids)}
+        self.movie_index = {movie_id: index for index, movie_id in enumerate(movie_ids)}
+        self.shape = (len(user_ids), len(movie_ids))
+
+        rows = array.array("i", (self.user_index[rating["userId"]] for rating in ratings))
+        cols = array.array("i", (self.movie_index[rating["movieId"]] for rating in ratings))
+        half_stars = array.array("B", (int(rating["rating"] * 2) for rating in ratings))
+
+        self.indptr, self.indices, self.data = self.compress(rows, cols, half_stars, self.shape[0])
+        self.col_indptr, self.col_indices, self.col_data = self.compress(cols, rows, half_stars, self.shape[1])
+
+    @staticmethod
+    def compress(major, minor, values, size):
+        """Сортировка подсчетом по индексу major.
+        Возвращает тройку (indptr, indices, data), где indices[indptr[i]:indptr[i + 1]] -
+        индексы minor для строки i. Порядок внутри строки совпадает с порядком входных данных"""
+        indptr = array.array("q", bytes(8 * (size + 1)))
+        for index in major:
+            indptr[index + 1] += 1
+        for index in range(size):
+            indptr[index + 1] += indptr[index]
+
+        position = array.array("q", indptr[:-1])
+        indices = array.array("i", bytes(4 * len(minor)))
+        data = array.array("B", bytes(len(values)))
+        for index, other, value in zip(major, minor, values):
+            slot = position[index]
+            indices[slot] = other
+            data[slot] = value
+            position[index] = slot + 1
+
+        return indptr, indices, data
+
+    def __len__(self):
+        """Количество оценок (ненулевых элементов) в матрице"""
+        return len(self.data)
+
+    def user_ratings(self, user_id):
+        """Принимает userId.
+        Возвращает словарь оценок пользователя: ключи - movieId, значения - рейтинги"""
+        row = self.user_index[user_id]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return {self.movie_ids[col]: self.data[slot] / 2 for slot, col in zip(range(start, end), self.indices[start:end])}
+
+    def movie_ratings(self, movie_id):
+        """Принимает movieId.
+        Возвращает словарь оценок фильма: ключи - userId, значения - рейтинги"""
+        col = self.movie_index[movie_id]
+        start, end = self.col_indptr[col], self.col_indptr[col + 1]
+        return {self.user_ids[row]: self.col_data[slot] / 2 for slot, row in zip(range(start, end), self.col_indices[start:end])}
+
+    def nbytes(self):
+        """Возвращает объем памяти в байтах, занимаемый массивами обоих видов матрицы"""
+        buffers = [self.indptr, self.indices, self.data, self.col_indptr, self.col_indices, self.col_data]
+        return sum(buffer.itemsize * len(buffer) for buffer in buffers)
+
+class PackedRatings:
+    """Компактный двоичный формат ratings.csv.
+
+    Оценки хранятся блоками по block_size строк, каждый блок независим и сжат zlib.
+    Внутри блока данные лежат по столбцам:
+    * userId, movieId и timestamp - разности с предыдущей строкой блока в zigzag-кодировке
+      (так отрицательные разности тоже малы), записанные одной на весь столбец шириной 1, 2, 4 или 8 байт;
+    * рейтинг - число полузвезд (0-10), по 4 бита, две оценки в байте.
+    Байты многобайтовых столбцов переставлены по разрядам (сначала все младшие байты, затем следующие),
+    так что старшие, почти всегда нулевые, байты идут подряд и хорошо сжимаются.
+    Так как файл упорядочен по userId и movieId, разности малы, и сжатый файл в разы меньше csv.
+    Ширина общая на столбец блока, а не своя у каждого числа (как в varint), чтобы декодирование шло
+    целыми массивами через array.frombytes, а не побайтовым циклом на Python."""
+    MAGIC = b"MLPACK1\n"
+    SUFFIX = ".mlpack"
+    BLOCK = struct.Struct("<II")
+    TYPECODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+    HIGH_NIBBLES = bytes(value >> 4 for value in range(256))
+    LOW_NIBBLES = bytes(value & 15 for value in range(256))
+
+    def __init__(self, path):
+        """Конструктор. Принимает путь к упакованному файлу"""
+        self.path = path
+
+    @staticmethod
+    def is_packed(path):
+        """Возвращает True, если путь указывает на упакованный файл оценок"""
+        return str(path).endswith(PackedRatings.SUFFIX)
+
+    @classmethod
+    def write(cls, ratings, path, block_size=65536):
+        """Упаковывает итерируемое ratings (словари как в Ratings.ratings) в файл path.
+        Возвращает число записанных оценок"""
+        total = 0
+        with open(path, "wb") as file:
+            file.write(cls.MAGIC)
+            rows = iter(ratings)
+            while True:
+                block = list(itertools.islice(rows, block_size))
+                if not block:
+                    break
+                payload = zlib.compress(cls.encode_block(block), 6)
+                file.write(cls.BLOCK.pack(len(block), len(payload)))
+                file.write(payload)
+                total += len(block)
+        return total
+
+    @classmethod
+    def encode_block(cls, block):
+        """Кодирует список оценок в несжатые байты блока"""
+        parts = []
+        for name in ("userId", "movieId", "timestamp"):
+            previous = 0
+            deltas = []
+            for rating in block:
+                delta = rating[name] - previous
+                previous = rating[name]
+                deltas.append(delta << 1 if delta >= 0 else ((-delta) << 1) - 1)
+            width = next(width for width in (1, 2, 4, 8) if max(deltas) < 1 << (8 * width))
+            column = array.array(cls.TYPECODES[width], deltas)
+            if sys.byteorder == "big":
+                column.byteswap()
+            data = column.tobytes()
+            parts.append(bytes([width]))
+            parts.extend(data[plane::width] for plane in range(width))
+
+        half_stars = bytearray(int(rating["rating"] * 2) for rating in block)
+        if len(half_stars) % 2:
+            half_stars.append(0)
+        parts.append(bytes((high << 4) | low for high, low in zip(half_stars[0::2], half_stars[1::2])))
+        return b"".join(parts)
+
+    @classmethod
+    def decode_block(cls, rows, payload):
+        """Декодирует несжатые байты блока из rows строк.
+        Возвращает кортеж столбцов (userIds, movieIds, число полузвезд, timestamps)"""
+        columns = []
+        position = 0
+        for _ in range(3):
+            width = payload[position]
+            data = bytearray(rows * width)
+            for plane in range(width):
+                start = position + 1 + plane * rows
+                data[plane::width] = payload[start:start + rows]
+            column = array.array(cls.TYPECODES[width])
+            column.frombytes(data)
+            if sys.byteorder == "big":
+                column.byteswap()
+            position += 1 + rows * width
+            columns.append(list(itertools.accumulate(map(cls.zigzag_decode, column))))
+
+        packed = payload[position:]
+        half_stars = bytearray(2 * len(packed))
+        half_stars[0::2] = packed.translate(cls.HIGH_NIBBLES)
+        half_stars[1::2] = packed.translate(cls.LOW_NIBBLES)
+        return columns[0], columns[1], half_stars[:rows], columns[2]
+
+    @staticmethod
+    def zigzag_decode(value):
+        return (value >> 1) ^ -(value & 1)
+
+    def iter_blocks(self):
+        """Генератор декодированных блоков: кортежи столбцов (userIds, movieIds, число полузвезд, timestamps)"""
+        with open(self.path, "rb") as file:
+            if file.read(len(self.MAGIC)) != self.MAGIC:
+                raise Exception("Неверная структура файла")
+            while True:
+                header = file.read(self.BLOCK.size)
+                if not header:
+                    break
+                rows, length = self.BLOCK.unpack(header)
+                yield self.decode_block(rows, zlib.decompress(file.read(length)))
+
+    def count(self):
+        """Возвращает число оценок в файле, читая только заголовки блоков"""
+        total = 0
+        with open(self.path, "rb") as file:
+            if file.read(len(self.MAGIC)) != self.MAGIC:
+                raise Exception("Неверная структура файла")
+            while True:
+                header = file.read(self.BLOCK.size)
+                if not header:
+                    break
+                rows, length = self.BLOCK.unpack(header)
+                total += rows
+                file.seek(length, os.SEEK_CUR)
+        return total
+
+    def iter_ratings(self):
+        """Генератор оценок в виде словарей с теми же полями, что у Ratings.iter_ratings"""
+        for user_ids, movie_ids, half_stars, timestamps in self.iter_blocks():
+            for user_id, movie_id, value, timestamp in zip(user_ids, movie_ids, half_stars, timestamps):
+                yield {"userId": user_id, "movieId": movie_id, "rating": value / 2, "timestamp": timestamp}
+
+    def histograms(self):
+        """Считает гистограммы полузвезд по фильмам и по пользователям прямо по столбцам блоков,
+        не создавая словарей для отдельных оценок. Возвращает пару словарей (по movieId, по userId)"""
+        movies, users = {}, {}
+        for user_ids, movie_ids, half_stars, _ in self.iter_blocks():
+            for movie_id, user_id, value in zip(movie_ids, user_ids, half_stars):
+                histogram = movies.get(movie_id)
+                if histogram is None:
+                    histogram = movies[movie_id] = [0] * 10
+                histogram[value - 1] += 1
+                histogram = users.get(user_id)
+                if histogram is None:
+                    histogram = users[user_id] = [0] * 10
+                histogram[value - 1] += 1
+        return movies, users
+
+class ItemSimilarity:
+    """Поиск похожих фильмов (item-item) по матрице оценок RatingMatrix.
+
+    Поддерживаемые метрики:
+    * cosine - косинус между векторами оценок фильмов
+    * adjusted_cosine - косинус после вычитания средней оценки пользователя
+    * pearson - корреляция Пирсона по пользователям, оценившим оба фильма
+
+    Полная матрица фильмы×фильмы не строится: столбцы обрабатываются блоками по block_size,
+    для каждого фильма блока скалярные произведения накапливаются только по фильмам,
+    у которых есть общие пользователи, и сразу обрезаются до k ближайших соседей.
+    Блоки можно считать в нескольких процессах (workers), а таблицу соседей - сохранить в файл
+    и потом загрузить без пересчета."""
+    METRICS = ("cosine", "adjusted_cosine", "pearson")
+    worker_state = None
+
+    def __init__(self, matrix, metric="cosine", k=20, min_support=5):
+        """Конструктор. Принимает матрицу RatingMatrix (например, Ratings.rating_matrix()),
+        метрику, число соседей k на фильм и минимальное число общих пользователей min_support"""
+        if metric not in self.METRICS:
+            raise Exception(f"Your should send parameter metric with one of the values: {', '.join(self.METRICS)}")
+        self.matrix = matrix
+        self.metric = metric
+        self.k = k
+        self.min_support = min_support
+        self.neighbours = {}
+
+    def build(self, block_size=256, workers=1):
+        """Считает k ближайших соседей для каждого фильма и сохраняет их в self.neighbours:
+        ключи - movieId (фильмы без соседей пропускаются), значения - списки пар (movieId соседа, похожесть), отсортированные по убыванию похожести.
+        При workers > 1 блоки столбцов считаются в пуле процессов"""
+        import concurrent.futures
+
+        state = self.prepare()
+        blocks = [(start, min(start + block_size, self.matrix.shape[1])) for start in range(0, self.matrix.shape[1], block_size)]
+
+        if workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=ItemSimilarity.init_worker, initargs=(state,)) as pool:
+                results = list(pool.map(ItemSimilarity.similarity_block, blocks))
+        else:
+            ItemSimilarity.init_worker(state)
+            results = [ItemSimilarity.similarity_block(block) for block in blocks]
+            ItemSimilarity.worker_state = None
+
+        movie_ids = self.matrix.movie_ids
+        self.neighbours = {}
+        for block in results:
+            for col, top in block:
+                if top:
+                    self.neighbours[movie_ids[col]] = [(movie_ids[other], similarity) for other, similarity in top]
+
+        return self.neighbours
+
+    def prepare(self):
+        """Готовит состояние для расчета блоков: значения оценок в CSR и CSC
+        (с вычитанием среднего пользователя для adjusted_cosine) и нормы столбцов"""
+        matrix = self.matrix
+        row_values = array.array("d", (value / 2 for value in matrix.data))
+        col_values = array.array("d", (value / 2 for value in matrix.col_data))
+
+        if self.metric == "adjusted_cosine":
+            user_means = array.array("d", bytes(8 * matrix.shape[0]))
+            for row in range(matrix.shape[0]):
+                start, end = matrix.indptr[row], matrix.indptr[row + 1]
+                if end > start:
+                    user_means[row] = sum(row_values[start:end]) / (end - start)
+                for slot in range(start, end):
+                    row_values[slot] -= user_means[row]
+            for slot, row in enumerate(matrix.col_indices):
+                col_values[slot] -= user_means[row]
+
+        norms = array.array("d", bytes(8 * matrix.shape[1]))
+        for col in range(matrix.shape[1]):
+            values = col_values[matrix.col_indptr[col]:matrix.col_indptr[col + 1]]
+            norms[col] = math.sqrt(sum(value * value for value in values))
+
+        return {
+            "metric": self.metric,
+            "k": self.k,
+            "min_support": self.min_support,
+            "indptr": matrix.indptr,
+            "indices": matrix.indices,
+            "row_values": row_values,
+            "col_indptr": matrix.col_indptr,
+            "col_indices": matrix.col_indices,
+            "col_values": col_values,
+            "norms": norms,
+        }
+
+    @staticmethod
+    def init_worker(state):
+        """Инициализатор процесса пула: сохраняет общее состояние один раз на процесс"""
+        ItemSimilarity.worker_state = state
+
+    @staticmethod
+    def similarity_block(block):
+        """Считает top-k соседей для столбцов из диапазона block = (start, end).
+        Возвращает список пар (индекс столбца, [(индекс соседа, похожесть), ...])"""
+        state = ItemSimilarity.worker_state
+        indptr, indices, row_values = state["indptr"], state["indices"], state["row_values"]
+        col_indptr, col_indices, col_values = state["col_indptr"], state["col_indices"], state["col_values"]
+        norms, metric, k, min_support = state["norms"], state["metric"], state["k"], state["min_support"]
+        result = []
+
+        for col in range(*block):
+            sums = {}
+            for slot in range(col_indptr[col], col_indptr[col + 1]):
+                row, value = col_indices[slot], col_values[slot]
+                for other_slot in range(indptr[row], indptr[row + 1]):
+                    other = indices[other_slot]
+                    if other == col:
+                        continue
+                    other_value = row_values[other_slot]
+                    acc = sums.get(other)
+                    if acc is None:
+                        acc = sums[other] = [0, 0.0, 0.0, 0.0, 0.0, 0.0]
+                    acc[0] += 1
+                    acc[1] += value * other_value
+                    if metric == "pearson":
+                        acc[2] += value
+                        acc[3] += other_value
+                        acc[4] += value * value
+                        acc[5] += other_value * other_value
+
+            similarities = []
+            for other, (count, dot, sum_x, sum_y, sum_xx, sum_yy) in sums.items():
+                if count < min_support:
+                    continue
+                if metric == "pearson":
+                    covariance = dot - sum_x * sum_y / count
+                    denominator = math.sqrt(max(sum_xx - sum_x * sum_x / count, 0.0) * max(sum_yy - sum_y * sum_y / count, 0.0))
+                else:
+                    covariance = dot
+                    denominator = norms[col] * norms[other]
+                if denominator > 0:
+                    similarities.append((other, round(covariance / denominator, 4)))
+
+            result.append((col, heapq.nlargest(k, similarities, key=lambda item: (item[1], -item[0]))))
+
+        return result
+
+    def most_similar(self, movie_id, n=10):
+        """
+        The method returns top-n movies most similar to the given movieId.
+        It is a dict where the keys are movieIds and the values are similarities.
+        Sort it by similarity descendingly.
+        """
+        return dict(self.neighbours.get(movie_id, [])[:n])
+
+    def save(self, path):
+        """Сохраняет таблицу соседей в csv-файл формата movieId,neighbourId,similarity"""
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("movieId,neighbourId,similarity\n")
+            for movie_id, top in self.neighbours.items():
+                for other, similarity in top:
+                    file.write(f"{movie_id},{other},{similarity}\n")
+
+    def load(self, path):
+        """Загружает таблицу соседей, сохраненную методом save, в self.neighbours"""
+        neighbours = {}
+        with open(path, "r", encoding="utf-8") as file:
+            header_line = next(file).strip().split(",")
+            if header_line != ["movieId", "neighbourId", "similarity"]:
+                raise Exception("Неверная структура файла")
+            for line in file:
+                meta = line.strip().split(",")
+                neighbours.setdefault(int(meta[0]), []).append((int(meta[1]), float(meta[2])))
+        self.neighbours = neighbours
+        return neighbours
+
+class ALS:
+    """Матричная факторизация оценок методом чередующихся наименьших квадратов (alternating least squares).
+
+    Оценка пользователя u фильму i приближается как mean + <x_u, y_i>, где mean - средняя оценка,
+    x_u и y_i - векторы факторов длины factors. На каждой итерации при фиксированных факторах фильмов
+    для каждого пользователя решается своя регуляризованная задача наименьших квадратов, затем наоборот.
+    Задачи для разных пользователей (фильмов) независимы, поэтому диапазоны строк раздаются процессам пула.
+    Обучение останавливается, когда RMSE на отложенной выборке перестает улучшаться.
+    Если установлен NumPy (необязательная зависимость) и vectorized=True, системы для строк решаются пачками:
+    матрицы нормальных уравнений набираются reduceat по внешним произведениям, решаются numpy.linalg.solve,
+    а recommend считает оценки умножением матриц и берет top-n через argpartition.
+    Иначе все вычисления идут на чистом Python. В обоих случаях диапазоны строк раздаются процессам пула."""
+    worker_state = None
+    CHUNK = 65536
+
+    def __init__(self, matrix, factors=10, regularization=0.1, iterations=15, seed=0, vectorized=True):
+        """Конструктор. Принимает обучающую матрицу RatingMatrix, число факторов,
+        коэффициент регуляризации, максимальное число итераций, seed для начальных факторов
+        и признак использования NumPy, если он установлен"""
+        self.numpy = None
+        if vectorized:
+            try:
+                import numpy
+                self.numpy = numpy
+            except ImportError:
+                pass
+        self.matrix = matrix
+        self.factors = factors
+        self.regularization = regularization
+        self.iterations = iterations
+        self.seed = seed
+        self.mean = sum(matrix.data) / 2 / len(matrix) if len(matrix) else 0.0
+        self.user_factors = None
+        self.item_factors = None
+        self.history = []
+
+    @staticmethod
+    def train_test_split(ratings, test_share=0.1, seed=0):
+        """Принимает список словарей рейтингов.
+        Возвращает пару списков (train, test), где в test случайно отобрана доля test_share оценок"""
+        generator = random.Random(seed)
+        train, test = [], []
+        for rating in ratings:
+            (test if generator.random() < test_share else train).append(rating)
+        return train, test
+
+    def fit(self, validation=None, workers=1, patience=2, tolerance=1e-4):
+        """Обучает факторы. validation - список словарей рейтингов для отложенной оценки RMSE.
+        Если RMSE на validation не улучшается больше чем на tolerance patience итераций подряд,
+        обучение останавливается, и восстанавливаются факторы лучшей итерации.
+        Значения RMSE по итерациям сохраняются в self.history.
+        С NumPy каждый процесс пула решает свои диапазоны строк пачками через NumPy (см. fit_numpy)"""
+        import concurrent.futures
+
+        generator = random.Random(self.seed)
+        users, movies = self.matrix.shape
+        self.user_factors = array.array("d", bytes(8 * users * self.factors))
+        self.item_factors = array.array("d", (generator.gauss(0, 0.1) for _ in range(movies * self.factors)))
+        self.history = []
+        if self.numpy is not None:
+            return self.fit_numpy(validation, workers, patience, tolerance)
+
+        state = {
+            "factors": self.factors,
+            "regularization": self.regularization,
+            "mean": self.mean,
+            "user": (self.matrix.indptr, self.matrix.indices, self.matrix.data),
+            "item": (self.matrix.col_indptr, self.matrix.col_indices, self.matrix.col_data),
+        }
+        pool = None
+        if workers > 1:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=ALS.init_worker, initargs=(state,))
+        else:
+            ALS.init_worker(state)
+
+        best = None
+        stale = 0
+        try:
+            for _ in range(self.iterations):
+                self.user_factors = self.solve_side(pool, workers, "user", users, self.item_factors)
+                self.item_factors = self.solve_side(pool, workers, "item", movies, self.user_factors)
+                if not validation:
+                    continue
+
+                rmse = self.rmse(validation)
+                self.history.append(rmse)
+                if best is None or rmse < best[0] - tolerance:
+                    best = (rmse, self.user_factors, self.item_factors)
+                    stale = 0
+                else:
+                    stale += 1
+                    if stale >= patience:
+                        break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            else:
+                ALS.worker_state = None
+
+        if best is not None:
+            self.user_factors, self.item_factors = best[1], best[2]
+        return self
+
+    def fit_numpy(self, validation, workers, patience, tolerance):
+        """Итерации fit с решением систем через NumPy. Факторы хранятся плоскими массивами numpy.
+        Как и на чистом Python, при workers > 1 диапазоны строк раздаются процессам пула"""
+        import concurrent.futures
+
+        numpy = self.numpy
+        matrix = self.matrix
+        users, movies = matrix.shape
+        state = {
+            "factors": self.factors,
+            "regularization": self.regularization,
+            "user": (numpy.asarray(matrix.indptr), numpy.asarray(matrix.indices), numpy.asarray(matrix.data) / 2 - self.mean),
+            "item": (numpy.asarray(matrix.col_indptr), numpy.asarray(matrix.col_indices), numpy.asarray(matrix.col_data) / 2 - self.mean),
+        }
+        pool = None
+        if workers > 1:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=ALS.init_worker, initargs=(state,))
+        else:
+            ALS.init_worker(state)
+
+        user_factors = numpy.asarray(self.user_factors)
+        item_factors = numpy.asarray(self.item_factors)
+        best = None
+        stale = 0
+        try:
+            for _ in range(self.iterations):
+                user_factors = self.solve_side_numpy(pool, workers, "user", users, item_factors)
+                item_factors = self.solve_side_numpy(pool, workers, "item", movies, user_factors)
+                self.user_factors, self.item_factors = user_factors, item_factors
+                if not validation:
+                    continue
+
+                rmse = self.rmse(validation)
+                self.history.append(rmse)
+                if best is None or rmse < best[0] - tolerance:
+                    best = (rmse, user_factors, item_factors)
+                    stale = 0
+                else:
+                    stale += 1
+                    if stale >= patience:
+                        break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            else:
+                ALS.worker_state = None
+
+        if best is not None:
+            self.user_factors, self.item_factors = best[1], best[2]
+        return self
+
+    def solve_side_numpy(self, pool, workers, side, size, fixed):
+        """Векторный вариант solve_side: строки делятся на workers диапазонов, каждый решается solve_rows_numpy"""
+        chunk = max(1, -(-size // max(workers, 1)))
+        tasks = [(side, start, min(start + chunk, size), fixed) for start in range(0, size, chunk)]
+        if pool is not None:
+            parts = list(pool.map(ALS.solve_rows_numpy, tasks))
+        else:
+            parts = list(map(ALS.solve_rows_numpy, tasks))
+        return self.numpy.concatenate(parts) if parts else self.numpy.zeros(0)
+
+    @staticmethod
+    def solve_rows_numpy(task):
+        """Векторный вариант solve_rows для строк из диапазона [start, end) одной стороны.
+        В состоянии процесса сторона - тройка (indptr, indices, остатки оценок r - mean). Строки обрабатываются пачками
+        примерно по CHUNK оценок, чтобы массив внешних произведений (оценки × factors × factors) оставался небольшим"""
+        import numpy
+
+        side, start, end, fixed = task
+        state = ALS.worker_state
+        f, regularization = state["factors"], state["regularization"]
+        indptr, indices, residuals = state[side]
+        other = fixed.reshape(-1, f)
+        counts = numpy.diff(indptr)
+        identity = numpy.eye(f)
+        solved = numpy.zeros((end - start, f))
+        row = start
+        while row < end:
+            stop = int(numpy.searchsorted(indptr, indptr[row] + ALS.CHUNK, side="right")) - 1
+            stop = min(end, max(stop, row + 1))
+            begin, finish = int(indptr[row]), int(indptr[stop])
+            rows = numpy.arange(row, stop)[counts[row:stop] > 0]
+            if len(rows):
+                vectors = other[indices[begin:finish]]
+                starts = indptr[rows] - begin
+                matrices = numpy.add.reduceat(vectors[:, :, None] * vectors[:, None, :], starts, axis=0)
+                matrices += (regularization * counts[rows])[:, None, None] * identity
+                rhs = numpy.add.reduceat(vectors * residuals[begin:finish, None], starts, axis=0)
+                solved[rows - start] = numpy.linalg.solve(matrices, rhs[:, :, None])[:, :, 0]
+            row = stop
+        return solved.reshape(-1)
+
+    def solve_side(self, pool, workers, side, size, fixed):
+        """Пересчитывает факторы одной стороны (side = "user" или "item") при фиксированных факторах другой.
+        Строки делятся на workers диапазонов, результаты склеиваются в один массив"""
+        chunk = max(1, -(-size // max(workers, 1)))
+        tasks = [(side, start, min(start + chunk, size), fixed) for start in range(0, size, chunk)]
+        if pool is not None:
+            parts = pool.map(ALS.solve_rows, tasks)
+        else:
+            parts = map(ALS.solve_rows, tasks)
+        solved = array.array("d")
+        for part in parts:
+            solved.extend(part)
+        return solved
+
+    @staticmethod
+    def init_worker(state):
+        """Инициализатор процесса пула: сохраняет матрицу и параметры один раз на процесс"""
+        ALS.worker_state = state
+
+    @staticmethod
+    def solve_rows(task):
+        """Решает задачи наименьших квадратов для строк из диапазона [start, end) одной стороны.
+        Для строки с оценками r_j и фиксированными векторами y_j решается
+        (sum y_j y_j^T + regularization * n * I) x = sum (r_j - mean) y_j"""
+        side, start, end, fixed = task
+        state = ALS.worker_state
+        factors, regularization, mean = state["factors"], state["regularization"], state["mean"]
+        indptr, indices, data = state[side]
+        solved = array.array("d")
+
+        for row in range(start, end):
+            begin, finish = indptr[row], indptr[row + 1]
+            if begin == finish:
+                solved.extend([0.0] * factors)
+                continue
+
+            matrix = [[0.0] * factors for _ in range(factors)]
+            vector = [0.0] * factors
+            for slot in range(begin, finish):
+                offset = indices[slot] * factors
+                other = fixed[offset:offset + factors]
+                residual = data[slot] / 2 - mean
+                for a in range(factors):
+                    value = other[a]
+                    line = matrix[a]
+                    vector[a] += residual * value
+                    for b in range(a + 1):
+                        line[b] += value * other[b]
+
+            penalty = regularization * (finish - begin)
+            for a in range(factors):
+                matrix[a][a] += penalty
+            solved.extend(ALS.cholesky_solve(matrix, vector))
+
+        return solved
+
+    @staticmethod
+    def cholesky_solve(matrix, vector):
+        """Решает систему с симметричной положительно определенной матрицей разложением Холецкого.
+        Используется только нижний треугольник matrix"""
+        size = len(vector)
+        lower = [[0.0] * size for _ in range(size)]
+        for i in range(size):
+            for j in range(i + 1):
+                value = matrix[i][j] - sum(lower[i][k] * lower[j][k] for k in range(j))
+                lower[i][j] = math.sqrt(value) if i == j else value / lower[j][j]
+
+        forward = [0.0] * size
+        for i in range(size):
+            forward[i] = (vector[i] - sum(lower[i][k] * forward[k] for k in range(i))) / lower[i][i]
+        solution = [0.0] * size
+        for i in reversed(range(size)):
+            solution[i] = (forward[i] - sum(lower[k][i] * solution[k] for k in range(i + 1, size))) / lower[i][i]
+        return solution
+
+    def predict(self, user_id, movie_id):
+        """Принимает userId и movieId. Возвращает предсказанную оценку.
+        Для неизвестных пользователя или фильма возвращает среднюю оценку"""
+        user = self.matrix.user_index.get(user_id)
+        movie = self.matrix.movie_index.get(movie_id)
+        if user is None or movie is None:
+            return self.mean
+        f = self.factors
+        return self.mean + float(sum(map(operator.mul, self.user_factors[user * f:(user + 1) * f], self.item_factors[movie * f:(movie + 1) * f])))
+
+    def rmse(self, ratings):
+        """Принимает список словарей рейтингов. Возвращает RMSE предсказаний, округленный до 4 знаков"""
+        if not ratings:
+            return 0.0
+        squares = sum((self.predict(rating["userId"], rating["movieId"]) - rating["rating"]) ** 2 for rating in ratings)
+        return round(math.sqrt(squares / len(ratings)), 4)
+
+    def recommend(self, user_ids, n=10, exclude_rated=True):
+        """
+        The method returns top-n recommendations for every user from user_ids.
+        It is a dict where the keys are userIds and the values are dicts with movieIds as keys
+        and predicted ratings as values, sorted by predicted rating descendingly.
+        The values are rounded to 2 decimals. Already rated movies are skipped by default.
+        """
+        if self.numpy is not None:
+            return self.recommend_numpy(user_ids, n, exclude_rated)
+        f = self.factors
+        movie_ids = self.matrix.movie_ids
+        # факторы фильмов по столбцам: оценки всех фильмов для пользователя набираются покомпонентно
+        columns = [self.item_factors[a::f] for a in range(f)]
+        recommendations = {}
+
+        for user_id in user_ids:
+            user = self.matrix.user_index.get(user_id)
+            if user is None:
+                recommendations[user_id] = {}
+                continue
+            scores = [self.mean] * len(movie_ids)
+            for a, weight in enumerate(self.user_factors[user * f:(user + 1) * f]):
+                scores = list(map(operator.add, scores, map(weight.__mul__, columns[a])))
+
+            if exclude_rated:
+                for slot in range(self.matrix.indptr[user], self.matrix.indptr[user + 1]):
+                    scores[self.matrix.indices[slot]] = -math.inf
+            top = heapq.nlargest(n, range(len(scores)), key=scores.__getitem__)
+            recommendations[user_id] = {movie_ids[movie]: round(scores[movie], 2) for movie in top if scores[movie] > -math.inf}
+
+        return recommendations
+
+    def recommend_numpy(self, user_ids, n=10, exclude_rated=True, batch=1024):
+        """recommend через NumPy: оценки пачки пользователей - mean + factors @ item_factors.T,
+        top-n - argpartition и сортировка только кандидатов (при равенстве - по индексу фильма, как в heapq.nlargest)"""
+        numpy = self.numpy
+        f = self.factors
+        matrix = self.matrix
+        movie_ids = matrix.movie_ids
+        item_factors = numpy.asarray(self.item_factors).reshape(-1, f)
+        user_factors = numpy.asarray(self.user_factors).reshape(-1, f)
+        indptr, indices = matrix.indptr, matrix.indices
+        recommendations = {user_id: {} for user_id in user_ids}
+        known = [(user_id, matrix.user_index[user_id]) for user_id in user_ids if user_id in matrix.user_index]
+        top_size = min(n, len(movie_ids))
+        for start in range(0, len(known), batch):
+            part = known[start:start + batch]
+            rows = numpy.array([user for _, user in part], dtype=numpy.int64)
+            scores = self.mean + user_factors[rows] @ item_factors.T
+            if exclude_rated:
+                for position, (_, user) in enumerate(part):
+                    scores[position, numpy.asarray(indices[indptr[user]:indptr[user + 1]], dtype=numpy.int64)] = -numpy.inf
+            if top_size == 0:
+                continue
+            candidates = numpy.argpartition(-scores, top_size - 1, axis=1)[:, :top_size]
+            for position, (user_id, _) in enumerate(part):
+                # все фильмы с оценкой не ниже n-й, чтобы равные значения на границе брались по меньшему индексу
+                chosen = numpy.flatnonzero(scores[position] >= scores[position, candidates[position]].min())
+                values = scores[position, chosen]
+                order = numpy.lexsort((chosen, -values))[:top_size]
+                recommendations[user_id] = {
+                    movie_ids[movie]: round(float(value), 2)
+                    for movie, value in zip(chosen[order].tolist(), values[order].tolist()) if value > -math.inf
+                }
+        return recommendations
+
+class CountMinSketch:
+    """Count-Min Sketch: приближенные счетчики для целочисленных ключей (userId, movieId) в фиксированной памяти.
+    Оценка никогда не меньше точного значения и превышает его не больше чем на epsilon * total
+    с вероятностью не меньше 1 - delta, где epsilon = e / width, delta = e ** -depth.
+    Два скетча с одинаковыми width, depth и seed можно сложить методом merge."""
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, width=2048, depth=5, seed=0):
+        """Конструктор. Принимает ширину и глубину таблицы счетчиков и seed хеш-функций"""
+        generator = random.Random(seed)
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.hashes = [(generator.randrange(1, self.PRIME), generator.randrange(self.PRIME)) for _ in range(depth)]
+        self.table = [array.array("q", bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    def add(self, key, count=1):
+        """Увеличивает счетчик ключа key на count"""
+        for (a, b), row in zip(self.hashes, self.table):
+            row[(a * key + b) % self.PRIME % self.width] += count
+        self.total += count
+
+    def estimate(self, key):
+        """Возвращает оценку сверху для счетчика ключа key"""
+        return min(row[(a * key + b) % self.PRIME % self.width] for (a, b), row in zip(self.hashes, self.table))
+
+    def merge(self, other):
+        """Прибавляет к скетчу скетч other с теми же параметрами"""
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise Exception("Sketches should have the same width, depth and seed")
+        for row, other_row in zip(self.table, other.table):
+            for index, value in enumerate(other_row):
+                row[index] += value
+        self.total += other.total
+        return self
+
+    def error_bound(self):
+        """Возвращает пару (максимальное завышение оценки, вероятность его превысить)"""
+        return math.e / self.width * self.total, math.exp(-self.depth)
+
+
+class SpaceSaving:
+    """Алгоритм Space-Saving для поиска самых частых ключей потока (heavy hitters) в фиксированной памяти.
+    Хранит не больше capacity счетчиков. Для каждого ключа счетчик завышен не больше чем на его error,
+    а error не больше total / capacity. Любой ключ с частотой больше total / capacity гарантированно отслеживается.
+    Итоги нескольких потоков объединяются методом merge."""
+
+    def __init__(self, capacity=100):
+        """Конструктор. Принимает максимальное число отслеживаемых ключей"""
+        self.capacity = capacity
+        self.counters = {}
+        self.heap = []
+        self.total = 0
+
+    def add(self, key, count=1):
+        """Учитывает count появлений ключа key.
+        Если ключ не отслеживается и места нет, он вытесняет ключ с минимальным счетчиком и наследует его счетчик как ошибку"""
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[key] = [0, 0]
+            else:
+                minimum, evicted = self.pop_min()
+                del self.counters[evicted]
+                counter = self.counters[key] = [minimum, minimum]
+        counter[0] += count
+        heapq.heappush(self.heap, (counter[0], key))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(value[0], tracked) for tracked, value in self.counters.items()]
+            heapq.heapify(self.heap)
+
+    def pop_min(self):
+        """Возвращает пару (минимальный счетчик, ключ). Устаревшие записи кучи пропускаются"""
+        while True:
+            count, key = heapq.heappop(self.heap)
+            counter = self.counters.get(key)
+            if counter is not None and counter[0] == count:
+                return count, key
+
+    def minimum(self):
+        """Минимальный счетчик среди отслеживаемых ключей, если все места заняты, иначе 0"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    def top(self, n):
+        """Возвращает список из n троек (ключ, оценка счетчика, максимальная ошибка), отсортированных по убыванию оценки"""
+        top = heapq.nlargest(n, self.counters.items(), key=lambda item: (item[1][0], -item[0]))
+        return [(key, count, error) for key, (count, error) in top]
+
+    def merge(self, other):
+        """Объединяет с итогами другого потока other.
+        Отсутствующий в одном из итогов ключ получает минимальный счетчик этого итога как оценку сверху"""
+        if self.capacity != other.capacity:
+            raise Exception("Summaries should have the same capacity")
+        own_minimum, other_minimum = self.minimum(), other.minimum()
+        merged = {}
+        for key in set(self.counters) | set(other.counters):
+            own = self.counters.get(key, [own_minimum, own_minimum])
+            foreign = other.counters.get(key, [other_minimum, other_minimum])
+            merged[key] = [own[0] + foreign[0], own[1] + foreign[1]]
+        top = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        self.counters = dict(top)
+        self.heap = [(counter[0], key) for key, counter in self.counters.items()]
+        heapq.heapify(self.heap)
+        self.total += other.total
+        return self
+
+    def error_bound(self):
+        """Максимальное завышение любого счетчика: total / capacity"""
+        return self.total / self.capacity
+
+
+class HyperLogLog:
+    """HyperLogLog: оценка числа различных целочисленных ключей в фиксированной памяти (2 ** precision байт).
+    Относительная стандартная ошибка оценки около 1.04 / sqrt(2 ** precision).
+    Скетчи с одинаковой precision объединяются методом merge."""
+    MASK = (1 << 64) - 1
+
+    def __init__(self, precision=12):
+        """Конструктор. Принимает число бит, отводимых на номер регистра (от 4 до 16)"""
+        if not 4 <= precision <= 16:
+            raise Exception("precision should be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @staticmethod
+    def hash64(key):
+        """64-битный хеш целого числа (финализатор splitmix64), одинаковый во всех процессах"""
+        value = (key + 0x9E3779B97F4A7C15) & HyperLogLog.MASK
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & HyperLogLog.MASK
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & HyperLogLog.MASK
+        return value ^ (value >> 31)
+
+    def add(self, key):
+        """Учитывает ключ key"""
+        value = self.hash64(key)
+        index = value >> (64 - self.precision)
+        rest = (value << self.precision) & self.MASK
+        rank = min(64 - rest.bit_length() + 1, 64 - self.precision + 1)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        """Возвращает оценку числа различных ключей"""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        raw = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * size and zeros:
+            return round(size * math.log(size / zeros))
+        return round(raw)
+
+    def merge(self, other):
+        """Объединяет со скетчем other той же precision"""
+        if self.precision != other.precision:
+            raise Exception("Sketches should have the same precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def error_bound(self):
+        """Относительная стандартная ошибка оценки"""
+        return 1.04 / math.sqrt(len(self.registers))
+
 class Tags:
     """Все теги содержатся в файле `tags.csv`. Каждая строка этого файла после строки заголовка
     представляет одну оценку, примененную к одному фильму одним пользователем, и имеет следующий формат:
@@ -545,60 +3860,266 @@ class Tags:
     Значение, ценность и цель конкретного тега определяются каждым пользователем.
     Временные метки представляют собой секунды с полуночи по всемирному координированному времени (UTC) 1 января 1970 года."""
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, tags=None, backend="python", records=False):
+        """records=True - кроме списка тегов self.tags хранить первые 1000 строк tags.csv
+        в self.records (RecordTable строк Tag), тогда self.tags - столбец tag этой таблицы"""
         self.file_path = file_path
-        self.tags = self.read_file(self.file_path)
+        self.backend = Backend.create(backend)
+        self.records = None
+        if records and tags is None:
+            self.records = self.read_records(self.file_path)
+            tags = self.records.column("tag")
+        self.tags = tags if tags is not None else self.read_file(self.file_path)
     
     def read_file(self, path_to_file):
         tag_list = []
-        if self.is_tags_structure(path_to_file):
-            with open(path_to_file, 'r') as file:
-                lines = file.readlines()[1:1001]
+        with DataSource.open(path_to_file) as file:
+            if self.is_tags_structure(path_to_file, next(file, "")):
+                lines = itertools.islice(file, 1000)
                 tag_list = [line.split(',')[2].strip() for line in lines]
         return tag_list
+
+    def read_records(self, path_to_file):
+        """Читает первые 1000 строк tags.csv в RecordTable строк Tag.
+        Тег выделяется так же, как в read_file, поэтому self.tags совпадает в обоих режимах"""
+        table = RecordTable.from_rows(Tag, ())
+        with DataSource.open(path_to_file) as file:
+            if self.is_tags_structure(path_to_file, next(file, "")):
+                for line in itertools.islice(file, 1000):
+                    meta = line.split(',')
+                    table.append({"userId": int(meta[0]), "movieId": int(meta[1]), "tag": meta[2].strip(), "timestamp": int(meta[-1])})
+        return table
     
-    def is_tags_structure(self, path_to_file):
+    @staticmethod
+    def is_tags_structure(path_to_file, header_line=None):
         status = 1
         try:
-            with open(path_to_file, 'r', encoding='utf-8') as file:
-                header_line = next(file).strip().split(',')
-                if header_line[0] != "userId" or header_line[1] != "movieId" or header_line[2] != "tag" or header_line[3] != "timestamp":
-                    status = 0
-                    raise Exception("Неверная структура файла")
+            if header_line is None:
+                with DataSource.open(path_to_file) as file:
+                    header_line = next(file)
+            header_line = header_line.strip().split(',')
+            if header_line[0] != "userId" or header_line[1] != "movieId" or header_line[2] != "tag" or header_line[3] != "timestamp":
+                status = 0
+                raise Exception("Неверная структура файла")
         except Exception as e:
             print(f"Ошибка в чтении файла: {e}")
         return status
 
     def most_words(self, n):
+        if self.backend is not None:
+            return self.backend.most_words(self.tags, n)
         unique_tags = list(set(self.tags))
         word_counts = [(tag, len(tag.split())) for tag in unique_tags]
-        sorted_tags = sorted(word_counts, key=lambda x: x[1], reverse=True)
+        sorted_tags = Profiler.sorted(word_counts, key=lambda x: x[1], reverse=True)
         big_tags = {tag: count for tag, count in sorted_tags[:n]}
         return big_tags
 
     def longest(self, n):
+        if self.backend is not None:
+            return self.backend.longest(self.tags, n)
         unique_tags = list(set(self.tags)) 
-        big_tags = sorted(unique_tags, key=lambda x: len(x), reverse=True)
+        big_tags = Profiler.sorted(unique_tags, key=lambda x: len(x), reverse=True)
         return big_tags[:n]
 
     def most_words_and_longest(self, n):
+        if self.backend is not None:
+            return self.backend.most_words_and_longest(self.tags, n)
         most_words_set = set(self.most_words(n).keys())
         longest_set = set(self.longest(n))
         big_tags = list(most_words_set & longest_set)
         return big_tags
         
     def most_popular(self, n):
+        if self.backend is not None:
+            return self.backend.most_popular(self.tags, n)
         tag_counts = Counter(self.tags)
-        sorted_tags = list(sorted(tag_counts.items(), key=lambda item: item[1], reverse=True))
+        sorted_tags = list(Profiler.sorted(tag_counts.items(), key=lambda item: item[1], reverse=True))
         popular_tags = dict(sorted_tags[:n])
         return popular_tags
         
     def tags_with(self, word):
+        if self.backend is not None:
+            return self.backend.tags_with(self.tags, word)
         filtered_tags = [tag for tag in self.tags if word.lower() in tag.lower()]
         unique_tags = set(filtered_tags)
-        tags_with_word = sorted(unique_tags)
+        tags_with_word = Profiler.sorted(unique_tags)
         return tags_with_word
 
+    def to_frame(self, kind="pandas"):
+        """Returns the loaded tags as a pandas DataFrame or a pyarrow Table with a single column tag (see Export)"""
+        return Export.table({"tag": self.tags}, kind)
+
+class MovieMetadata:
+    """Метаданные фильмов из локальных выгрузок вместо загрузки страницы IMDb для каждого фильма.
+
+    Поддерживаются выгрузки IMDb в формате TSV (title.basics, title.crew и name.basics,
+    https://datasets.imdbws.com) и выгрузка TMDB в JSON (по объекту фильма на строку или один JSON-массив)
+    с полями id, imdb_id, title, budget, revenue, runtime и режиссером в credits.crew (job = Director) или в поле director.
+    Файлы могут быть сжаты (см. DataSource). Каждый файл читается одним потоковым проходом,
+    и в памяти остаются только фильмы с id из imdb_ids / tmdb_ids (если они заданы).
+    Из IMDb берутся название, продолжительность и первый режиссер, из TMDB - бюджет и сборы,
+    а также недостающие в IMDb поля."""
+
+    def __init__(self, imdb_ids=None, tmdb_ids=None):
+        """Конструктор. Принимает множества числовых imdbId и tmdbId, которые нужно сохранить (None - все)"""
+        self.imdb_ids = imdb_ids
+        self.tmdb_ids = tmdb_ids
+        self.imdb = {}
+        self.tmdb = {}
+        self.tmdb_by_imdb = {}
+
+    @classmethod
+    def from_links(cls, path_to_the_file):
+        """Создает пустой набор метаданных для всех фильмов из links.csv"""
+        imdb_ids, tmdb_ids = set(), set()
+        for movie in Links.read_file(path_to_the_file, None) or []:
+            imdb_ids.add(int(movie[1]))
+            if movie[2].strip():
+                tmdb_ids.add(int(movie[2]))
+        return cls(imdb_ids, tmdb_ids)
+
+    @staticmethod
+    def parse_id(value):
+        """Переводит id IMDb ("tt0114709", "0114709") или TMDB в число. Возвращает None для пустого значения"""
+        value = str(value).strip()
+        if value.startswith(("tt", "nm")):
+            value = value[2:]
+        return int(value) if value.isdigit() else None
+
+    @staticmethod
+    def read_tsv(path):
+        """Генератор строк TSV-файла IMDb в виде списков полей; "\\N" заменяется на None"""
+        with DataSource.open(path) as file:
+            header = next(file, "").rstrip("\n").split("\t")
+            yield header
+            for line in file:
+                yield [None if field == "\\N" else field for field in line.rstrip("\n").split("\t")]
+
+    def read_imdb(self, basics_path, crew_path=None, names_path=None):
+        """Читает title.basics (название и продолжительность), title.crew (режиссеры)
+        и name.basics (имена режиссеров). Возвращает self"""
+        rows = self.read_tsv(basics_path)
+        header = next(rows)
+        tconst, title, runtime = header.index("tconst"), header.index("primaryTitle"), header.index("runtimeMinutes")
+        for row in rows:
+            imdb_id = self.parse_id(row[tconst])
+            if self.imdb_ids is None or imdb_id in self.imdb_ids:
+                record = self.imdb.setdefault(imdb_id, {})
+                record["title"] = row[title]
+                record["runtime"] = int(row[runtime]) if row[runtime] else 0
+
+        if crew_path is not None:
+            rows = self.read_tsv(crew_path)
+            header = next(rows)
+            tconst, directors = header.index("tconst"), header.index("directors")
+            for row in rows:
+                imdb_id = self.parse_id(row[tconst])
+                if row[directors] and (self.imdb_ids is None or imdb_id in self.imdb_ids):
+                    self.imdb.setdefault(imdb_id, {})["director_id"] = self.parse_id(row[directors].split(",")[0])
+
+        if names_path is not None:
+            wanted = {record["director_id"] for record in self.imdb.values() if "director_id" in record}
+            names = {}
+            rows = self.read_tsv(names_path)
+            header = next(rows)
+            nconst, name = header.index("nconst"), header.index("primaryName")
+            for row in rows:
+                name_id = self.parse_id(row[nconst])
+                if name_id in wanted:
+                    names[name_id] = row[name]
+            for record in self.imdb.values():
+                if record.get("director_id") in names:
+                    record["director"] = names[record["director_id"]]
+        return self
+
+    @staticmethod
+    def iter_json_array(file, size=1 << 16):
+        """Генератор элементов JSON-массива из текстового файла, у которого уже прочитана открывающая скобка.
+        Файл читается кусками по size символов, каждый элемент разбирается json.JSONDecoder.raw_decode,
+        поэтому в памяти одновременно только текущий кусок и текущий элемент"""
+        decoder = json.JSONDecoder()
+        buffer, position, eof = "", 0, False
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    raise Exception("Неожиданный конец JSON-массива")
+                buffer, position = file.read(size), 0
+                eof = not buffer
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                end = len(buffer)
+            if end == len(buffer) and not eof:
+                # элемент (или число) может продолжаться в следующем куске
+                chunk = file.read(size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield value
+            position = end
+
+    def read_tmdb(self, path):
+        """Читает выгрузку TMDB в JSON Lines или JSON-массив. Возвращает self.
+        Оба формата читаются потоком: JSON Lines - по строке, массив - по элементу (см. iter_json_array)"""
+        with DataSource.open(path) as file:
+            first = file.read(1)
+            while first.isspace():
+                first = file.read(1)
+            if first == "[":
+                movies = self.iter_json_array(file)
+            else:
+                movies = (json.loads(line) for line in itertools.chain([first + file.readline()], file) if line.strip())
+            for movie in movies:
+                tmdb_id = self.parse_id(movie.get("id", ""))
+                imdb_id = self.parse_id(movie.get("imdb_id") or "")
+                if not (self.tmdb_ids is None or tmdb_id in self.tmdb_ids or self.imdb_ids is None or imdb_id in self.imdb_ids):
+                    continue
+                director = movie.get("director")
+                for person in (movie.get("credits") or {}).get("crew", []):
+                    if person.get("job") == "Director":
+                        director = person.get("name")
+                        break
+                record = {
+                    "title": movie.get("title"),
+                    "director": director,
+                    "budget": int(movie.get("budget") or 0),
+                    "gross": int(movie.get("revenue") or 0),
+                    "runtime": int(movie.get("runtime") or 0),
+                }
+                if tmdb_id is not None:
+                    self.tmdb[tmdb_id] = record
+                if imdb_id is not None:
+                    self.tmdb_by_imdb[imdb_id] = record
+        return self
+
+    def row(self, movie):
+        """Принимает строку links.csv в виде списка [movieId, imdbId, tmdbId].
+        Возвращает данные фильма в формате Links.parse_imdb: [imdbId, title, director, budget, gross, runtime]
+        или None, если фильма нет в выгрузках или у него неизвестна продолжительность"""
+        imdb_id = self.parse_id(movie[1])
+        tmdb_id = self.parse_id(movie[2]) if len(movie) > 2 else None
+        imdb = self.imdb.get(imdb_id, {})
+        tmdb = self.tmdb.get(tmdb_id) or self.tmdb_by_imdb.get(imdb_id) or {}
+        title = imdb.get("title") or tmdb.get("title")
+        runtime = imdb.get("runtime") or tmdb.get("runtime") or 0
+        if title is None or runtime <= 0:
+            return None
+        return [
+            movie[1],
+            title,
+            imdb.get("director") or tmdb.get("director") or "N/A",
+            tmdb.get("budget", 0),
+            tmdb.get("gross", 0),
+            runtime,
+        ]
+
 class Links:
     """Идентификаторы, которые можно использовать для ссылки на другие источники данных о фильмах, содержатся в файле `links.csv`.
     Каждая строка этого файла после строки заголовка представляет один фильм и имеет следующий формат:
@@ -608,49 +4129,59 @@ class Links:
     imdbId — это идентификатор фильмов, используемых <http://www.imdb.com>. Например, фильм «История игрушек» имеет ссылку <http://www.imdb.com/title/tt0114709/>.
     tmdbId — это идентификатор фильмов, используемых <https://www.themoviedb.org>. Например, фильм «История игрушек» имеет ссылку <https://www.themoviedb.org/movie/862>.
     Использование перечисленных выше ресурсов регулируется условиями каждого поставщика."""
-    def __init__(self, path_to_the_file):
+    def __init__(self, path_to_the_file, movie_list=None, metadata=None):
+        """Конструктор. Принимает путь к links.csv, необязательный уже прочитанный список фильмов
+        и необязательные локальные метаданные MovieMetadata. С метаданными читаются все строки links.csv,
+        а данные фильмов берутся из них без запросов к IMDb"""
         self.filepath = path_to_the_file
-        self.movie_list = self.read_file(self.filepath)
+        self.metadata = metadata
+        limit = None if metadata is not None else 2
+        self.movie_list = movie_list if movie_list is not None else self.read_file(self.filepath, limit)
         self.imdb = self.get_imdb()
     
     def get_imdb(self):
         movie_list = self.movie_list
-        sorted_movie_list = sorted(movie_list, key=lambda x: int(x[1]), reverse=True)
-        imdb_list = [self.parse_imdb(movie) for movie in sorted_movie_list]
+        sorted_movie_list = Profiler.sorted(movie_list, key=lambda x: int(x[1]), reverse=True)
+        parse = self.metadata.row if self.metadata is not None else self.parse_imdb
+        imdb_list = [parse(movie) for movie in sorted_movie_list]
         imdb_info = [x for x in imdb_list if x is not None]
         return imdb_info
     
     def top_directors(self, n):
         director_count = Counter(movie[2] for movie in self.imdb)
-        sorted_directors = sorted(director_count.items(), key=lambda item: item[1], reverse=True)
+        sorted_directors = Profiler.sorted(director_count.items(), key=lambda item: item[1], reverse=True)
         directors = dict(sorted_directors[:n])
         return directors
     
     def most_expensive(self, n):
         budget_data = [(movie[1], movie[3]) for movie in self.imdb]
-        sorted_movies = sorted(budget_data, key=lambda item: item[1], reverse=True)
+        sorted_movies = Profiler.sorted(budget_data, key=lambda item: item[1], reverse=True)
         budgets = dict(sorted_movies[:n])
         return budgets
     
     def most_profitable(self, n):
         profit_data = [(movie[1], movie[4] - movie[3]) for movie in self.imdb]
-        sorted_movies = sorted(profit_data, key=lambda item: item[1], reverse=True)
+        sorted_movies = Profiler.sorted(profit_data, key=lambda item: item[1], reverse=True)
         profits = dict(sorted_movies[:n])
         return profits
     
     def longest(self, n):
         runtime_data = [(movie[1], movie[5]) for movie in self.imdb]
-        sorted_movies = sorted(runtime_data, key=lambda item: item[1], reverse=True)
+        sorted_movies = Profiler.sorted(runtime_data, key=lambda item: item[1], reverse=True)
         runtimes = dict(sorted_movies[:n])
         return runtimes
     
     def top_cost_per_minute(self, n):
         cost_data = [(movie[1], round(movie[3] / movie[5], 2)) for movie in self.imdb]
-        sorted_movies = sorted(cost_data, key=lambda item: item[1], reverse=True)
+        sorted_movies = Profiler.sorted(cost_data, key=lambda item: item[1], reverse=True)
         costs = dict(sorted_movies[:n])
         return costs
     
     def parse_imdb(self, movie):
+        # requests и bs4 нужны только для загрузки страниц IMDb, поэтому импортируются при первом запросе
+        import requests
+        from bs4 import BeautifulSoup
+
         try:
             id = movie[1]
             url = f"https://www.imdb.com/title/tt{id}"
@@ -682,22 +4213,26 @@ class Links:
             return None
         return movie_data
     
-    def read_file(self, path_to_the_file):
+    @staticmethod
+    def read_file(path_to_the_file, limit=2):
         movie_list = []
-        if self.is_links_structure(path_to_the_file):
-            with open(path_to_the_file, 'r') as file:
-                lines = file.readlines()[1:3]
+        with DataSource.open(path_to_the_file) as file:
+            if Links.is_links_structure(path_to_the_file, next(file, "")):
+                lines = itertools.islice(file, limit)
                 movie_list = [line.split(',') for line in lines]
-            return movie_list
+                return movie_list
     
-    def is_links_structure(self, path_to_file):
+    @staticmethod
+    def is_links_structure(path_to_file, header_line=None):
         status = 1
         try:
-            with open(path_to_file, 'r', encoding='utf-8') as file:
-                header_line = next(file).strip().split(',')
-                if header_line[0] != "movieId" or header_line[1] != "imdbId" or header_line[2] != "tmdbId":
-                    status = 0
-                    raise Exception("Неверная структура файла")
+            if header_line is None:
+                with DataSource.open(path_to_file) as file:
+                    header_line = next(file)
+            header_line = header_line.strip().split(',')
+            if header_line[0] != "movieId" or header_line[1] != "imdbId" or header_line[2] != "tmdbId":
+                status = 0
+                raise Exception("Неверная структура файла")
         except Exception as e:
             print(f"Ошибка в чтении файла: {e}")
         return status
@@ -749,599 +4284,697 @@ class Links:
         
         return field_value
 
-class Tests:
-    """Тесты обязательно должны проверять:
-    1. Методы возвращают корректные типы данных
-    2. Списки элементов содержат корректные типы данных
-    3. Возвращаемые данные отсортированы корректно
-    Нужно запускать тесты перед переходом к следующему этапу задания"""
-
-################ FOR LINKS AND TAGS ################
-
-    @pytest.fixture
-    def links_obj(self):
-        links_test_data = Links('./ml_latest_small/links.csv')
-        return links_test_data
-
-    @pytest.fixture
-    def tags_obj(self):
-        tags_test_data = Tags('./ml_latest_small/tags.csv')
-        return tags_test_data
-
-################ MOVIES() ################
-
-    def test_movies_dist_by_release_data_type(self):
-        """Проверяет тип выходных данных"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.dist_by_release()
-        assert type(result) == collections.OrderedDict
-
-    def test_movies_dist_by_release_list_element_type(self):
-        """Проверяет тип данных внутри упорядоченного словаря"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.dist_by_release()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == int
-        assert type(first_value) == int
-
-    def test_movies_dist_by_release_sort(self):
-        """Проверяет корректность сортировки внутри упорядоченного списка"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.dist_by_release()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        second_key = list(result.keys())[1]
-        second_value = result[second_key]
-        third_key = list(result.keys())[2]
-        third_value = result[third_key]
-        assert first_value >= second_value
-        assert second_value >= third_value
-
-    def test_movies_dist_by_genres_data_type(self):
-        """Проверяет тип выходных данных"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.dist_by_genres()
-        assert type(result) == dict
-
-    def test_movies_dist_by_genres_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.dist_by_genres()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == str
-        assert type(first_value) == int
-
-    def test_movies_dist_by_genres_sort(self):
-        """Проверяет корректность сортировки внутри упорядоченного списка"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.dist_by_genres()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        second_key = list(result.keys())[1]
-        second_value = result[second_key]
-        third_key = list(result.keys())[2]
-        third_value = result[third_key]
-        assert first_value >= second_value
-        assert second_value >= third_value
-
-    def test_movies_most_genres_data_type(self):
-        """Проверяет тип выходных данных"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.most_genres(10)
-        assert type(result) == dict
-
-    def test_movies_most_genres_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.most_genres(10)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == str
-        assert type(first_value) == int
-
-    def test_movies_most_genres_sort(self):
-        """Проверяет корректность сортировки внутри упорядоченного списка"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.most_genres(10)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        second_key = list(result.keys())[1]
-        second_value = result[second_key]
-        third_key = list(result.keys())[2]
-        third_value = result[third_key]
-        assert first_value >= second_value
-        assert second_value >= third_value
-
-    def test_movies_most_genres_length(self):
-        """Проверяет длину полученного словаря"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.most_genres(10)
-        assert len(result) == 10
-
-    def test_movies_most_genres_by_years(self):
-        """Проверяет тип выходных данных"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.most_genres_by_years()
-        assert type(result) == dict
-
-    def test_movies_most_genres_by_years_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.most_genres_by_years()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == int
-        assert type(first_value) == str
-
-    def test_movies_most_genres_by_years_sort(self):
-        """Проверяет корректность сортировки внутри упорядоченного списка"""
-        movies = Movies("./ml_latest_small/movies.csv")
-        result = movies.most_genres_by_years()
-        first_key = list(result.keys())[0]
-        second_key = list(result.keys())[1]
-        third_key = list(result.keys())[2]
-        assert first_key <= second_key
-        assert second_key <= third_key
-
-################ RATINGS() ################
-
-    def test_ratings_dist_by_year_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.dist_by_year()
-        assert type(result) == dict
-
-    def test_ratings_dist_by_year_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.dist_by_year()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == int
-        assert type(first_value) == int
-
-    def test_ratings_dist_by_year_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.dist_by_year()
-        first_key = list(result.keys())[0]
-        second_key = list(result.keys())[1]
-        third_key = list(result.keys())[2]
-        assert first_key <= second_key
-        assert second_key <= third_key
-
-    def test_ratings_dist_by_rating_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.dist_by_rating()
-        assert type(result) == dict
-
-    def test_ratings_dist_by_rating_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.dist_by_rating()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == float
-        assert type(first_value) == int
-
-    def test_ratings_dist_by_rating_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.dist_by_rating()
-        first_key = list(result.keys())[0]
-        second_key = list(result.keys())[1]
-        third_key = list(result.keys())[2]
-        assert first_key <= second_key
-        assert second_key <= third_key
-
-    def test_ratings_top_by_num_of_ratings_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_num_of_ratings(10)
-        assert type(result) == dict
-
-    def test_ratings_top_by_num_of_ratings_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_num_of_ratings(10)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == str
-        assert type(first_value) == int
-
-    def test_ratings_top_by_num_of_ratings_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        n = 10
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_num_of_ratings(n)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        second_key = list(result.keys())[1]
-        second_value = result[second_key]
-        last_key = list(result.keys())[n - 1]
-        last_value = result[last_key]
-        assert first_value >= second_value
-        assert second_value >= last_value
-
-    def test_ratings_top_by_num_of_ratings_length(self):
-        """Проверяет длину полученного словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_num_of_ratings(10)
-        assert len(result) == 10
-
-    def test_ratings_top_by_ratings_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_ratings(100)
-        assert type(result) == dict
-
-    def test_ratings_top_by_ratings_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_ratings(100)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == str
-        assert type(first_value) == float
-
-    def test_ratings_top_by_ratings_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        n = 100
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_ratings(n)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        mid_key = list(result.keys())[int(n / 2)]
-        mid_value = result[mid_key]
-        last_key = list(result.keys())[n - 1]
-        last_value = result[last_key]
-        assert first_value >= mid_value
-        assert mid_value >= last_value
-
-    def test_ratings_top_by_ratings_length(self):
-        """Проверяет длину полученного словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_ratings(100)
-        assert len(result) == 100
-
-    def test_ratings_top_by_ratings_value_avg(self):
-        """Проверяет среднее значение"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_ratings(100)
-        assert result["Beauty and the Beast (1991)"] == 4.12
-
-    def test_ratings_top_by_ratings_value_mean(self):
-        """Проверяет медиану"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_by_ratings(100, "mean")
-        assert result["Beauty and the Beast (1991)"] == 4.25
-
-    def test_ratings_top_controversial_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_controversial(100)
-        assert type(result) == dict
-
-    def test_ratings_top_controversial_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_controversial(100)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == str
-        assert type(first_value) == float
-
-    def test_ratings_top_controversial_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        n = 100
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_controversial(n)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        mid_key = list(result.keys())[int(n / 2)]
-        mid_value = result[mid_key]
-        last_key = list(result.keys())[n - 1]
-        last_value = result[last_key]
-        assert first_value >= mid_value
-        assert mid_value >= last_value
-
-    def test_ratings_top_controversial_length(self):
-        """Проверяет длину полученного словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_controversial(100)
-        assert len(result) == 100
-
-    def test_ratings_top_controversial_value_variance(self):
-        """Проверяет длину полученного словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        result = ratings.inner_movies.top_controversial(100)
-        assert result["Independence Day (a.k.a. ID4) (1996)"] == 1.08
-
-    def test_dist_users_by_num_of_ratings_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_num_of_ratings()
-        assert type(result) == dict
-
-    def test_dist_users_by_num_of_ratings_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_num_of_ratings()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == int
-        assert type(first_value) == int
-
-    def test_dist_users_by_num_of_ratings_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_num_of_ratings()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        mid_key = list(result.keys())[1]
-        mid_value = result[mid_key]
-        last_key = list(result.keys())[2]
-        last_value = result[last_key]
-        assert first_value >= mid_value
-        assert mid_value >= last_value
-        
-    def test_dist_users_by_rating_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_rating()
-        assert type(result) == dict
-
-    def test_dist_users_by_rating_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_rating()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == int
-        assert type(first_value) == float
-
-    def test_dist_users_by_rating_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_rating()
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        mid_key = list(result.keys())[int(1)]
-        mid_value = result[mid_key]
-        last_key = list(result.keys())[2]
-        last_value = result[last_key]
-        assert first_value >= mid_value
-        assert mid_value >= last_value
-
-    def test_dist_users_by_rating_value_avg(self):
-        """Проверяет среднее значение"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_rating()
-        assert result[2] == 3.95
-
-    def test_dist_users_by_rating_value_mean(self):
-        """Проверяет медиану"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.dist_users_by_rating(metric="mean")
-        assert result[3] == 0.5
-
-    def test_top_controversial_users_data_type(self):
-        """Проверяет тип выходных данных"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.top_controversial_users(5)
-        assert type(result) == dict
-
-    def test_top_controversial_users_list_element_type(self):
-        """Проверяет тип данных внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.top_controversial_users(5)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        assert type(first_key) == int
-        assert type(first_value) == float
-
-    def test_top_controversial_users_sort(self):
-        """Проверяет корректность сортировки внутри словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.top_controversial_users(5)
-        first_key = list(result.keys())[0]
-        first_value = result[first_key]
-        mid_key = list(result.keys())[int(1)]
-        mid_value = result[mid_key]
-        last_key = list(result.keys())[2]
-        last_value = result[last_key]
-        assert first_value >= mid_value
-        assert mid_value >= last_value
-
-    def test_top_controversial_users_length(self):
-        """Проверяет длину полученного словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.top_controversial_users(5)
-        assert len(result) == 5
-
-    def test_top_controversial_users_variance(self):
-        """Проверяет длину полученного словаря"""
-        ratings = Ratings("./ml_latest_small/ratings.csv")
-        users = ratings.Users(ratings)
-        result = users.top_controversial_users(5)
-        assert result[3] == 4.37
-
-################ TAGS() ################
-
-    def test_most_words_return_type(self, tags_obj):
-        result = tags_obj.most_words(5)
-        assert isinstance(result, dict), "Returned value is not a dictionary"
-
-    def test_most_words_dict_element_type(self, tags_obj):
-        result = tags_obj.most_words(5)
-        for tag, count in result.items():
-            assert isinstance(tag, str), f"Tag {tag} is not a string"
-            assert isinstance(count, int), f"Value {count} is not an integer"
-        
-    def test_most_words_sort(self, tags_obj):
-        result = tags_obj.most_words(5)
-        counts = list(result.values())
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_longest_return_type(self, tags_obj):
-        result = tags_obj.longest(5)
-        assert isinstance(result, list), "Returned value is not a list"
-
-    def test_longest_list_element_type(self, tags_obj):
-        result = tags_obj.longest(5)
-        for tag in result:
-            assert isinstance(tag, str), f"Tag {tag} is not a string"
-
-    def test_longest_sort(self, tags_obj):
-        result = tags_obj.longest(5)
-        counts = [len(tag) for tag in result]
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_most_words_and_longest_return_type(self, tags_obj):
-        result = tags_obj.most_words_and_longest(5)
-        assert isinstance(result, list), "Returned value is not a list"
-
-    def test_most_words_and_longest_list_element_type(self, tags_obj):
-        result = tags_obj.most_words_and_longest(5)
-        for tag in result:
-            assert isinstance(tag, str), f"Tag {tag} is not a string"
-
-    def test_most_popular_return_type(self, tags_obj):
-        result = tags_obj.most_popular(5)
-        assert isinstance(result, dict), "Returned value is not a dictionary"
-
-    def test_most_popular_dict_element_type(self, tags_obj):
-        result = tags_obj.most_popular(5)
-        for tag, count in result.items():
-            assert isinstance(tag, str), f"Tag {tag} is not a string"
-            assert isinstance(count, int), f"Value {count} is not an integer"
-
-    def test_most_popular_sort(self, tags_obj):
-        result = tags_obj.most_popular(5)
-        counts = list(result.values())
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_tags_with_return_type(self, tags_obj):
-        result = tags_obj.tags_with('comedy')
-        assert isinstance(result, list), "Returned value is not a list"
-
-    def test_tags_with_list_element_type(self, tags_obj):
-        result = tags_obj.tags_with('comedy')
-        for tag in result:
-            assert isinstance(tag, str), f"Tag {tag} is not a string"
-
-    def test_tags_with_sort(self, tags_obj):
-        result = tags_obj.tags_with('comedy')
-        assert result == sorted(result), "The data is not sorted correctly"
-
-################ LINKS() ################
-
-    def test_get_imdb_return_type(self, links_obj):
-        result = links_obj.get_imdb()
-        assert isinstance(result, list), "Returned value is not a list"
-
-    def test_get_imdb_list_elements_type(self, links_obj):
-        result = links_obj.get_imdb()
-        for movie in result:
-            assert isinstance(movie, list), f"Value {movie} is not a list"
-            assert isinstance(movie[0], str), f"movieId {movie[0]} is not a string"
-            assert isinstance(movie[1], str), f"Title {movie[1]} is not a string"
-            assert isinstance(movie[2], str), f"Director {movie[2]} is not a string"
-            assert isinstance(movie[3], int), f"Budget {movie[3]} is not an integer"
-            assert isinstance(movie[4], int), f"CWG {movie[4]} is not an integer"
-            assert isinstance(movie[5], int), f"Minutes {movie[5]} is not an integer"
-
-    def test_get_imdb_sort(self, links_obj):
-        result = links_obj.get_imdb()
-        counts = [movie[0] for movie in result]
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_top_directors_return_type(self, links_obj):
-        result = links_obj.top_directors(5)
-        assert isinstance(result, dict), "Returned value is not a dictionary"
-
-    def test_top_directors_dict_elements_type(self, links_obj):
-        result = links_obj.top_directors(5)
-        for director, count in result.items():
-            assert isinstance(director, str), f"Director {director} is not a string"
-            assert isinstance(count, int), f"value {count} is not an integer"
-
-    def test_top_directors_sort(self, links_obj):
-        result = links_obj.top_directors(5)
-        counts = list(result.values())
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_most_expensive_return_type(self, links_obj):
-        result = links_obj.most_expensive(5)
-        assert isinstance(result, dict), "Returned value is not a dictionary"
-
-    def test_most_expensive_dict_element_type(self, links_obj):
-        result = links_obj.most_expensive(5)
-        for movie, budget in result.items():
-            assert isinstance(movie, str), f"Title {movie} is not a string"
-            assert isinstance(budget, int), f"Value {budget} is not an integer"
-
-    def test_most_expensive_sort(self, links_obj):
-        result = links_obj.most_expensive(5)
-        counts = list(result.values())
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_most_profitable_return_type(self, links_obj):
-        result = links_obj.most_profitable(5)
-        assert isinstance(result, dict), "Returned value is not a dictionary"
-
-    def test_most_profitable_dict_element_type(self, links_obj):
-        result = links_obj.most_profitable(5)
-        for movie, profit in result.items():
-            assert isinstance(movie, str), f"Title {movie} is not a string"
-            assert isinstance(profit, int), f"Value {profit} is not an integer"
-
-    def test_most_profitable_sort(self, links_obj):
-        result = links_obj.most_profitable(5)
-        counts = list(result.values())
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_longest_return_type(self, links_obj):
-        result = links_obj.longest(5)
-        assert isinstance(result, dict), "Returned value is not a dictionary"
-
-    def test_longest_dict_element_type(self, links_obj):
-        result = links_obj.longest(5)
-        for movie, minutes in result.items():
-            assert isinstance(movie, str), f"Title {movie} is not a string"
-            assert isinstance(minutes, int), f"Value {minutes} is not an integer"
-
-    def test_longest_sort(self, links_obj):
-        result = links_obj.longest(5)
-        counts = list(result.values())
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
-
-    def test_top_cost_per_minute_return_type(self, links_obj):
-        result = links_obj.top_cost_per_minute(5)
-        assert isinstance(result, dict), "Returned value is not a dictionary"
-
-    def test_top_cost_per_minute_dict_element_type(self, links_obj):
-        result = links_obj.top_cost_per_minute(5)
-        for movie, cost in result.items():
-            assert isinstance(movie, str), f"Title {movie} is not a string"
-            assert isinstance(cost, float), f"Value {cost} is not a float"
-
-    def test_top_cost_per_minute_sort(self, links_obj):
-        result = links_obj.top_cost_per_minute(5)
-        counts = list(result.values())
-        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+class LinksCrawler:
+    """Возобновляемая загрузка данных IMDb для всех фильмов links.csv в порядке популярности.
+
+    Фильмы обходятся по убыванию числа оценок в ratings.csv, поэтому самые просматриваемые загружаются первыми.
+    Результат каждого фильма сразу дописывается одной JSON-строкой в файл контрольной точки
+    (с flush и fsync), поэтому после падения обход продолжается ровно с первого незагруженного фильма,
+    а недописанная последняя строка отбрасывается. Обход можно запустить в фоновом потоке (start)
+    и во время работы получать частичные результаты (results, links, progress)."""
+
+    def __init__(self, links_path, ratings, checkpoint_path, fetch=None, delay=0.0):
+        """Конструктор. Принимает путь к links.csv, экземпляр Ratings (по нему считается популярность),
+        путь к файлу контрольной точки, функцию загрузки fetch(movie) в формате Links.parse_imdb
+        (по умолчанию загрузка страницы IMDb) и паузу между запросами в секундах.
+        Уже сохраненный прогресс загружается из контрольной точки"""
+        self.links_path = links_path
+        self.ratings = ratings
+        self.checkpoint_path = checkpoint_path
+        self.fetch = fetch if fetch is not None else Links(links_path, []).parse_imdb
+        self.delay = delay
+        self.queue = None
+        self.done = {}
+        self.failed = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.starting = threading.Lock()
+        self.thread = None
+        self.load()
+
+    def schedule(self):
+        """Возвращает все строки links.csv, упорядоченные по убыванию числа оценок фильма (при равенстве - по movieId).
+        Порядок считается один раз за проход по ratings.csv и кэшируется"""
+        if self.queue is None:
+            counts = Counter(rating["movieId"] for rating in self.ratings.iter_ratings())
+            movies = Links.read_file(self.links_path, None) or []
+            self.queue = Profiler.sorted(movies, key=lambda movie: (-counts.get(int(movie[0]), 0), int(movie[0])))
+        return self.queue
+
+    def load(self):
+        """Читает контрольную точку. Недописанная при падении последняя строка обрезается,
+        чтобы следующие записи не склеились с ней"""
+        if not os.path.exists(self.checkpoint_path):
+            return
+        valid = 0
+        with open(self.checkpoint_path, "rb") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid += len(line)
+                if "error" in entry:
+                    self.failed[entry["imdbId"]] = entry["error"]
+                else:
+                    self.failed.pop(entry["imdbId"], None)
+                    self.done[entry["imdbId"]] = entry["row"]
+        if valid != os.path.getsize(self.checkpoint_path):
+            with open(self.checkpoint_path, "r+b") as file:
+                file.truncate(valid)
+
+    def record(self, entry):
+        """Дописывает запись в контрольную точку и дожидается ее записи на диск"""
+        with open(self.checkpoint_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def pending(self, retry_failed=False):
+        """Возвращает еще не загруженные фильмы в порядке обхода.
+        Фильмы с ошибкой загрузки повторяются только при retry_failed=True"""
+        with self.lock:
+            return [
+                movie for movie in self.schedule()
+                if movie[1] not in self.done and (retry_failed or movie[1] not in self.failed)
+            ]
+
+    def run(self, limit=None, retry_failed=False):
+        """Загружает до limit фильмов (по умолчанию все оставшиеся) в порядке популярности.
+        Ошибка загрузки одного фильма записывается и не останавливает обход. Возвращает self"""
+        for movie in self.pending(retry_failed)[:limit]:
+            if self.stopping.is_set():
+                break
+            try:
+                row = self.fetch(movie)
+            except Exception as e:
+                print(f"Ошибка imdb: {e}")
+                self.record({"imdbId": movie[1], "error": str(e)})
+                with self.lock:
+                    self.failed[movie[1]] = str(e)
+            else:
+                self.record({"imdbId": movie[1], "row": row})
+                with self.lock:
+                    self.failed.pop(movie[1], None)
+                    self.done[movie[1]] = row
+            if self.delay:
+                self.stopping.wait(self.delay)
+        return self
+
+    def start(self, limit=None, retry_failed=False):
+        """Запускает run в фоновом потоке. Возвращает self.
+        Если фоновый обход уже идет, повторный вызов ничего не делает, чтобы два потока не загружали одни и те же фильмы"""
+        with self.starting:
+            if self.running():
+                return self
+            self.stopping.clear()
+            self.schedule()
+            self.thread = threading.Thread(target=self.run, args=(limit, retry_failed), daemon=True)
+            self.thread.start()
+        return self
+
+    def running(self):
+        """Возвращает True, пока фоновый обход, запущенный start, не завершился"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def stop(self, timeout=None):
+        """Просит фоновый обход остановиться после текущего фильма и ждет его завершения"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return self
+
+    def progress(self):
+        """Возвращает словарь с числом фильмов: всего, загружено, с ошибкой и осталось"""
+        total = len(self.schedule())
+        with self.lock:
+            done, failed = len(self.done), len(self.failed)
+        return {"total": total, "done": done, "failed": failed, "pending": total - done - failed}
+
+    def results(self):
+        """Возвращает уже загруженные данные в формате Links.imdb (по убыванию imdbId)"""
+        with self.lock:
+            rows = [row for row in self.done.values() if row is not None]
+        return Profiler.sorted(rows, key=lambda row: int(row[0]), reverse=True)
+
+    def links(self):
+        """Возвращает Links по уже загруженным фильмам, чтобы считать статистики, не дожидаясь конца обхода"""
+        links = Links(self.links_path, [])
+        with self.lock:
+            loaded = set(self.done)
+        links.movie_list = [movie for movie in self.schedule() if movie[1] in loaded]
+        links.imdb = self.results()
+        return links
+
+class Database:
+    """Встроенная база SQLite с таблицами movies, ratings, tags и links и индексами по movieId, userId и timestamp.
+
+    Файлы датасета (в том числе из zip-архива или сжатые, см. DataSource) загружаются целиком один раз,
+    после чего база на диске переиспользуется между сессиями: Database(path) на уже загруженном файле
+    ничего не читает заново, а режим WAL позволяет нескольким процессам читать ее одновременно.
+    Строки разбираются так же, как в классах Movies, Ratings, Tags и Links.
+    Вложенные классы Movies, Ratings (с Ratings.Movies и Ratings.Users), Tags и Links повторяют
+    сигнатуры и формат результатов одноименных классов, но считают по всем строкам агрегирующими запросами.
+    Для Ratings можно задать фильтр по времени, пользователю или фильму - он тоже идет через индекс."""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS movies (movieId INTEGER PRIMARY KEY, title TEXT, genres TEXT, year INTEGER, num_genres INTEGER);
+        CREATE TABLE IF NOT EXISTS genres (movieId INTEGER, genre TEXT);
+        CREATE TABLE IF NOT EXISTS ratings (userId INTEGER, movieId INTEGER, rating REAL, timestamp INTEGER);
+        CREATE TABLE IF NOT EXISTS tags (userId INTEGER, movieId INTEGER, tag TEXT, timestamp INTEGER, words INTEGER);
+        CREATE TABLE IF NOT EXISTS links (movieId INTEGER PRIMARY KEY, imdbId TEXT, tmdbId TEXT);
+        CREATE TABLE IF NOT EXISTS imdb (imdbId TEXT PRIMARY KEY, title TEXT, director TEXT, budget INTEGER, gross INTEGER, runtime INTEGER);
+    """
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS genres_movie ON genres (movieId);
+        CREATE INDEX IF NOT EXISTS ratings_movie ON ratings (movieId, rating);
+        CREATE INDEX IF NOT EXISTS ratings_user ON ratings (userId, rating);
+        CREATE INDEX IF NOT EXISTS ratings_timestamp ON ratings (timestamp);
+        CREATE INDEX IF NOT EXISTS tags_movie ON tags (movieId);
+        CREATE INDEX IF NOT EXISTS tags_user ON tags (userId);
+        CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+    """
+    TABLES = ("movies", "ratings", "tags", "links")
+
+    def __init__(self, path=":memory:"):
+        """Конструктор. Принимает путь к файлу базы (по умолчанию база в памяти)"""
+        # sqlite3 нужен только для этого класса, поэтому не замедляет импорт модуля
+        import sqlite3
+
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.create_function("lower_text", 1, str.lower, deterministic=True)
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        """Закрывает соединение с базой"""
+        self.connection.close()
+
+    def query(self, sql, params=()):
+        """Выполняет произвольный запрос и возвращает список строк результата"""
+        return self.connection.execute(sql, params).fetchall()
+
+    def count(self, table):
+        """Возвращает число строк в таблице table"""
+        if table not in self.TABLES + ("genres", "imdb"):
+            raise Exception(f"Unknown table {table}")
+        return self.query(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+    def is_loaded(self):
+        """Возвращает True, если в базе уже есть данные всех таблиц"""
+        return all(self.query(f"SELECT EXISTS (SELECT 1 FROM {table})")[0][0] for table in self.TABLES)
+
+    def load(self, directory, reload=False):
+        """Принимает директорию или zip-архив датасета.
+        Загружает все четыре таблицы целиком в одной транзакции и строит индексы после вставки.
+        Если база уже загружена и reload=False, ничего не делает. Возвращает self"""
+        if self.is_loaded() and not reload:
+            return self
+        with self.connection:
+            for table in self.TABLES + ("genres",):
+                self.connection.execute(f"DELETE FROM {table}")
+            self.load_movies(DataSource.find(directory, "movies.csv"))
+            self.load_ratings(DataSource.find(directory, "ratings.csv"))
+            self.load_tags(DataSource.find(directory, "tags.csv"))
+            self.load_links(DataSource.find(directory, "links.csv"))
+            self.connection.executescript(self.INDEXES)
+        self.connection.execute("ANALYZE")
+        return self
+
+    def load_movies(self, path):
+        """Загружает movies.csv: для каждого фильма сохраняются год из названия, число жанров и сами жанры"""
+        movies, genres = [], []
+        for movie in Movies(path, []).iter_movies():
+            movie_id, title, genres_string = movie["movieId"], movie["title"], movie["genres"]
+            match = re.search(r'\((\d{4})\)', title)
+            genres_list = genres_string.split("|")
+            movies.append((movie_id, title, genres_string, int(match.group(1)) if match else None, len(genres_list)))
+            genres.extend((movie_id, genre) for genre in genres_list)
+        self.connection.executemany("INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?)", movies)
+        self.connection.executemany("INSERT INTO genres VALUES (?, ?)", genres)
+
+    def load_ratings(self, path):
+        """Загружает ratings.csv (или упакованный файл PackedRatings) потоково, без списка в памяти"""
+        rows = Ratings(path, []).iter_ratings()
+        self.connection.executemany(
+            "INSERT INTO ratings VALUES (?, ?, ?, ?)",
+            ((rating["userId"], rating["movieId"], rating["rating"], rating["timestamp"]) for rating in rows),
+        )
+
+    def load_tags(self, path):
+        """Загружает tags.csv. Тег берется из третьего поля, как в Tags.read_file"""
+        with DataSource.open(path) as file:
+            if Tags.is_tags_structure(path, next(file, "")):
+                rows = (line.split(",") for line in file)
+                self.connection.executemany(
+                    "INSERT INTO tags VALUES (?, ?, ?, ?, ?)",
+                    ((int(meta[0]), int(meta[1]), meta[2].strip(), int(meta[-1]), len(meta[2].split())) for meta in rows),
+                )
+
+    def load_links(self, path):
+        """Загружает links.csv. Данные с IMDb загружаются отдельно через Database.Links"""
+        with DataSource.open(path) as file:
+            if Links.is_links_structure(path, next(file, "")):
+                rows = (line.strip().split(",") for line in file)
+                self.connection.executemany("INSERT OR REPLACE INTO links VALUES (?, ?, ?)", ((int(meta[0]), meta[1], meta[2]) for meta in rows))
+
+    class Movies:
+        """Методы Movies в виде запросов к таблицам movies и genres"""
+        def __init__(self, parent):
+            """Конструктор. Принимает ссылку на экземпляр родительского класса Database"""
+            self.parent = parent
+
+        def dist_by_release(self):
+            """years and counts, sorted by counts descendingly (see Movies.dist_by_release)"""
+            rows = self.parent.query("""
+                SELECT year, COUNT(*) FROM movies WHERE year IS NOT NULL
+                GROUP BY year ORDER BY COUNT(*) DESC, MIN(rowid)
+            """)
+            return collections.OrderedDict(rows)
+
+        def dist_by_genres(self):
+            """genres and counts, sorted by counts descendingly (see Movies.dist_by_genres)"""
+            return dict(self.parent.query("SELECT genre, COUNT(*) FROM genres GROUP BY genre ORDER BY COUNT(*) DESC, MIN(rowid)"))
+
+        def most_genres(self, n):
+            """first n movies and their numbers of genres, sorted by numbers descendingly (see Movies.most_genres)"""
+            rows = self.parent.query("""
+                SELECT title, num_genres FROM (SELECT rowid, title, num_genres FROM movies ORDER BY rowid LIMIT ?)
+                ORDER BY num_genres DESC, rowid
+            """, (n,))
+            return dict(rows)
+
+        def most_genres_by_years(self):
+            """the most popular genre of every year, sorted by years ascendingly (see Movies.most_genres_by_years)"""
+            rows = self.parent.query("""
+                SELECT year, genre FROM (
+                    SELECT movies.year, genres.genre, ROW_NUMBER() OVER (
+                        PARTITION BY movies.year ORDER BY COUNT(*) DESC, MIN(genres.rowid)
+                    ) AS place
+                    FROM genres JOIN movies ON movies.movieId = genres.movieId
+                    WHERE movies.year IS NOT NULL
+                    GROUP BY movies.year, genres.genre
+                ) WHERE place = 1 ORDER BY year
+            """)
+            return dict(rows)
+
+    class Ratings:
+        """Методы Ratings.Movies и Ratings.Users в виде запросов к таблице ratings.
+        Необязательный фильтр: start и end - границы timestamp (end не включается), user_id, movie_id"""
+        def __init__(self, parent, start=None, end=None, user_id=None, movie_id=None):
+            """Конструктор. Принимает ссылку на экземпляр родительского класса Database и условия фильтра"""
+            self.parent = parent
+            conditions, self.params = [], []
+            for condition, value in (("timestamp >= ?", start), ("timestamp < ?", end), ("userId = ?", user_id), ("movieId = ?", movie_id)):
+                if value is not None:
+                    conditions.append(condition)
+                    self.params.append(value)
+            self.where = " AND ".join(conditions) or "1"
+            self.inner_movies = self.Movies(self)
+
+        def query(self, sql, params=()):
+            """Выполняет запрос, в котором {where} заменяется на условие фильтра"""
+            return self.parent.query(sql.format(where=self.where), tuple(self.params) + tuple(params))
+
+        def histograms(self, key):
+            """Возвращает словарь: ключи - значения столбца key (movieId или userId) по возрастанию,
+            значения - гистограммы из 10 счетчиков по полузвездам. Группировка идет по индексу (key, rating)"""
+            histograms = {}
+            for value, rating, count in self.query(f"""
+                SELECT {key}, rating, COUNT(*) FROM ratings WHERE {{where}} GROUP BY {key}, rating ORDER BY {key}
+            """):
+                histograms.setdefault(value, [0] * 10)[int(rating * 2) - 1] = count
+            return histograms
+
+        def stats(self, key):
+            """Возвращает словарь: ключи - id, значения - кортежи (число оценок, среднее, медиана, дисперсия),
+            посчитанные так же, как в Ratings.External"""
+            return {value: Ratings.External.summarize(histogram) for value, histogram in self.histograms(key).items()}
+
+        class Movies:
+            """Методы Ratings.Movies в виде запросов"""
+            def __init__(self, parent):
+                """Конструктор. Принимает ссылку на экземпляр родительского класса Database.Ratings"""
+                self.parent = parent
+
+            def dist_by_year(self):
+                """years and counts of ratings, sorted by years ascendingly (see Ratings.Movies.dist_by_year)"""
+                return dict(self.parent.query("""
+                    SELECT CAST(strftime('%Y', timestamp, 'unixepoch', 'localtime') AS INTEGER) AS year, COUNT(*)
+                    FROM ratings WHERE {where} GROUP BY year ORDER BY year
+                """))
+
+            def dist_by_rating(self):
+                """ratings and counts, sorted by ratings ascendingly (see Ratings.Movies.dist_by_rating)"""
+                return dict(self.parent.query("SELECT rating, COUNT(*) FROM ratings WHERE {where} GROUP BY rating ORDER BY rating"))
+
+            def top_by_num_of_ratings(self, n):
+                """top-n movies by the number of ratings (see Ratings.Movies.top_by_num_of_ratings)"""
+                return dict(self.parent.query("""
+                    SELECT movies.title, COALESCE(counts.count, 0) FROM movies
+                    LEFT JOIN (SELECT movieId, COUNT(*) AS count FROM ratings WHERE {where} GROUP BY movieId) AS counts
+                    ON counts.movieId = movies.movieId
+                    ORDER BY COALESCE(counts.count, 0) DESC, movies.rowid LIMIT ?
+                """, (n,)))
+
+            def by_title(self, position, n):
+                """Возвращает top-n фильмов по убыванию значения с индексом position в кортеже статистики"""
+                movie_stats = self.parent.stats("movieId")
+                titles = self.parent.parent.query("SELECT movieId, title FROM movies ORDER BY rowid")
+                values = {title: movie_stats[movie_id][position] for movie_id, title in titles if movie_id in movie_stats}
+                return dict(Profiler.sorted(values.items(), key=lambda item: item[1], reverse=True)[:n])
+
+            def top_by_ratings(self, n, metric="average"):
+                """top-n movies by the average or median of the ratings (see Ratings.Movies.top_by_ratings)"""
+                return self.by_title(Backend.check_metric(metric), n)
+
+            def top_controversial(self, n):
+                """top-n movies by the variance of the ratings (see Ratings.Movies.top_controversial)"""
+                return self.by_title(3, n)
+
+        class Users(Movies):
+            """Методы Ratings.Users в виде запросов"""
+            def by_user(self, position, n=None):
+                """Возвращает пользователей по убыванию значения с индексом position (при равенстве - по userId)"""
+                user_stats = self.parent.stats("userId")
+                ordered = Profiler.sorted(((user_id, stats[position]) for user_id, stats in user_stats.items()), key=lambda item: item[1], reverse=True)
+                return dict(ordered if n is None else ordered[:n])
+
+            def dist_users_by_num_of_ratings(self):
+                """distribution of users by the number of ratings, sorted descendingly (see Ratings.Users)"""
+                return dict(self.parent.query("SELECT userId, COUNT(*) FROM ratings WHERE {where} GROUP BY userId ORDER BY COUNT(*) DESC, userId"))
+
+            def dist_users_by_rating(self, metric="average"):
+                """distribution of users by average or median ratings, sorted descendingly (see Ratings.Users)"""
+                return self.by_user(Backend.check_metric(metric))
+
+            def top_controversial_users(self, n):
+                """top-n users with the biggest variance of their ratings (see Ratings.Users)"""
+                return self.by_user(3, n)
+
+    class Tags:
+        """Методы Tags в виде запросов к таблице tags"""
+        def __init__(self, parent):
+            """Конструктор. Принимает ссылку на экземпляр родительского класса Database"""
+            self.parent = parent
+
+        def most_words(self, n):
+            """top-n unique tags by the number of words (see Tags.most_words)"""
+            return dict(self.parent.query("SELECT tag, MAX(words) FROM tags GROUP BY tag ORDER BY MAX(words) DESC, tag LIMIT ?", (n,)))
+
+        def longest(self, n):
+            """top-n unique tags by length (see Tags.longest)"""
+            return [row[0] for row in self.parent.query("SELECT DISTINCT tag FROM tags ORDER BY LENGTH(tag) DESC, tag LIMIT ?", (n,))]
+
+        def most_words_and_longest(self, n):
+            """tags that are both among top-n by words and top-n by length (see Tags.most_words_and_longest)"""
+            most_words = self.most_words(n)
+            return [tag for tag in self.longest(n) if tag in most_words]
+
+        def most_popular(self, n):
+            """top-n tags by the number of uses (see Tags.most_popular)"""
+            return dict(self.parent.query("SELECT tag, COUNT(*) FROM tags GROUP BY tag ORDER BY COUNT(*) DESC, MIN(rowid) LIMIT ?", (n,)))
+
+        def tags_with(self, word):
+            """unique tags containing word, case-insensitively, sorted alphabetically (see Tags.tags_with)"""
+            rows = self.parent.query("SELECT DISTINCT tag FROM tags WHERE instr(lower_text(tag), lower_text(?)) > 0 ORDER BY tag", (word,))
+            return [row[0] for row in rows]
+
+    class Links:
+        """Методы Links в виде запросов к таблице imdb.
+        Данные с IMDb загружаются один раз (get_imdb) и сохраняются в базе, поэтому в других сессиях не запрашиваются повторно"""
+        def __init__(self, parent, fetcher=None):
+            """Конструктор. Принимает ссылку на экземпляр родительского класса Database
+            и объект с методом parse_imdb(movie) (по умолчанию Links без загруженных фильмов)"""
+            self.parent = parent
+            self.fetcher = fetcher
+
+        def store(self, imdb):
+            """Сохраняет список данных фильмов в формате Links.imdb: [imdbId, title, director, budget, gross, runtime]"""
+            with self.parent.connection:
+                self.parent.connection.executemany("INSERT OR REPLACE INTO imdb VALUES (?, ?, ?, ?, ?, ?)", imdb)
+
+        def get_imdb(self):
+            """Загружает с IMDb фильмы из links, которых еще нет в базе, и возвращает все сохраненные
+            данные в формате Links.imdb, отсортированные по imdbId по убыванию"""
+            missing = self.parent.query("""
+                SELECT movieId, imdbId, tmdbId FROM links WHERE imdbId NOT IN (SELECT imdbId FROM imdb)
+                ORDER BY CAST(imdbId AS INTEGER) DESC
+            """)
+            if missing:
+                if self.fetcher is None:
+                    self.fetcher = Links(None, [])
+                self.store([row for row in (self.fetcher.parse_imdb(list(movie)) for movie in missing) if row is not None])
+            return [list(row) for row in self.parent.query("SELECT * FROM imdb ORDER BY CAST(imdbId AS INTEGER) DESC")]
+
+        def top(self, value, n):
+            """Возвращает top-n пар (название, value) по убыванию value, при равенстве - в порядке Links.imdb"""
+            return dict(self.parent.query(f"""
+                SELECT title, {value} FROM imdb ORDER BY {value} DESC, CAST(imdbId AS INTEGER) DESC LIMIT ?
+            """, (n,)))
+
+        def top_directors(self, n):
+            """top-n directors by the number of movies (see Links.top_directors)"""
+            return dict(self.parent.query("""
+                SELECT director, COUNT(*) FROM imdb GROUP BY director
+                ORDER BY COUNT(*) DESC, MAX(CAST(imdbId AS INTEGER)) DESC LIMIT ?
+            """, (n,)))
+
+        def most_expensive(self, n):
+            """top-n movies by budget (see Links.most_expensive)"""
+            return self.top("budget", n)
+
+        def most_profitable(self, n):
+            """top-n movies by gross minus budget (see Links.most_profitable)"""
+            return self.top("gross - budget", n)
+
+        def longest(self, n):
+            """top-n movies by runtime (see Links.longest)"""
+            return self.top("runtime", n)
+
+        def top_cost_per_minute(self, n):
+            """top-n movies by budget per minute of runtime (see Links.top_cost_per_minute)"""
+            return {title: round(cost, 2) for title, cost in self.top("ROUND(CAST(budget AS REAL) / runtime, 2)", n).items()}
+
+class MovieLensDataset:
+    """Единая точка входа в датасет MovieLens по пути к директории с файлами.
+    Каждая таблица читается лениво при первом обращении и ровно один раз (заголовок проверяется в том же чтении),
+    а затем один и тот же объект отдается всем, кто его запрашивает.
+    Ratings получает уже загруженный список фильмов без повторного чтения movies.csv и без копирования."""
+    FILES = {
+        "movies": "movies.csv",
+        "ratings": "ratings.csv",
+        "tags": "tags.csv",
+        "links": "links.csv",
+    }
+
+    def __init__(self, directory, backend="python", records=False):
+        """Конструктор. Принимает путь к директории с файлами датасета или к zip-архиву с ними,
+        имя движка вычислений для Movies, Ratings и Tags (см. Backend)
+        и признак хранения строк в RecordTable вместо списков словарей (records)"""
+        self.directory = directory
+        self.backend = backend
+        self.records = records
+        self.tables = {}
+
+    def path(self, name):
+        """Возвращает путь к файлу таблицы name (movies, ratings, tags или links).
+        Директория может быть и zip-архивом датасета, а файлы - сжатыми gzip или zstd (DataSource.find)"""
+        return DataSource.find(self.directory, self.FILES[name])
+
+    def get(self, name, factory):
+        """Возвращает закэшированный объект таблицы name, создавая его функцией factory при первом обращении"""
+        if Profiler.enabled:
+            Profiler.count_cache(f"MovieLensDataset.{name}", name in self.tables)
+        if name not in self.tables:
+            self.tables[name] = factory()
+        return self.tables[name]
+
+    def get_movies(self):
+        """Возвращает общий экземпляр Movies"""
+        return self.get("movies", lambda: Movies(self.path("movies"), backend=self.backend, records=self.records))
+
+    def get_ratings(self):
+        """Возвращает общий экземпляр Ratings, использующий список фильмов из get_movies()"""
+        return self.get("ratings", lambda: Ratings(self.path("ratings"), self.get_movies().movies, self.backend, self.records))
+
+    def get_tags(self):
+        """Возвращает общий экземпляр Tags"""
+        return self.get("tags", lambda: Tags(self.path("tags"), backend=self.backend, records=self.records))
+
+    def get_links(self):
+        """Возвращает общий экземпляр Links. Данные с IMDb загружаются только при первом вызове"""
+        return self.get("links", lambda: Links(self.path("links")))
+
+class QueryService:
+    """Локальный асинхронный HTTP/JSON сервис над одним общим экземпляром MovieLensDataset.
+
+    Датасет загружается один раз при старте, и все клиенты (дашборды, ноутбуки) получают результаты
+    публичных методов Movies, Ratings.Movies, Ratings.Users и Tags по адресам вида
+    /ratings/top_by_ratings?n=10&metric=mean, /movies/dist_by_genres или /tags/tags_with?word=comedy.
+    Ответ - JSON со значением, которое вернул метод. Одинаковые запросы, пришедшие во время вычисления,
+    не вычисляются повторно, а ждут тот же результат (coalescing), а готовые ответы хранятся в LRU-кэше.
+    Вычисления идут в одном отдельном потоке, чтобы цикл событий продолжал принимать соединения.
+    Сервис слушает только loopback-адрес. /health - проверка, /stats - счетчики запросов, кэша и coalescing."""
+    RESOURCES = {
+        "movies": ("dist_by_release", "dist_by_genres", "most_genres", "most_genres_by_years"),
+        "ratings": ("dist_by_year", "dist_by_rating", "top_by_num_of_ratings", "top_by_ratings", "top_controversial"),
+        "users": ("dist_users_by_num_of_ratings", "dist_users_by_rating", "top_controversial_users"),
+        "tags": ("most_words", "longest", "most_words_and_longest", "most_popular", "tags_with"),
+    }
+    INT_PARAMS = ("n",)
+    LOOPBACK = ("127.0.0.1", "localhost", "::1")
+    REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+    def __init__(self, dataset, host="127.0.0.1", port=8000, cache_size=1024):
+        """Конструктор. Принимает MovieLensDataset, loopback-адрес, порт (0 - любой свободный)
+        и число ответов в кэше (0 - без кэша)"""
+        if host not in self.LOOPBACK:
+            raise Exception(f"QueryService listens on localhost only, got {host}")
+        self.dataset = dataset
+        self.host = host
+        self.port = port
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.inflight = {}
+        self.counters = Counter()
+        self.targets = {}
+        self.executor = None
+
+    def load(self):
+        """Загружает все таблицы датасета и готовит объекты, методы которых вызываются по запросам"""
+        ratings = self.dataset.get_ratings()
+        self.targets = {
+            "movies": self.dataset.get_movies(),
+            "ratings": ratings.inner_movies,
+            "users": ratings.Users(ratings),
+            "tags": self.dataset.get_tags(),
+        }
+        return self
+
+    def parse(self, target):
+        """Разбирает путь запроса. Возвращает (resource, method, params) или выбрасывает исключение"""
+        from urllib.parse import parse_qsl, urlsplit
+
+        url = urlsplit(target)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or parts[1] not in self.RESOURCES.get(parts[0], ()):
+            raise LookupError(f"Unknown query {url.path}")
+        params = {}
+        for name, value in parse_qsl(url.query):
+            params[name] = int(value) if name in self.INT_PARAMS else value
+        return parts[0], parts[1], params
+
+    def compute(self, resource, method, params):
+        """Вызывает метод и возвращает ответ в виде JSON-байтов"""
+        return json.dumps(getattr(self.targets[resource], method)(**params)).encode("utf-8")
+
+    async def query(self, resource, method, params):
+        """Возвращает JSON-ответ из кэша, из уже идущего вычисления такого же запроса или вычисляет его"""
+        import asyncio
+
+        key = (resource, method, tuple(Profiler.sorted(params.items())))
+        if key in self.cache:
+            self.counters["cache_hits"] += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        if key in self.inflight:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(self.inflight[key])
+
+        self.counters["computed"] += 1
+        future = self.inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            body = await asyncio.get_running_loop().run_in_executor(self.executor, self.compute, resource, method, params)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+        if self.cache_size:
+            self.cache[key] = body
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        future.set_result(body)
+        return body
+
+    async def respond(self, method, target):
+        """Возвращает (код ответа, JSON-байты) для запроса"""
+        self.counters["requests"] += 1
+        if method != "GET":
+            return 405, json.dumps({"error": "Only GET is supported"}).encode("utf-8")
+        if target == "/health":
+            return 200, b'{"status": "ok"}'
+        if target == "/stats":
+            return 200, json.dumps({**self.counters, "cached": len(self.cache)}).encode("utf-8")
+        try:
+            resource, name, params = self.parse(target)
+        except LookupError as e:
+            return 404, json.dumps({"error": str(e)}).encode("utf-8")
+        except ValueError as e:
+            return 400, json.dumps({"error": str(e)}).encode("utf-8")
+        try:
+            return 200, await self.query(resource, name, params)
+        except Exception as e:
+            self.counters["errors"] += 1
+            return 400, json.dumps({"error": str(e)}).encode("utf-8")
+
+    async def handle(self, reader, writer):
+        """Обслуживает одно соединение HTTP/1.1 с keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                status, body = await self.respond(parts[0], parts[1])
+                keep_alive = headers.get("connection") != "close" and parts[2] == "HTTP/1.1"
+                writer.write(
+                    f"HTTP/1.1 {status} {self.REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Загружает датасет и начинает слушать порт. Возвращает asyncio.Server; self.port - фактический порт"""
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.load()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    async def serve_forever(self):
+        """Запускает сервис и обслуживает запросы до остановки"""
+        server = await self.start()
+        print(f"serving on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        """Блокирующий запуск сервиса"""
+        import asyncio
+
+        asyncio.run(self.serve_forever())
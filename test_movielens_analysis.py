@@ -0,0 +1,2086 @@
+import collections
+import datetime
+import io
+import itertools
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+import movielens_analysis
+from movielens_analysis import (
+    ALS,
+    Backend,
+    CountMinSketch,
+    Database,
+    DataSource,
+    Export,
+    HyperLogLog,
+    ItemSimilarity,
+    Links,
+    LinksCrawler,
+    Movie,
+    MovieLensDataset,
+    MovieMetadata,
+    Movies,
+    PackedRatings,
+    Profiler,
+    QueryService,
+    Rating,
+    RatingMatrix,
+    Ratings,
+    RecordTable,
+    Tags,
+)
+
+class Tests:
+    """Тесты обязательно должны проверять:
+    1. Методы возвращают корректные типы данных
+    2. Списки элементов содержат корректные типы данных
+    3. Возвращаемые данные отсортированы корректно
+    Нужно запускать тесты перед переходом к следующему этапу задания"""
+
+################ FOR LINKS AND TAGS ################
+
+    @pytest.fixture
+    def links_obj(self):
+        links_test_data = Links('./ml_latest_small/links.csv')
+        return links_test_data
+
+    @pytest.fixture
+    def tags_obj(self):
+        tags_test_data = Tags('./ml_latest_small/tags.csv')
+        return tags_test_data
+
+################ MOVIES() ################
+
+    def test_movies_dist_by_release_data_type(self):
+        """Проверяет тип выходных данных"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.dist_by_release()
+        assert type(result) == collections.OrderedDict
+
+    def test_movies_dist_by_release_list_element_type(self):
+        """Проверяет тип данных внутри упорядоченного словаря"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.dist_by_release()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == int
+        assert type(first_value) == int
+
+    def test_movies_dist_by_release_sort(self):
+        """Проверяет корректность сортировки внутри упорядоченного списка"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.dist_by_release()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        second_key = list(result.keys())[1]
+        second_value = result[second_key]
+        third_key = list(result.keys())[2]
+        third_value = result[third_key]
+        assert first_value >= second_value
+        assert second_value >= third_value
+
+    def test_movies_dist_by_genres_data_type(self):
+        """Проверяет тип выходных данных"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.dist_by_genres()
+        assert type(result) == dict
+
+    def test_movies_dist_by_genres_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.dist_by_genres()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == str
+        assert type(first_value) == int
+
+    def test_movies_dist_by_genres_sort(self):
+        """Проверяет корректность сортировки внутри упорядоченного списка"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.dist_by_genres()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        second_key = list(result.keys())[1]
+        second_value = result[second_key]
+        third_key = list(result.keys())[2]
+        third_value = result[third_key]
+        assert first_value >= second_value
+        assert second_value >= third_value
+
+    def test_movies_most_genres_data_type(self):
+        """Проверяет тип выходных данных"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.most_genres(10)
+        assert type(result) == dict
+
+    def test_movies_most_genres_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.most_genres(10)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == str
+        assert type(first_value) == int
+
+    def test_movies_most_genres_sort(self):
+        """Проверяет корректность сортировки внутри упорядоченного списка"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.most_genres(10)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        second_key = list(result.keys())[1]
+        second_value = result[second_key]
+        third_key = list(result.keys())[2]
+        third_value = result[third_key]
+        assert first_value >= second_value
+        assert second_value >= third_value
+
+    def test_movies_most_genres_length(self):
+        """Проверяет длину полученного словаря"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.most_genres(10)
+        assert len(result) == 10
+
+    def test_movies_most_genres_by_years(self):
+        """Проверяет тип выходных данных"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.most_genres_by_years()
+        assert type(result) == dict
+
+    def test_movies_most_genres_by_years_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.most_genres_by_years()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == int
+        assert type(first_value) == str
+
+    def test_movies_most_genres_by_years_sort(self):
+        """Проверяет корректность сортировки внутри упорядоченного списка"""
+        movies = Movies("./ml_latest_small/movies.csv")
+        result = movies.most_genres_by_years()
+        first_key = list(result.keys())[0]
+        second_key = list(result.keys())[1]
+        third_key = list(result.keys())[2]
+        assert first_key <= second_key
+        assert second_key <= third_key
+
+################ RATINGS() ################
+
+    def test_ratings_dist_by_year_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.dist_by_year()
+        assert type(result) == dict
+
+    def test_ratings_dist_by_year_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.dist_by_year()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == int
+        assert type(first_value) == int
+
+    def test_ratings_dist_by_year_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.dist_by_year()
+        first_key = list(result.keys())[0]
+        second_key = list(result.keys())[1]
+        third_key = list(result.keys())[2]
+        assert first_key <= second_key
+        assert second_key <= third_key
+
+    def test_ratings_dist_by_rating_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.dist_by_rating()
+        assert type(result) == dict
+
+    def test_ratings_dist_by_rating_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.dist_by_rating()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == float
+        assert type(first_value) == int
+
+    def test_ratings_dist_by_rating_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.dist_by_rating()
+        first_key = list(result.keys())[0]
+        second_key = list(result.keys())[1]
+        third_key = list(result.keys())[2]
+        assert first_key <= second_key
+        assert second_key <= third_key
+
+    def test_ratings_top_by_num_of_ratings_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_num_of_ratings(10)
+        assert type(result) == dict
+
+    def test_ratings_top_by_num_of_ratings_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_num_of_ratings(10)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == str
+        assert type(first_value) == int
+
+    def test_ratings_top_by_num_of_ratings_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        n = 10
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_num_of_ratings(n)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        second_key = list(result.keys())[1]
+        second_value = result[second_key]
+        last_key = list(result.keys())[n - 1]
+        last_value = result[last_key]
+        assert first_value >= second_value
+        assert second_value >= last_value
+
+    def test_ratings_top_by_num_of_ratings_length(self):
+        """Проверяет длину полученного словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_num_of_ratings(10)
+        assert len(result) == 10
+
+    def test_ratings_top_by_ratings_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_ratings(100)
+        assert type(result) == dict
+
+    def test_ratings_top_by_ratings_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_ratings(100)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == str
+        assert type(first_value) == float
+
+    def test_ratings_top_by_ratings_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        n = 100
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_ratings(n)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        mid_key = list(result.keys())[int(n / 2)]
+        mid_value = result[mid_key]
+        last_key = list(result.keys())[n - 1]
+        last_value = result[last_key]
+        assert first_value >= mid_value
+        assert mid_value >= last_value
+
+    def test_ratings_top_by_ratings_length(self):
+        """Проверяет длину полученного словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_ratings(100)
+        assert len(result) == 100
+
+    def test_ratings_top_by_ratings_value_avg(self):
+        """Проверяет среднее значение"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_ratings(100)
+        assert result["Beauty and the Beast (1991)"] == 4.12
+
+    def test_ratings_top_by_ratings_value_mean(self):
+        """Проверяет медиану"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_by_ratings(100, "mean")
+        assert result["Beauty and the Beast (1991)"] == 4.25
+
+    def test_ratings_top_controversial_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_controversial(100)
+        assert type(result) == dict
+
+    def test_ratings_top_controversial_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_controversial(100)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == str
+        assert type(first_value) == float
+
+    def test_ratings_top_controversial_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        n = 100
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_controversial(n)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        mid_key = list(result.keys())[int(n / 2)]
+        mid_value = result[mid_key]
+        last_key = list(result.keys())[n - 1]
+        last_value = result[last_key]
+        assert first_value >= mid_value
+        assert mid_value >= last_value
+
+    def test_ratings_top_controversial_length(self):
+        """Проверяет длину полученного словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_controversial(100)
+        assert len(result) == 100
+
+    def test_ratings_top_controversial_value_variance(self):
+        """Проверяет длину полученного словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        result = ratings.inner_movies.top_controversial(100)
+        assert result["Independence Day (a.k.a. ID4) (1996)"] == 1.08
+
+    def test_dist_users_by_num_of_ratings_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_num_of_ratings()
+        assert type(result) == dict
+
+    def test_dist_users_by_num_of_ratings_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_num_of_ratings()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == int
+        assert type(first_value) == int
+
+    def test_dist_users_by_num_of_ratings_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_num_of_ratings()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        mid_key = list(result.keys())[1]
+        mid_value = result[mid_key]
+        last_key = list(result.keys())[2]
+        last_value = result[last_key]
+        assert first_value >= mid_value
+        assert mid_value >= last_value
+        
+    def test_dist_users_by_rating_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_rating()
+        assert type(result) == dict
+
+    def test_dist_users_by_rating_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_rating()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == int
+        assert type(first_value) == float
+
+    def test_dist_users_by_rating_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_rating()
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        mid_key = list(result.keys())[int(1)]
+        mid_value = result[mid_key]
+        last_key = list(result.keys())[2]
+        last_value = result[last_key]
+        assert first_value >= mid_value
+        assert mid_value >= last_value
+
+    def test_dist_users_by_rating_value_avg(self):
+        """Проверяет среднее значение"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_rating()
+        assert result[2] == 3.95
+
+    def test_dist_users_by_rating_value_mean(self):
+        """Проверяет медиану"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.dist_users_by_rating(metric="mean")
+        assert result[3] == 0.5
+
+    def test_top_controversial_users_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.top_controversial_users(5)
+        assert type(result) == dict
+
+    def test_top_controversial_users_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.top_controversial_users(5)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        assert type(first_key) == int
+        assert type(first_value) == float
+
+    def test_top_controversial_users_sort(self):
+        """Проверяет корректность сортировки внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.top_controversial_users(5)
+        first_key = list(result.keys())[0]
+        first_value = result[first_key]
+        mid_key = list(result.keys())[int(1)]
+        mid_value = result[mid_key]
+        last_key = list(result.keys())[2]
+        last_value = result[last_key]
+        assert first_value >= mid_value
+        assert mid_value >= last_value
+
+    def test_top_controversial_users_length(self):
+        """Проверяет длину полученного словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.top_controversial_users(5)
+        assert len(result) == 5
+
+    def test_top_controversial_users_variance(self):
+        """Проверяет длину полученного словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.top_controversial_users(5)
+        assert result[3] == 4.37
+
+    def test_similar_users_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.similar_users(1, 3)
+        assert type(result) == dict
+        for user_id, similarity in result.items():
+            assert type(user_id) == int
+            assert type(similarity) == float
+
+    def test_similar_users_sort(self):
+        """Проверяет корректность сортировки и отсутствие самого пользователя в выдаче"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.similar_users(1, 3)
+        values = list(result.values())
+        assert values == sorted(values, reverse=True)
+        assert 1 not in result
+
+    def test_similar_users_value(self):
+        """Сверяет похожесть с прямым расчетом косинуса центрированных векторов"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        vectors = {}
+        for rating in ratings.ratings:
+            vectors.setdefault(rating["userId"], {})[rating["movieId"]] = rating["rating"]
+        for user_id, vector in vectors.items():
+            mean = sum(vector.values()) / len(vector)
+            vectors[user_id] = {movie_id: value - mean for movie_id, value in vector.items()}
+        first = vectors[1]
+        for user_id, similarity in users.similar_users(1, 3).items():
+            second = vectors[user_id]
+            dot = sum(first[movie_id] * second[movie_id] for movie_id in first if movie_id in second)
+            norm = math.sqrt(sum(x * x for x in first.values()) * sum(x * x for x in second.values()))
+            assert similarity == round(dot / norm, 4)
+
+    def test_predict_rating_value(self):
+        """Проверяет, что без похожих пользователей предсказание равно средней оценке пользователя"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        result = users.predict_rating(2, -1)
+        assert type(result) == float
+        assert result == users.dist_users_by_rating()[2]
+
+################ RATINGS.GENRES() ################
+
+    def test_genres_join(self):
+        """Проверяет, что маска жанров в lookup соответствует жанрам фильма"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        genres = ratings.Genres(ratings)
+        lookup = genres.join()
+        for movie in ratings.movies[:50]:
+            mask = lookup[movie["movieId"]]
+            assert {genre for index, genre in enumerate(genres.genres) if mask >> index & 1} == set(movie["genres"].split("|"))
+
+    def test_genres_dist_by_rating_values(self):
+        """Сверяет гистограмму жанра с прямым подсчетом по оценкам"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        genres_by_id = {movie["movieId"]: movie["genres"].split("|") for movie in ratings.outer_movies.iter_movies()}
+        result = ratings.Genres(ratings).dist_by_rating()
+        expected = Counter(rating["rating"] for rating in ratings.ratings if "Drama" in genres_by_id.get(rating["movieId"], []))
+        assert result["Drama"] == dict(sorted(expected.items()))
+        assert list(result.keys()) == sorted(result.keys())
+
+    def test_genres_counts_all_known_movies(self):
+        """Проверяет, что в жанры попадают все оценки фильмов из всего movies.csv, а не только из первых 1000 фильмов"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        ratings.ratings = list(ratings.iter_ratings())
+        genres_by_id = {movie["movieId"]: movie["genres"].split("|") for movie in ratings.outer_movies.iter_movies()}
+        known = [rating for rating in ratings.ratings if rating["movieId"] in genres_by_id]
+        expected = Counter(genre for rating in known for genre in genres_by_id[rating["movieId"]])
+        stats = ratings.Genres(ratings).stats()
+        assert {genre: values[0] for genre, values in stats.items()} == dict(expected)
+        assert sum(values[0] for values in stats.values()) == sum(len(genres_by_id[rating["movieId"]]) for rating in known)
+        assert len(known) > sum(1 for rating in ratings.ratings if rating["movieId"] <= ratings.movies[-1]["movieId"])
+
+    def test_genres_stats_by_year(self):
+        """Проверяет, что статистики по годам в сумме дают статистики жанра"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        genres = ratings.Genres(ratings)
+        stats, by_year = genres.stats(), genres.stats_by_year()
+        for genre, (count, average, median, variance) in stats.items():
+            assert sum(values[0] for values in by_year[genre].values()) == count
+            assert list(by_year[genre].keys()) == sorted(by_year[genre].keys())
+            assert type(average) == float and variance >= 0
+
+    def test_genres_top(self):
+        """Проверяет сортировку top_by_ratings и top_controversial и исключение для неверной метрики"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        genres = ratings.Genres(ratings)
+        result = list(genres.top_by_ratings(5, "mean").values())
+        assert len(result) == 5 and result == sorted(result, reverse=True)
+        result = list(genres.top_controversial(5).values())
+        assert result == sorted(result, reverse=True)
+        with pytest.raises(Exception):
+            genres.top_by_ratings(5, "max")
+
+    def test_genres_cache(self):
+        """Проверяет, что агрегаты пересчитываются при замене списка оценок"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        genres = ratings.Genres(ratings)
+        first = sum(values[0] for values in genres.stats().values())
+        ratings.ratings = ratings.ratings[:100]
+        assert sum(values[0] for values in genres.stats().values()) < first
+
+################ RATINGS.ACTIVITY() ################
+
+    def test_activity_sweep_sessions(self):
+        """Проверяет сессии, границы активности и когорты на маленьком примере"""
+        day = 24 * 60 * 60
+        start = int(datetime.datetime(2010, 6, 1).timestamp())
+        users = [2, 1, 1, 1, 2, 1]
+        timestamps = [start, start + 100, start, start + 5000, start + 400 * day, start + 200]
+        result = Backend().sweep(users, timestamps, 1800)
+        assert result["users"] == [1, 2]
+        assert result["sessions"] == [2, 2] and result["ratings"] == [4, 2]
+        assert result["seconds"] == [200, 0]
+        assert result["first"] == [start, start] and result["last"] == [start + 5000, start + 400 * day]
+        assert result["sizes"] == [(1, 3), (3, 1)]
+        assert result["cohorts"] == [((2010, 0), 2), ((2010, 1), 1)]
+
+    def test_activity_user_sessions(self):
+        """Проверяет типы и сортировку user_sessions и activity_spans"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        activity = ratings.Activity(ratings)
+        result = activity.user_sessions()
+        sessions = [value[0] for value in result.values()]
+        assert sessions == sorted(sessions, reverse=True)
+        assert sum(count * size for size, count in activity.dist_sessions_by_size().items()) == len(ratings.ratings)
+        spans = activity.activity_spans()
+        first_key = list(spans.keys())[0]
+        assert type(first_key) == int and type(spans[first_key][0]) == datetime.date
+        days = [value[2] for value in spans.values()]
+        assert days == sorted(days, reverse=True)
+
+    def test_activity_cohorts(self):
+        """Проверяет, что в нулевой год когорты активны все ее пользователи"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        activity = ratings.Activity(ratings, gap=60 * 60)
+        sizes = activity.cohort_sizes()
+        assert sum(sizes.values()) == len({rating["userId"] for rating in ratings.ratings})
+        assert list(sizes.keys()) == sorted(sizes.keys())
+        for cohort, shares in activity.cohort_retention().items():
+            assert shares[0] == 1.0 and all(0 < share <= 1 for share in shares.values())
+        assert activity.cohort_retention(relative=False)[min(sizes)][0] == sizes[min(sizes)]
+
+################ RATINGS.REPORT() ################
+
+    def test_report_same_results(self):
+        """Проверяет, что общий отчет совпадает с результатами отдельных методов"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        users = ratings.Users(ratings)
+        statistics = [
+            "dist_by_year",
+            "dist_by_rating",
+            ("top_by_num_of_ratings", 10),
+            ("top_by_ratings", 100),
+            ("top_by_ratings", 100, "mean"),
+            ("top_controversial", 100),
+            "dist_users_by_num_of_ratings",
+            "dist_users_by_rating",
+            ("dist_users_by_rating", "mean"),
+            ("top_controversial_users", 5),
+        ]
+        result = ratings.report(statistics)
+        assert list(result.keys()) == statistics
+        assert result["dist_by_year"] == ratings.inner_movies.dist_by_year()
+        assert result["dist_by_rating"] == ratings.inner_movies.dist_by_rating()
+        assert list(result[("top_by_num_of_ratings", 10)].items()) == list(ratings.inner_movies.top_by_num_of_ratings(10).items())
+        assert list(result[("top_by_ratings", 100)].items()) == list(ratings.inner_movies.top_by_ratings(100).items())
+        assert list(result[("top_by_ratings", 100, "mean")].items()) == list(ratings.inner_movies.top_by_ratings(100, "mean").items())
+        assert list(result[("top_controversial", 100)].items()) == list(ratings.inner_movies.top_controversial(100).items())
+        assert list(result["dist_users_by_num_of_ratings"].items()) == list(users.dist_users_by_num_of_ratings().items())
+        assert list(result["dist_users_by_rating"].items()) == list(users.dist_users_by_rating().items())
+        assert list(result[("dist_users_by_rating", "mean")].items()) == list(users.dist_users_by_rating("mean").items())
+        assert list(result[("top_controversial_users", 5)].items()) == list(users.top_controversial_users(5).items())
+
+    def test_report_single_scan(self):
+        """Проверяет, что полный отчет проходит по оценкам ровно один раз"""
+        class CountingList(list):
+            scans = 0
+
+            def __iter__(self):
+                CountingList.scans += 1
+                return super().__iter__()
+
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        ratings.ratings = CountingList(ratings.ratings)
+        ratings.report(["dist_by_year", "dist_by_rating", ("top_by_ratings", 10), ("top_controversial_users", 5)])
+        assert CountingList.scans == 1
+
+    def test_report_unknown_statistic(self):
+        """Проверяет ошибку на неизвестную статистику"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        with pytest.raises(Exception):
+            ratings.report(["dist_by_nothing"])
+
+    @pytest.mark.parametrize("statistic", [
+        "top_by_ratings",
+        ("top_controversial",),
+        ("top_by_num_of_ratings", 0),
+        ("top_controversial_users", -1),
+        ("top_by_ratings", 10, "max"),
+        ("dist_users_by_rating", "max"),
+        ("dist_by_year", 10),
+    ])
+    def test_report_bad_arguments(self, statistic):
+        """Проверяет, что неверные аргументы статистики дают Exception с сообщением еще до прохода по оценкам"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        ratings.ratings = None
+        with pytest.raises(Exception, match="parameter"):
+            ratings.report([statistic])
+
+################ RATINGS.EXTERNAL() ################
+
+    @pytest.fixture
+    def full_report(self):
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        ratings.ratings = list(ratings.iter_ratings())
+        ratings.movies = list(ratings.outer_movies.iter_movies())
+        return ratings.report([
+            ("top_by_num_of_ratings", 20),
+            ("top_by_ratings", 50),
+            ("top_by_ratings", 50, "mean"),
+            ("top_controversial", 50),
+            "dist_users_by_num_of_ratings",
+            ("dist_users_by_rating", "mean"),
+            ("top_controversial_users", 20),
+        ])
+
+    def test_external_spill(self, full_report, tmp_path):
+        """Проверяет, что при маленьком бюджете данные раскладываются на партиции на диске,
+        а результаты совпадают с подсчетом в памяти по всему файлу"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        external = ratings.External(ratings, memory_budget=1024 * 1024, temp_dir=tmp_path)
+        external.aggregate()
+        assert external.partitions > 1
+        assert list(tmp_path.iterdir()) == []
+        assert list(external.top_by_num_of_ratings(20).items()) == list(full_report[("top_by_num_of_ratings", 20)].items())
+        assert list(external.top_by_ratings(50).items()) == list(full_report[("top_by_ratings", 50)].items())
+        assert list(external.top_by_ratings(50, "mean").items()) == list(full_report[("top_by_ratings", 50, "mean")].items())
+        assert list(external.dist_users_by_num_of_ratings().items()) == list(full_report["dist_users_by_num_of_ratings"].items())
+        assert list(external.dist_users_by_rating("mean").items()) == list(full_report[("dist_users_by_rating", "mean")].items())
+        assert list(external.top_controversial_users(20).items()) == list(full_report[("top_controversial_users", 20)].items())
+        # External не знает порядка оценок: где точная дисперсия ровно на середине между сотыми,
+        # она может отличаться от суммирования с плавающей точкой в Ratings.Movies на 0.01
+        for title, variance in full_report[("top_controversial", 50)].items():
+            assert abs(external.top_controversial(50)[title] - variance) <= 0.011
+
+    def test_external_titles_whole_file(self):
+        """Проверяет, что названия берутся из всего movies.csv, а не только из первых 1000 фильмов"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        external = ratings.External(ratings)
+        titles = external.titles()
+        assert len(titles) == len(list(ratings.outer_movies.iter_movies())) > len(ratings.movies)
+        assert len(external.top_by_num_of_ratings(10 ** 6)) == len(set(titles.values()))
+
+    def test_external_in_memory(self):
+        """Проверяет, что при большом бюджете партиции не создаются, а результат тот же"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        in_memory = ratings.External(ratings, memory_budget=1024 ** 3).aggregate()
+        spilled = ratings.External(ratings, memory_budget=1024 * 1024).aggregate()
+        assert in_memory.partitions == 1
+        assert in_memory.stats() == spilled.stats()
+
+################ RATINGS.USEROFFSETS() ################
+
+    def test_user_offsets_user_ratings(self, tmp_path):
+        """Проверяет, что оценки пользователя по индексу совпадают с оценками из файла"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        offsets = ratings.UserOffsets(ratings, str(tmp_path / "ratings.offsets")).build()
+        all_ratings = list(ratings.iter_ratings())
+        for user_id in (1, 2, 414, 610):
+            assert offsets.user_ratings(user_id) == [rating for rating in all_ratings if rating["userId"] == user_id]
+        assert offsets.user_ratings(100000) == []
+
+    def test_user_offsets_save_load(self, tmp_path):
+        """Проверяет, что сохраненный индекс загружается без повторного построения"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        path = str(tmp_path / "ratings.offsets")
+        built = ratings.UserOffsets(ratings, path).build().save()
+        loaded = ratings.UserOffsets(ratings, path)
+        loaded.build = None
+        loaded.load()
+        assert loaded.user_ids == built.user_ids
+        assert loaded.offsets == built.offsets
+
+    def test_user_offsets_not_sorted(self, tmp_path):
+        """Проверяет ошибку для файла, не упорядоченного по userId"""
+        path = tmp_path / "ratings.csv"
+        path.write_text("userId,movieId,rating,timestamp\n2,1,4.0,1\n1,1,3.0,1\n")
+        (tmp_path / "movies.csv").write_text("movieId,title,genres\n")
+        ratings = Ratings(str(path))
+        with pytest.raises(Exception):
+            ratings.UserOffsets(ratings).build()
+
+    def test_user_offsets_user_stats(self):
+        """Сравнивает статистики run-length группировки с внешней группировкой"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        user_stats = ratings.External(ratings, memory_budget=1024 ** 3).stats()[1]
+        result = {user_id: stats for user_id, *stats in ratings.UserOffsets(ratings).user_stats()}
+        assert list(result) == sorted(result)
+        assert result == {user_id: list(stats) for user_id, stats in user_stats.items()}
+
+################ PACKEDRATINGS() ################
+
+    @pytest.fixture
+    def packed_ratings(self, tmp_path):
+        (tmp_path / "movies.csv").write_bytes(open("./ml_latest_small/movies.csv", "rb").read())
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        return ratings.pack(str(tmp_path / "ratings.mlpack"), block_size=10000)
+
+    def test_packed_round_trip(self, packed_ratings):
+        """Проверяет, что распакованные оценки совпадают с оценками из csv, а файл хотя бы в 5 раз меньше"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        packed = PackedRatings(packed_ratings)
+        assert list(packed.iter_ratings()) == list(ratings.iter_ratings())
+        assert packed.count() == 100836
+        assert os.path.getsize("./ml_latest_small/ratings.csv") >= 5 * os.path.getsize(packed_ratings)
+
+    def test_packed_odd_block(self, tmp_path):
+        """Проверяет блок с нечетным числом строк и большими разностями"""
+        rows = [
+            {"userId": 7, "movieId": 193609, "rating": 0.5, "timestamp": 1537799250},
+            {"userId": 7, "movieId": 1, "rating": 5.0, "timestamp": 828124615},
+            {"userId": 2 ** 40, "movieId": 2, "rating": 3.5, "timestamp": 0},
+        ]
+        path = str(tmp_path / "small.mlpack")
+        assert PackedRatings.write(rows, path, block_size=2) == 3
+        assert list(PackedRatings(path).iter_ratings()) == rows
+
+    def test_packed_ratings(self, packed_ratings):
+        """Проверяет, что Ratings на упакованном файле считает то же, что и на csv"""
+        csv = Ratings("./ml_latest_small/ratings.csv")
+        packed = Ratings(packed_ratings)
+        assert packed.ratings == csv.ratings
+        assert packed.movies == csv.movies
+        assert packed.inner_movies.top_by_ratings(10) == csv.inner_movies.top_by_ratings(10)
+        assert packed.External(packed).stats() == csv.External(csv).stats()
+
+    def test_packed_bad_file(self, tmp_path):
+        """Проверяет ошибку для файла без заголовка формата"""
+        path = tmp_path / "ratings.mlpack"
+        path.write_bytes(b"userId,movieId,rating,timestamp\n")
+        with pytest.raises(Exception):
+            PackedRatings(str(path)).count()
+
+################ RATINGS.SAMPLE() ################
+
+    def test_sample_reads_every_row_once(self):
+        """Проверяет, что блоки в случайном порядке покрывают файл: каждая строка читается ровно один раз"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sample = ratings.Sample(ratings, size=10, by="movieId", block_size=4096)
+        sample.refine()
+        assert sample.done and sample.progress() == 1.0
+        exact = Counter(rating["movieId"] for rating in ratings.iter_ratings())
+        assert sample.seen == exact
+
+    def test_sample_interval_type(self):
+        """Проверяет, что оценки возвращаются кортежами (оценка, нижняя граница, верхняя граница)"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sample = ratings.Sample(ratings, size=5000, block_size=16384)
+        result = sample.top_by_ratings(5)
+        assert type(result) == dict and len(result) == 5
+        for value, low, high in result.values():
+            assert type(value) == float
+            assert low <= value <= high
+
+    def test_sample_dist_by_rating_covers_exact(self):
+        """Сверяет приближенное распределение оценок с точным по всему файлу"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        exact = Counter(rating["rating"] for rating in ratings.iter_ratings())
+        sample = ratings.Sample(ratings, size=20000, block_size=16384).refine(50000)
+        result = sample.dist_by_rating()
+        assert list(result.keys()) == sorted(result.keys())
+        covered = sum(low <= exact[rating] <= high for rating, (value, low, high) in result.items())
+        assert covered >= len(result) - 2
+
+    def test_sample_stream_progress(self):
+        """Проверяет, что stream уточняет ответ по мере чтения файла"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sample = ratings.Sample(ratings, size=1000, block_size=65536)
+        progress = [step.progress() for step in sample.stream(20000)]
+        assert progress == sorted(progress) and progress[-1] == 1.0
+        assert sample.rows_read == sum(1 for _ in ratings.iter_ratings())
+
+    def test_sample_stratified_exact_when_read(self):
+        """Стратифицированная выборка по всему файлу с большим size совпадает с точными методами"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        ratings.ratings = list(ratings.iter_ratings())
+        sample = ratings.Sample(ratings, size=1000000, by="userId").refine()
+        result = sample.top_controversial_users(5)
+        exact = ratings.Users(ratings).top_controversial_users(5)
+        assert list(result.keys()) == list(exact.keys())
+        for user_id, (value, low, high) in result.items():
+            assert value == low == high == exact[user_id]
+
+    def test_sample_rows(self):
+        """Проверяет, что равномерная выборка подставляется в ratings.ratings вместо первых строк файла"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sample = ratings.Sample(ratings, size=1000).refine(20000)
+        ratings.ratings = sample.rows()
+        assert len(ratings.ratings) == 1000
+        assert len({rating["userId"] for rating in ratings.ratings}) > 20
+        assert type(ratings.inner_movies.top_by_num_of_ratings(5)) == dict
+
+    def test_sample_early_coverage(self):
+        """Проверяет покрытие интервалов в начале чтения (500 и 3000 строк, 10 seed): среднее, медиана
+        и число оценок фильмов по всему файлу попадают в интервал не реже чем в 90% случаев"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        titles = {movie["movieId"]: movie["title"] for movie in ratings.movies}
+        scores = {}
+        for rating in ratings.iter_ratings():
+            if rating["movieId"] in titles:
+                scores.setdefault(titles[rating["movieId"]], []).append(rating["rating"])
+        exact = {
+            "average": {title: sum(values) / len(values) for title, values in scores.items()},
+            "mean": {title: sorted(values)[len(values) // 2] / 2 + sorted(values)[(len(values) - 1) // 2] / 2 for title, values in scores.items()},
+            "count": {title: len(values) for title, values in scores.items()},
+        }
+        for rows in (500, 3000):
+            covered = Counter()
+            total = 0
+            for seed in range(10):
+                sample = ratings.Sample(ratings, size=2000, block_size=4096, seed=seed).refine(rows)
+                results = {
+                    "average": sample.top_by_ratings(1000),
+                    "mean": sample.top_by_ratings(1000, "mean"),
+                    "count": sample.top_by_num_of_ratings(1000),
+                }
+                total += len(results["count"])
+                for name, result in results.items():
+                    covered[name] += sum(low - 0.005 <= exact[name][title] <= high + 0.005 for title, (_, low, high) in result.items())
+            assert all(covered[name] >= 0.9 * total for name in exact)
+
+    def test_sample_one_block_full_range(self):
+        """Пока прочитан один блок, разброс между блоками неизвестен: интервалы - весь диапазон значений.
+        Медиана по одной оценке тоже получает весь диапазон, как и среднее"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sample = ratings.Sample(ratings, size=2000, by="movieId", block_size=1 << 20).refine(300)
+        assert len(sample.block_rows) == 1
+        for value, low, high in sample.top_by_ratings(50).values():
+            assert (low, high) == (0.5, 5.0)
+        for value, low, high in sample.top_by_ratings(50, "mean").values():
+            assert (low, high) == (0.5, 5.0)
+        for title, (value, low, high) in sample.top_by_num_of_ratings(50).items():
+            assert low <= value <= high and high > 1000
+        assert sample.median([(4.0, 0)], 3, 5) == (4.0, 0.5, 5.0)
+
+    def test_sample_t_quantile(self):
+        """Сверяет квантиль t-распределения с таблицей"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sample = ratings.Sample(ratings)
+        for freedom, expected in ((1, 12.706), (2, 4.303), (5, 2.571), (10, 2.228), (30, 2.042), (500, 1.965)):
+            assert round(sample.quantile(freedom + 1), 3) == expected
+        assert sample.quantile(1) == sample.z
+
+    def test_sample_wrong_stratum(self):
+        """Проверяет исключение для метода по другому признаку стратификации"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sample = ratings.Sample(ratings, size=10, by="movieId")
+        with pytest.raises(Exception):
+            sample.dist_users_by_num_of_ratings()
+        with pytest.raises(Exception):
+            ratings.Sample(ratings, by="timestamp")
+
+################ RATINGS.TRENDS() ################
+
+    def test_rolling_by_movie_data_type(self):
+        """Проверяет тип выходных данных"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        trends = ratings.Trends(ratings)
+        result = trends.rolling_by_movie(30)
+        assert type(result) == dict
+
+    def test_rolling_by_movie_list_element_type(self):
+        """Проверяет тип данных внутри словаря"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        trends = ratings.Trends(ratings)
+        result = trends.rolling_by_movie(30)
+        first_key = list(result.keys())[0]
+        first_date = list(result[first_key].keys())[0]
+        count, average = result[first_key][first_date]
+        assert type(first_key) == str
+        assert type(first_date) == datetime.date
+        assert type(count) == int
+        assert type(average) == float
+
+    def test_rolling_by_genre_sort(self):
+        """Проверяет, что даты внутри каждого жанра отсортированы по возрастанию"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        trends = ratings.Trends(ratings)
+        result = trends.rolling_by_genre(365)
+        for points in result.values():
+            dates = list(points.keys())
+            assert dates == sorted(dates)
+
+    def test_rolling_by_genre_window_values(self):
+        """Сверяет значения скользящего окна с прямым подсчетом по оценкам"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        trends = ratings.Trends(ratings)
+        result = trends.rolling_by_genre(30)
+        genres_by_id = {movie["movieId"]: movie["genres"].split("|") for movie in ratings.movies}
+        for date, (count, average) in result["Comedy"].items():
+            end = int(datetime.datetime(date.year, date.month, date.day, tzinfo=datetime.timezone.utc).timestamp())
+            scores = [
+                rating["rating"] for rating in ratings.ratings
+                if "Comedy" in genres_by_id.get(rating["movieId"], []) and end - 30 * 86400 <= rating["timestamp"] < end
+            ]
+            assert count == len(scores)
+            if scores:
+                assert average == round(sum(scores) / len(scores), 2)
+
+################ RATINGMATRIX() ################
+
+    def test_rating_matrix_data_type(self):
+        """Проверяет тип выходных данных и размерность"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        matrix = ratings.rating_matrix()
+        assert type(matrix) == RatingMatrix
+        assert matrix.shape == (len(matrix.user_ids), len(matrix.movie_ids))
+        assert len(matrix) == len(ratings.ratings)
+
+    def test_rating_matrix_values(self):
+        """Проверяет, что обе перенумерации и оба вида матрицы возвращают исходные оценки"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        matrix = ratings.rating_matrix()
+        for rating in ratings.ratings:
+            assert matrix.user_ratings(rating["userId"])[rating["movieId"]] == rating["rating"]
+            assert matrix.movie_ratings(rating["movieId"])[rating["userId"]] == rating["rating"]
+
+    def test_rating_matrix_sort(self):
+        """Проверяет, что индексы внутри строк CSR и столбцов CSC отсортированы по возрастанию"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        matrix = ratings.rating_matrix()
+        for row in range(matrix.shape[0]):
+            indices = list(matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]])
+            assert indices == sorted(indices)
+        for col in range(matrix.shape[1]):
+            indices = list(matrix.col_indices[matrix.col_indptr[col]:matrix.col_indptr[col + 1]])
+            assert indices == sorted(indices)
+
+################ ITEMSIMILARITY() ################
+
+    @pytest.fixture
+    def similarity_obj(self):
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        similarity = ItemSimilarity(ratings.rating_matrix(), metric="pearson", k=10, min_support=2)
+        similarity.build(block_size=100)
+        return similarity
+
+    def test_most_similar_return_type(self, similarity_obj):
+        result = similarity_obj.most_similar(1, 5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+        for movie_id, similarity in result.items():
+            assert isinstance(movie_id, int), f"movieId {movie_id} is not an integer"
+            assert isinstance(similarity, float), f"Value {similarity} is not a float"
+
+    def test_most_similar_sort(self, similarity_obj):
+        for movie_id in list(similarity_obj.neighbours)[:50]:
+            result = similarity_obj.most_similar(movie_id, 10)
+            values = list(result.values())
+            assert values == sorted(values, reverse=True), "The data is not sorted correctly"
+            assert movie_id not in result, "Movie is similar to itself"
+
+    def test_most_similar_pearson_value(self, similarity_obj):
+        matrix = similarity_obj.matrix
+        movie_id = max(matrix.movie_ids, key=lambda movie: len(matrix.movie_ratings(movie)))
+        first = matrix.movie_ratings(movie_id)
+        for other_id, similarity in similarity_obj.most_similar(movie_id, 3).items():
+            second = matrix.movie_ratings(other_id)
+            xs = [first[user] for user in first if user in second]
+            ys = [second[user] for user in first if user in second]
+            mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+            covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+            norm = math.sqrt(sum((x - mean_x) ** 2 for x in xs) * sum((y - mean_y) ** 2 for y in ys))
+            assert similarity == round(covariance / norm, 4)
+
+    def test_similarity_workers_and_save_load(self, similarity_obj, tmp_path):
+        parallel = ItemSimilarity(similarity_obj.matrix, metric="pearson", k=10, min_support=2)
+        parallel.build(block_size=100, workers=2)
+        assert parallel.neighbours == similarity_obj.neighbours
+        path = tmp_path / "neighbours.csv"
+        similarity_obj.save(path)
+        loaded = ItemSimilarity(similarity_obj.matrix).load(path)
+        assert loaded == similarity_obj.neighbours
+
+################ ALS() ################
+
+    @pytest.fixture
+    def als_split(self):
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        return ALS.train_test_split(ratings.ratings, test_share=0.2, seed=1)
+
+    def test_als_cholesky_solve(self):
+        """Проверяет решение системы с симметричной положительно определенной матрицей"""
+        matrix = [[4.0, 0.0, 0.0], [2.0, 5.0, 0.0], [1.0, 1.0, 3.0]]
+        full = [[4.0, 2.0, 1.0], [2.0, 5.0, 1.0], [1.0, 1.0, 3.0]]
+        solution = ALS.cholesky_solve(matrix, [1.0, 2.0, 3.0])
+        for line, value in zip(full, [1.0, 2.0, 3.0]):
+            assert abs(sum(a * x for a, x in zip(line, solution)) - value) < 1e-9
+
+    def test_als_fit_improves_rmse(self, als_split):
+        """Проверяет, что обучение уменьшает RMSE на обучающей выборке и история RMSE заполняется"""
+        train, test = als_split
+        als = ALS(RatingMatrix(train), factors=5, iterations=5)
+        als.fit(test)
+        baseline = math.sqrt(sum((rating["rating"] - als.mean) ** 2 for rating in train) / len(train))
+        assert 0 < len(als.history) <= 5
+        assert als.rmse(train) < baseline
+
+    def test_als_workers(self, als_split):
+        """Проверяет, что параллельное обучение дает те же факторы, что и последовательное"""
+        train, test = als_split
+        single = ALS(RatingMatrix(train), factors=5, iterations=3, vectorized=False).fit(test)
+        parallel = ALS(RatingMatrix(train), factors=5, iterations=3, vectorized=False).fit(test, workers=2)
+        assert single.history == parallel.history
+
+    def test_als_numpy_workers(self, als_split):
+        """Проверяет, что на пути NumPy процессы пула дают те же факторы, что и один процесс"""
+        numpy = pytest.importorskip("numpy")
+        train, test = als_split
+        single = ALS(RatingMatrix(train), factors=5, iterations=3).fit(test)
+        parallel = ALS(RatingMatrix(train), factors=5, iterations=3).fit(test, workers=3)
+        assert parallel.numpy is not None
+        assert single.history == parallel.history
+        assert numpy.array_equal(single.user_factors, parallel.user_factors)
+        assert numpy.array_equal(single.item_factors, parallel.item_factors)
+
+    def test_als_numpy_matches_python(self, als_split):
+        """Проверяет, что векторное обучение и рекомендации совпадают с вариантом на чистом Python"""
+        pytest.importorskip("numpy")
+        train, test = als_split
+        matrix = RatingMatrix(train)
+        vectorized = ALS(matrix, factors=5, iterations=3).fit(test)
+        python = ALS(matrix, factors=5, iterations=3, vectorized=False).fit(test)
+        assert vectorized.numpy is not None and python.numpy is None
+        assert vectorized.history == python.history
+        for left, right in zip(vectorized.user_factors, python.user_factors):
+            assert abs(left - right) < 1e-9
+        user_ids = list(matrix.user_ids)[:20]
+        assert vectorized.recommend(user_ids, 5) == python.recommend(user_ids, 5)
+        assert vectorized.recommend([-1], 5) == {-1: {}}
+
+    def test_als_recommend(self, als_split):
+        """Проверяет тип, сортировку и исключение уже оцененных фильмов в рекомендациях"""
+        train, test = als_split
+        matrix = RatingMatrix(train)
+        als = ALS(matrix, factors=5, iterations=3).fit(test)
+        result = als.recommend(list(matrix.user_ids), 5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+        for user_id, movies in result.items():
+            assert len(movies) == 5
+            values = list(movies.values())
+            assert values == sorted(values, reverse=True), "The data is not sorted correctly"
+            assert not set(movies) & set(matrix.user_ratings(user_id))
+
+################ SKETCHES ################
+
+    def test_count_min_sketch_bound(self):
+        """Проверяет, что оценка Count-Min Sketch не меньше точного значения и укладывается в границу ошибки"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sketch = CountMinSketch(width=64, depth=4)
+        for rating in ratings.ratings:
+            sketch.add(rating["movieId"])
+        bound, _ = sketch.error_bound()
+        for movie_id, count in Counter(rating["movieId"] for rating in ratings.ratings).items():
+            assert count <= sketch.estimate(movie_id) <= count + bound
+
+    def test_hyperloglog_estimate(self):
+        """Проверяет точность и объединение HyperLogLog"""
+        first, second = HyperLogLog(12), HyperLogLog(12)
+        for key in range(20000):
+            first.add(key)
+        for key in range(10000, 30000):
+            second.add(key)
+        first.merge(second)
+        assert abs(first.estimate() - 30000) <= 30000 * 4 * first.error_bound()
+
+    def test_sketches_top_by_num_of_ratings(self):
+        """Сравнивает приближенный топ с точным: при capacity больше числа фильмов ответ точный"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        sketches = ratings.Sketches(ratings, capacity=1000).update()
+        result = sketches.top_by_num_of_ratings(10)
+        assert type(result) == dict
+        assert result == ratings.inner_movies.top_by_num_of_ratings(10)
+
+    def test_sketches_merge(self):
+        """Проверяет, что скетчи частей потока после объединения совпадают со скетчем всего потока"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        whole = ratings.Sketches(ratings, capacity=50).update()
+        first = ratings.Sketches(ratings, capacity=50).update(ratings.ratings[:500])
+        second = ratings.Sketches(ratings, capacity=50).update(ratings.ratings[500:])
+        first.merge(second)
+        assert first.distinct_users() == whole.distinct_users()
+        assert first.dist_users_by_num_of_ratings() == whole.dist_users_by_num_of_ratings()
+        for movie_id, count, error in first.movie_counts.top(50):
+            exact = sum(1 for rating in ratings.ratings if rating["movieId"] == movie_id)
+            assert count - error <= exact <= count
+            assert error <= first.error_bounds()["movies"]
+
+################ PROFILER ################
+
+    def test_profiler_disable_restores_methods(self):
+        """Проверяет, что после выключения профилировщика методы и sorted возвращаются исходные"""
+        original = Movies.dist_by_genres
+        Profiler.enable()
+        try:
+            assert Movies.dist_by_genres is not original
+        finally:
+            Profiler.disable()
+        assert Movies.dist_by_genres is original
+        assert "sorted" not in vars(movielens_analysis)
+
+    def test_profiler_report(self):
+        """Проверяет состав и типы данных отчета"""
+        Profiler.reset()
+        Profiler.enable(memory=True)
+        try:
+            ratings = Ratings("./ml_latest_small/ratings.csv")
+            ratings.inner_movies.top_by_ratings(10)
+            users = ratings.Users(ratings)
+            users.similar_users(1)
+            users.similar_users(1)
+        finally:
+            Profiler.disable()
+        report = Profiler.report()
+        record = report["methods"]["Ratings.Movies.top_by_ratings"]
+        assert record["calls"] == 1
+        assert record["rows"] == 1000
+        assert type(record["seconds"]) == float
+        assert type(record["rows_per_second"]) == int
+        assert record["peak_memory"] > 0
+        assert {"load", "parse", "aggregate", "sort"} <= set(report["stages"])
+        assert report["caches"]["Ratings.Users.user_index"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        assert json.loads(Profiler.to_json()) == report
+        assert "Ratings.Movies.top_by_ratings" in Profiler.table()
+        Profiler.reset()
+
+    def test_profiler_threads(self):
+        """Проверяет, что у каждого потока свой стек вызовов и sorted модуля не подменяется"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        stacks = []
+
+        def work():
+            stacks.append(Profiler.stack())
+            for _ in range(3):
+                ratings.inner_movies.top_by_ratings(10)
+
+        Profiler.reset()
+        Profiler.enable()
+        try:
+            assert "sorted" not in vars(movielens_analysis)
+            threads = [threading.Thread(target=work) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            Profiler.disable()
+        report = Profiler.report()
+        assert len({id(stack) for stack in stacks}) == 4 and not any(stacks)
+        assert report["methods"]["Ratings.Movies.top_by_ratings"]["calls"] == 12
+        assert all(record["seconds"] >= 0 for record in report["stages"].values())
+        assert report["stages"]["sort"]["calls"] > 0
+        Profiler.reset()
+
+################ BACKEND ################
+
+    @pytest.fixture(params=[name for name in Backend.NAMES if name != "python"])
+    def backend(self, request):
+        if request.param in ("numpy", "pandas"):
+            pytest.importorskip(request.param)
+        return request.param
+
+    def test_backend_movies(self, backend):
+        """Проверяет, что движок возвращает для Movies то же, что и эталонные циклы, в том же порядке"""
+        reference = Movies("./ml_latest_small/movies.csv")
+        movies = Movies("./ml_latest_small/movies.csv", backend=backend)
+        assert list(movies.dist_by_release().items()) == list(reference.dist_by_release().items())
+        assert list(movies.dist_by_genres().items()) == list(reference.dist_by_genres().items())
+        assert list(movies.most_genres(20).items()) == list(reference.most_genres(20).items())
+        assert list(movies.most_genres_by_years().items()) == list(reference.most_genres_by_years().items())
+
+    def test_backend_ratings(self, backend):
+        """Проверяет, что движок возвращает для Ratings.Movies и Ratings.Users то же, что и эталонные циклы"""
+        reference = Ratings("./ml_latest_small/ratings.csv")
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend=backend)
+        for name, args in (
+            ("dist_by_year", ()),
+            ("dist_by_rating", ()),
+            ("top_by_num_of_ratings", (20,)),
+            ("top_by_ratings", (20,)),
+            ("top_by_ratings", (20, "mean")),
+            ("top_controversial", (20,)),
+        ):
+            result = list(getattr(ratings.inner_movies, name)(*args).items())
+            expected = list(getattr(reference.inner_movies, name)(*args).items())
+            assert result == expected
+            assert [tuple(map(type, item)) for item in result] == [tuple(map(type, item)) for item in expected]
+        users, reference_users = ratings.Users(ratings), reference.Users(reference)
+        assert list(users.dist_users_by_num_of_ratings().items()) == list(reference_users.dist_users_by_num_of_ratings().items())
+        assert list(users.dist_users_by_rating().items()) == list(reference_users.dist_users_by_rating().items())
+        assert list(users.dist_users_by_rating("mean").items()) == list(reference_users.dist_users_by_rating("mean").items())
+        assert list(users.top_controversial_users(10).items()) == list(reference_users.top_controversial_users(10).items())
+        with pytest.raises(Exception):
+            users.dist_users_by_rating("max")
+
+    def test_backend_ratings_conformance(self, backend):
+        """Проверяет движок против эталона на 30000 оценках, где у многих фильмов и пользователей десятки оценок
+        и дисперсия чаще попадает на границу округления. Эталон - однопроходный report на формулах Ratings.Movies"""
+        reference = Ratings("./ml_latest_small/ratings.csv")
+        reference.ratings = list(itertools.islice(reference.iter_ratings(), 30000))
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend=backend)
+        ratings.ratings = reference.ratings
+        statistics = [
+            ("top_by_num_of_ratings", 1000),
+            ("top_by_ratings", 1000),
+            ("top_by_ratings", 1000, "mean"),
+            ("top_controversial", 1000),
+            "dist_users_by_num_of_ratings",
+            "dist_users_by_rating",
+            ("dist_users_by_rating", "mean"),
+            ("top_controversial_users", 1000),
+        ]
+        expected = reference.report(statistics)
+        users = ratings.Users(ratings)
+        for item in statistics:
+            name, args = (item, ()) if isinstance(item, str) else (item[0], item[1:])
+            method = getattr(users if "users" in name else ratings.inner_movies, name)
+            assert list(method(*args).items()) == list(expected[item].items())
+
+    def test_backend_tags(self, backend):
+        """Проверяет Tags. У эталона порядок равных значений зависит от порядка set, поэтому сравниваются значения"""
+        reference = Tags("./ml_latest_small/tags.csv")
+        tags = Tags("./ml_latest_small/tags.csv", backend=backend)
+        assert list(tags.most_popular(10).items()) == list(reference.most_popular(10).items())
+        assert tags.tags_with("comedy") == reference.tags_with("comedy")
+        assert list(tags.most_words(10).values()) == list(reference.most_words(10).values())
+        assert list(map(len, tags.longest(10))) == list(map(len, reference.longest(10)))
+        assert set(tags.most_words_and_longest(50)) <= set(tags.longest(50))
+
+    def test_backend_genres(self, backend):
+        """Проверяет, что векторное соединение с жанрами дает то же, что и ядра на чистом Python"""
+        reference = Ratings("./ml_latest_small/ratings.csv")
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend=backend)
+        genres, reference_genres = ratings.Genres(ratings), reference.Genres(reference)
+        assert genres.stats() == reference_genres.stats()
+        assert genres.dist_by_year_and_rating() == reference_genres.dist_by_year_and_rating()
+
+    def test_backend_activity(self, backend):
+        """Проверяет, что векторный проход по сессиям дает то же, что и ядро на чистом Python"""
+        reference = Ratings("./ml_latest_small/ratings.csv")
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend=backend)
+        assert ratings.Activity(ratings).aggregate() == reference.Activity(reference).aggregate()
+        users, timestamps = [3, 1, 3, 1], [0, 1 << 33, 5000, 100]
+        engine = Backend.create(backend)
+        columns = engine.make_column(users), engine.make_column(timestamps)
+        assert engine.sweep(*columns, 1800) == Backend().sweep(users, timestamps, 1800)
+
+    def test_backend_dataset(self, backend):
+        """Проверяет, что движок передается через MovieLensDataset и обновляется при замене списка оценок"""
+        dataset = MovieLensDataset("./ml_latest_small", backend=backend)
+        ratings = dataset.get_ratings()
+        assert ratings.backend is not None and dataset.get_movies().backend is not None
+        first = ratings.inner_movies.dist_by_rating()
+        ratings.ratings = ratings.ratings[:100]
+        assert sum(ratings.inner_movies.dist_by_rating().values()) == 100 < sum(first.values())
+        with pytest.raises(Exception):
+            Movies("./ml_latest_small/movies.csv", backend="spark")
+
+################ EXPORT ################
+
+    def test_export_ratings_frame(self, backend):
+        """Проверяет типы столбцов и то, что кадр смотрит на столбцы движка без копирования"""
+        numpy = pytest.importorskip("numpy")
+        pytest.importorskip("pandas")
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend=backend)
+        frame = ratings.to_frame()
+        assert list(frame.columns) == ["userId", "movieId", "rating", "timestamp"]
+        assert str(frame["rating"].dtype) == "float64" and str(frame["userId"].dtype) == "int64"
+        assert frame["rating"].tolist() == [rating["rating"] for rating in ratings.ratings]
+        if backend != "columnar":
+            column = numpy.asarray(ratings.backend.column(ratings.ratings, "rating"))
+            assert numpy.shares_memory(column, frame["rating"].to_numpy())
+
+    def test_export_frame_is_read_only(self, backend):
+        """Проверяет, что запись в выгруженный кадр не портит закэшированные столбцы движка"""
+        pytest.importorskip("pandas")
+        pytest.importorskip("pyarrow")
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend=backend)
+        expected = ratings.inner_movies.dist_by_rating()
+        frame = ratings.to_frame()
+        try:
+            frame.loc[0, "rating"] = 100
+        except ValueError:
+            pass
+        with pytest.raises(ValueError):
+            frame["rating"].to_numpy()[1] = 100
+        table = ratings.to_frame("arrow")
+        assert not any(buffer.is_mutable for chunk in table.column("rating").chunks for buffer in chunk.buffers() if buffer is not None)
+        assert ratings.inner_movies.dist_by_rating() == expected
+        assert ratings.ratings[0]["rating"] != 100
+
+    def test_export_buffer_is_shared(self):
+        """Проверяет, что DataFrame и Arrow-таблица смотрят на типизированный буфер, а не на копию"""
+        numpy = pytest.importorskip("numpy")
+        pytest.importorskip("pandas")
+        pyarrow = pytest.importorskip("pyarrow")
+        column = Export.buffer([1, 2, 3])
+        frame = Export.table({"value": column})
+        table = Export.table({"value": column}, "arrow")
+        view = numpy.frombuffer(column, dtype="int64")
+        assert numpy.shares_memory(view, frame["value"].to_numpy())
+        assert numpy.shares_memory(view, table.column("value").chunk(0).to_numpy(zero_copy_only=True))
+        assert table.schema.field("value").type == pyarrow.int64()
+
+    def test_export_movies_and_tags(self):
+        """Проверяет выгрузку Movies и Tags"""
+        pytest.importorskip("pandas")
+        pytest.importorskip("pyarrow")
+        movies = Movies("./ml_latest_small/movies.csv")
+        frame = movies.to_frame()
+        assert frame.shape == (len(movies.movies), 3)
+        assert frame["title"].iloc[0] == movies.movies[0]["title"]
+        table = Tags("./ml_latest_small/tags.csv").to_frame("arrow")
+        assert table.column_names == ["tag"] and table.num_rows == 1000
+
+    def test_export_result(self):
+        """Проверяет длинный формат для вложенных словарей и кортежей"""
+        pytest.importorskip("pandas")
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        genres = ratings.Genres(ratings)
+        frame = genres.to_frame(by_year=True)
+        assert list(frame.columns) == ["genre", "year", "count", "average", "median", "variance"]
+        assert frame["count"].sum() == sum(values[0] for values in genres.stats().values())
+        frame = Export.result(ratings.inner_movies.dist_by_rating())
+        assert list(frame.columns) == ["key", "value"] and frame["value"].sum() == 1000
+        with pytest.raises(Exception):
+            Export.result({1: 2}, names=("a", "b", "c"))
+        with pytest.raises(Exception):
+            Export.table({"value": [1]}, "polars")
+
+################ RECORDS ################
+
+    def test_record_dict_compatibility(self):
+        """Проверяет, что строка Record читается как словарь и не хранит __dict__"""
+        movie = Movie(1, "Toy Story (1995)", "Adventure|Animation")
+        assert movie["title"] == movie.title == "Toy Story (1995)"
+        assert movie.get("year") is None and "genres" in movie and len(movie) == 3
+        assert movie.keys() == ["movieId", "title", "genres"]
+        assert movie == {"title": "Toy Story (1995)", "movieId": 1, "genres": "Adventure|Animation"}
+        assert dict(movie) == movie.to_dict()
+        assert not hasattr(movie, "__dict__")
+        with pytest.raises(KeyError):
+            movie["keys"]
+
+    def test_record_table(self):
+        """Проверяет индекс, срез, итерацию и столбцы RecordTable"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        table = ratings.records(5000)
+        assert len(table) == 5000
+        assert table[0] == ratings.ratings[0] and type(table[0]) == Rating
+        assert list(table[:1000]) == ratings.ratings
+        assert table[:1000] == ratings.ratings
+        assert table.column("rating").typecode == "d"
+        assert [rating.movieId for rating in table[10:20]] == [rating["movieId"] for rating in ratings.ratings[10:20]]
+
+    def test_records_results_match(self):
+        """Проверяет, что методы возвращают то же, что и со списками словарей"""
+        reference = Ratings("./ml_latest_small/ratings.csv")
+        ratings = Ratings("./ml_latest_small/ratings.csv", records=True)
+        assert type(ratings.ratings) == RecordTable and type(ratings.movies) == RecordTable
+        assert ratings.inner_movies.top_by_ratings(10) == reference.inner_movies.top_by_ratings(10)
+        assert ratings.Users(ratings).top_controversial_users(5) == reference.Users(reference).top_controversial_users(5)
+        assert ratings.outer_movies.most_genres_by_years() == reference.outer_movies.most_genres_by_years()
+        tags = Tags("./ml_latest_small/tags.csv", records=True)
+        assert tags.tags == Tags("./ml_latest_small/tags.csv").tags
+        assert tags.records[0].tag == tags.tags[0] and type(tags.records[0].userId) == int
+
+    def test_records_numpy_columns(self):
+        """Проверяет, что движок numpy берет столбцы RecordTable без копирования"""
+        numpy = pytest.importorskip("numpy")
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend="numpy", records=True)
+        column = ratings.backend.column(ratings.ratings, "rating")
+        assert numpy.shares_memory(column, numpy.frombuffer(ratings.ratings.column("rating"), dtype="float64"))
+        dataset = MovieLensDataset("./ml_latest_small", records=True)
+        assert type(dataset.get_ratings().ratings) == RecordTable
+        assert dataset.get_ratings().movies is dataset.get_movies().movies
+
+    def test_records_append_after_views(self):
+        """Проверяет, что append работает, когда на столбцы уже смотрят numpy и Arrow,
+        а старые представления остаются снимком прежних строк"""
+        pytest.importorskip("numpy")
+        pytest.importorskip("pyarrow")
+        ratings = Ratings("./ml_latest_small/ratings.csv", backend="numpy", records=True)
+        users = ratings.Users(ratings)
+        users.top_controversial_users(2)
+        table = ratings.to_frame("arrow")
+        ratings.ratings.append({"userId": 3, "movieId": 1, "rating": 0.5, "timestamp": 0})
+        ratings.ratings.append(Rating(3, 2, 5.0, 0))
+        assert len(ratings.ratings) == 1002 and table.num_rows == 1000
+        assert ratings.ratings[-1] == {"userId": 3, "movieId": 2, "rating": 5.0, "timestamp": 0}
+        reference = Ratings("./ml_latest_small/ratings.csv")
+        reference.ratings += [{"userId": 3, "movieId": 1, "rating": 0.5, "timestamp": 0}, {"userId": 3, "movieId": 2, "rating": 5.0, "timestamp": 0}]
+        assert users.top_controversial_users(2) == reference.Users(reference).top_controversial_users(2)
+
+################ MOVIEMETADATA() ################
+
+    @pytest.fixture
+    def metadata_files(self, tmp_path):
+        """Маленькие выгрузки IMDb (title.basics сжат gzip) и TMDB для первых фильмов links.csv"""
+        import gzip
+
+        with gzip.open(tmp_path / "title.basics.tsv.gz", "wt", encoding="utf-8") as file:
+            file.write("tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\truntimeMinutes\tgenres\n")
+            file.write("tt0114709\tmovie\tToy Story\tToy Story\t0\t1995\t\\N\t81\tAnimation\n")
+            file.write("tt0113497\tmovie\tJumanji\tJumanji\t0\t1995\t\\N\t104\tAdventure\n")
+            file.write("tt0113228\tmovie\tGrumpier Old Men\tGrumpier Old Men\t0\t1995\t\\N\t101\tComedy\n")
+            file.write("tt0114885\tmovie\tWaiting to Exhale\tWaiting to Exhale\t0\t1995\t\\N\t\\N\tDrama\n")
+            file.write("tt9999999\tmovie\tNot In Links\tNot In Links\t0\t2020\t\\N\t90\tDrama\n")
+        (tmp_path / "title.crew.tsv").write_text(
+            "tconst\tdirectors\twriters\n"
+            "tt0114709\tnm0005124\tnm0004056\n"
+            "tt0113497\tnm0002653,nm0000001\t\\N\n"
+            "tt0113228\tnm0222043\t\\N\n",
+            encoding="utf-8",
+        )
+        (tmp_path / "name.basics.tsv").write_text(
+            "nconst\tprimaryName\tbirthYear\n"
+            "nm0005124\tJohn Lasseter\t1957\n"
+            "nm0002653\tJoe Johnston\t1950\n"
+            "nm0222043\tHoward Deutch\t1950\n",
+            encoding="utf-8",
+        )
+        tmdb = [
+            {"id": 862, "imdb_id": "tt0114709", "title": "Toy Story", "budget": 30000000, "revenue": 373554033, "runtime": 81},
+            {"id": 8844, "imdb_id": "tt0113497", "title": "Jumanji", "budget": 65000000, "revenue": 262797249, "runtime": 104},
+            {"id": 31357, "imdb_id": "tt0114885", "title": "Waiting to Exhale", "budget": 16000000, "revenue": 81452156,
+             "runtime": 127, "credits": {"crew": [{"job": "Producer", "name": "Ezra Swerdlow"}, {"job": "Director", "name": "Forest Whitaker"}]}},
+        ]
+        (tmp_path / "tmdb.jsonl").write_text("".join(json.dumps(movie) + "\n" for movie in tmdb), encoding="utf-8")
+        (tmp_path / "tmdb.json").write_text(json.dumps(tmdb), encoding="utf-8")
+        return tmp_path
+
+    def test_metadata_links(self, metadata_files, monkeypatch):
+        """Проверяет, что Links с локальными метаданными читает все строки links.csv и не обращается к IMDb"""
+        monkeypatch.setattr(Links, "parse_imdb", lambda self, movie: pytest.fail("network access"))
+        metadata = MovieMetadata.from_links("./ml_latest_small/links.csv").read_imdb(
+            str(metadata_files / "title.basics.tsv.gz"), str(metadata_files / "title.crew.tsv"), str(metadata_files / "name.basics.tsv")
+        ).read_tmdb(str(metadata_files / "tmdb.jsonl"))
+        assert 9999999 not in metadata.imdb
+        links = Links("./ml_latest_small/links.csv", metadata=metadata)
+        assert len(links.movie_list) == 9742
+        assert links.imdb == [
+            ["0114885", "Waiting to Exhale", "Forest Whitaker", 16000000, 81452156, 127],
+            ["0114709", "Toy Story", "John Lasseter", 30000000, 373554033, 81],
+            ["0113497", "Jumanji", "Joe Johnston", 65000000, 262797249, 104],
+            ["0113228", "Grumpier Old Men", "Howard Deutch", 0, 0, 101],
+        ]
+        assert links.most_expensive(2) == {"Jumanji": 65000000, "Toy Story": 30000000}
+        assert links.most_profitable(1) == {"Toy Story": 343554033}
+        assert links.longest(1) == {"Waiting to Exhale": 127}
+        assert links.top_cost_per_minute(1) == {"Jumanji": 625000.0}
+        assert links.top_directors(1) == {"Forest Whitaker": 1}
+
+    def test_metadata_json_array_stream(self):
+        """Проверяет, что JSON-массив разбирается по элементам при любой границе кусков чтения"""
+        items = [
+            {"id": 862, "title": "Toy Story, [1995]", "credits": {"crew": [{"job": "Director", "name": 'John \"L\"'}]}},
+            12345,
+            [1, [2, 3]],
+            "]",
+            {"id": 8844, "overview": "x" * 300},
+        ]
+        text = json.dumps(items, indent=1)
+        for size in (1, 2, 3, 7, 64, 1 << 16):
+            file = io.StringIO(text)
+            assert file.read(1) == "["
+            assert list(MovieMetadata.iter_json_array(file, size)) == items
+        assert list(MovieMetadata.iter_json_array(io.StringIO(" ]"), 1)) == []
+        with pytest.raises(Exception):
+            list(MovieMetadata.iter_json_array(io.StringIO('{"id": 1}, {"id"'), 4))
+
+    def test_metadata_tmdb_array(self, metadata_files):
+        """Проверяет, что выгрузка TMDB одним JSON-массивом читается так же, как JSON Lines"""
+        lines = MovieMetadata().read_tmdb(str(metadata_files / "tmdb.jsonl"))
+        array = MovieMetadata().read_tmdb(str(metadata_files / "tmdb.json"))
+        assert lines.tmdb == array.tmdb and len(array.tmdb) == 3
+        assert array.row(["1", "0114709", "862"]) == ["0114709", "Toy Story", "N/A", 30000000, 373554033, 81]
+        assert array.row(["2", "0000001", ""]) is None
+
+################ LINKSCRAWLER() ################
+
+    @staticmethod
+    def fake_imdb(movie):
+        return [movie[1], f"Movie {movie[0]}", f"Director {int(movie[0]) % 3}", int(movie[0]) * 1000, int(movie[0]) * 3000, 90]
+
+    def test_crawler_order(self, tmp_path):
+        """Проверяет, что фильмы обходятся по убыванию числа оценок"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        crawler = LinksCrawler("./ml_latest_small/links.csv", ratings, str(tmp_path / "crawl.jsonl"), fetch=self.fake_imdb)
+        queue = crawler.schedule()
+        assert len(queue) == 9742
+        assert [movie[0] for movie in queue[:3]] == ["356", "318", "296"]
+        crawler.run(limit=5)
+        assert crawler.progress() == {"total": 9742, "done": 5, "failed": 0, "pending": 9737}
+        assert crawler.links().most_expensive(1) == {"Movie 2571": 2571000}
+
+    def test_crawler_resume(self, tmp_path):
+        """Проверяет, что после падения обход продолжается с первого незагруженного фильма"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        path = str(tmp_path / "crawl.jsonl")
+        calls = []
+
+        def crash(movie):
+            if len(calls) == 7:
+                raise KeyboardInterrupt
+            calls.append(movie[1])
+            return None if movie[0] == "318" else self.fake_imdb(movie)
+
+        crawler = LinksCrawler("./ml_latest_small/links.csv", ratings, path, fetch=crash)
+        with pytest.raises(KeyboardInterrupt):
+            crawler.run(limit=20)
+        with open(path, "a", encoding="utf-8") as file:
+            file.write('{"imdbId": "01')
+
+        resumed_calls = []
+        resumed = LinksCrawler("./ml_latest_small/links.csv", ratings, path, fetch=lambda movie: resumed_calls.append(movie[1]) or self.fake_imdb(movie))
+        assert len(resumed.done) == 7 and len(resumed.results()) == 6
+        resumed.run(limit=13)
+        order = [movie[1] for movie in resumed.schedule()[:20]]
+        assert calls + resumed_calls == order
+        assert len(LinksCrawler("./ml_latest_small/links.csv", ratings, path, fetch=crash).done) == 20
+
+    def test_crawler_failed_and_background(self, tmp_path):
+        """Проверяет запись ошибок, их повтор и частичные результаты фонового обхода"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        path = str(tmp_path / "crawl.jsonl")
+
+        def flaky(movie):
+            if movie[0] == "296":
+                raise Exception("503")
+            return self.fake_imdb(movie)
+
+        crawler = LinksCrawler("./ml_latest_small/links.csv", ratings, path, fetch=flaky).run(limit=3)
+        assert crawler.progress()["failed"] == 1
+        assert [movie[0] for movie in crawler.pending()[:1]] == ["593"]
+        crawler.fetch = self.fake_imdb
+        crawler.run(limit=1, retry_failed=True)
+        assert crawler.progress()["failed"] == 0 and "0110912" in crawler.done
+
+        crawler.start(limit=50).stop(timeout=10)
+        assert not crawler.thread.is_alive()
+        assert 4 <= len(LinksCrawler("./ml_latest_small/links.csv", ratings, path, fetch=flaky).done) <= 54
+
+    def test_crawler_start_twice(self, tmp_path):
+        """Проверяет, что повторный start во время фонового обхода не запускает второй поток"""
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        release = threading.Event()
+        calls = []
+
+        def blocking(movie):
+            calls.append(movie[1])
+            release.wait(10)
+            return self.fake_imdb(movie)
+
+        crawler = LinksCrawler("./ml_latest_small/links.csv", ratings, str(tmp_path / "crawl.jsonl"), fetch=blocking)
+        crawler.start(limit=3)
+        thread = crawler.thread
+        starters = [threading.Thread(target=crawler.start, args=(3,)) for _ in range(4)]
+        for starter in starters:
+            starter.start()
+        for starter in starters:
+            starter.join()
+        assert crawler.thread is thread and crawler.running()
+        release.set()
+        thread.join(10)
+        assert not crawler.running()
+        assert len(calls) == len(set(calls)) == 3
+        crawler.start(limit=2).thread.join(10)
+        assert crawler.thread is not thread and crawler.progress()["done"] == 5
+
+################ DATABASE() ################
+
+    @pytest.fixture
+    def head_dataset(self, tmp_path):
+        """Первые 1000 строк каждого файла - ровно то, что читают классы анализа"""
+        directory = tmp_path / "head"
+        directory.mkdir()
+        for name in ("movies", "ratings", "tags", "links"):
+            with open(f"./ml_latest_small/{name}.csv", encoding="utf-8") as source:
+                (directory / f"{name}.csv").write_text("".join(itertools.islice(source, 1001)), encoding="utf-8")
+        return str(directory)
+
+    def test_database_movies(self, head_dataset):
+        """Проверяет, что запросы Database.Movies дают те же результаты в том же порядке, что и Movies"""
+        database = Database().load(head_dataset)
+        movies = Movies(os.path.join(head_dataset, "movies.csv"))
+        queries = database.Movies(database)
+        assert list(queries.dist_by_release().items()) == list(movies.dist_by_release().items())
+        assert list(queries.dist_by_genres().items()) == list(movies.dist_by_genres().items())
+        assert list(queries.most_genres(20).items()) == list(movies.most_genres(20).items())
+        assert list(queries.most_genres_by_years().items()) == list(movies.most_genres_by_years().items())
+
+    def test_database_ratings(self, head_dataset):
+        """Проверяет, что запросы Database.Ratings дают те же результаты, что и Ratings.Movies и Ratings.Users"""
+        database = Database().load(head_dataset)
+        ratings = Ratings(os.path.join(head_dataset, "ratings.csv"))
+        queries = database.Ratings(database)
+        users, query_users = ratings.Users(ratings), queries.Users(queries)
+        assert queries.inner_movies.dist_by_year() == ratings.inner_movies.dist_by_year()
+        assert queries.inner_movies.dist_by_rating() == ratings.inner_movies.dist_by_rating()
+        assert list(queries.inner_movies.top_by_num_of_ratings(20).items()) == list(ratings.inner_movies.top_by_num_of_ratings(20).items())
+        assert list(queries.inner_movies.top_by_ratings(20).items()) == list(ratings.inner_movies.top_by_ratings(20).items())
+        assert list(queries.inner_movies.top_by_ratings(20, "mean").items()) == list(ratings.inner_movies.top_by_ratings(20, "mean").items())
+        assert list(queries.inner_movies.top_controversial(20).items()) == list(ratings.inner_movies.top_controversial(20).items())
+        assert list(query_users.dist_users_by_num_of_ratings().items()) == list(users.dist_users_by_num_of_ratings().items())
+        assert list(query_users.dist_users_by_rating("mean").items()) == list(users.dist_users_by_rating("mean").items())
+        assert list(query_users.top_controversial_users(5).items()) == list(users.top_controversial_users(5).items())
+        with pytest.raises(Exception):
+            queries.inner_movies.top_by_ratings(20, "max")
+
+    def test_database_tags(self, head_dataset):
+        """Проверяет запросы Database.Tags"""
+        database = Database().load(head_dataset)
+        tags = Tags(os.path.join(head_dataset, "tags.csv"))
+        queries = database.Tags(database)
+        assert list(queries.most_popular(10).items()) == list(tags.most_popular(10).items())
+        assert queries.tags_with("Comedy") == tags.tags_with("Comedy")
+        assert sorted(map(len, queries.longest(10))) == sorted(map(len, tags.longest(10)))
+        assert sorted(queries.most_words(5).values()) == sorted(tags.most_words(5).values())
+
+    def test_database_links(self):
+        """Проверяет, что запросы Database.Links по сохраненным данным IMDb совпадают с Links"""
+        imdb = [
+            ["0114709", "Toy Story", "John Lasseter", 30000000, 394436586, 81],
+            ["0113497", "Jumanji", "Joe Johnston", 65000000, 262821940, 104],
+            ["0113228", "Grumpier Old Men", "Howard Deutch", 25000000, 71500000, 101],
+            ["0114885", "Waiting to Exhale", "Forest Whitaker", 16000000, 81452156, 124],
+            ["0113041", "Father of the Bride Part II", "Charles Shyer", 30000000, 76594107, 106],
+        ]
+        links = Links("./ml_latest_small/links.csv", [])
+        links.imdb = sorted(imdb, key=lambda movie: int(movie[0]), reverse=True)
+        database = Database()
+        queries = database.Links(database)
+        queries.store(imdb)
+        assert queries.get_imdb() == links.imdb
+        for name in ("top_directors", "most_expensive", "most_profitable", "longest", "top_cost_per_minute"):
+            assert list(getattr(queries, name)(3).items()) == list(getattr(links, name)(3).items())
+
+    def test_database_filter(self):
+        """Проверяет фильтры по времени и пользователю и то, что запросы используют индексы"""
+        database = Database().load("./ml_latest_small")
+        start, end = 1000000000, 1100000000
+        rows = [rating for rating in Ratings("./ml_latest_small/ratings.csv").iter_ratings() if start <= rating["timestamp"] < end]
+        queries = database.Ratings(database, start=start, end=end)
+        assert sum(queries.inner_movies.dist_by_rating().values()) == len(rows)
+        assert queries.Users(queries).dist_users_by_num_of_ratings() == dict(
+            sorted(Counter(rating["userId"] for rating in rows).items(), key=lambda item: (-item[1], item[0]))
+        )
+        user = database.Ratings(database, user_id=414)
+        assert sum(user.inner_movies.dist_by_rating().values()) == 2698
+        plan = " ".join(row[-1] for row in database.query("EXPLAIN QUERY PLAN SELECT COUNT(*) FROM ratings WHERE timestamp >= ?", (start,)))
+        assert "ratings_timestamp" in plan
+
+    def test_database_persistent(self, tmp_path):
+        """Проверяет, что база на диске открывается в новой сессии без повторной загрузки"""
+        path = str(tmp_path / "movielens.sqlite")
+        database = Database(path).load("./ml_latest_small")
+        assert database.count("ratings") == 100836
+        database.close()
+        reopened = Database(path)
+        assert reopened.is_loaded()
+        reopened.load_ratings = None
+        reopened.load("./ml_latest_small")
+        assert reopened.count("movies") == 9742
+        assert reopened.Ratings(reopened).inner_movies.top_by_num_of_ratings(1) == {"Forrest Gump (1994)": 329}
+
+################ MOVIELENSDATASET() ################
+
+    def test_dataset_shares_tables(self):
+        """Проверяет, что таблицы загружаются один раз и передаются без копирования"""
+        dataset = MovieLensDataset("./ml_latest_small")
+        movies = dataset.get_movies()
+        ratings = dataset.get_ratings()
+        assert dataset.get_movies() is movies
+        assert dataset.get_ratings() is ratings
+        assert ratings.movies is movies.movies
+        assert ratings.outer_movies.movies is movies.movies
+        assert dataset.get_tags() is dataset.get_tags()
+
+    def test_dataset_same_results(self):
+        """Проверяет, что результаты через датасет совпадают с результатами отдельных классов"""
+        dataset = MovieLensDataset("./ml_latest_small")
+        ratings = Ratings("./ml_latest_small/ratings.csv")
+        tags = Tags("./ml_latest_small/tags.csv")
+        assert dataset.get_ratings().ratings == ratings.ratings
+        assert dataset.get_ratings().inner_movies.top_by_ratings(10) == ratings.inner_movies.top_by_ratings(10)
+        assert dataset.get_movies().dist_by_genres() == Movies("./ml_latest_small/movies.csv").dist_by_genres()
+        assert dataset.get_tags().tags == tags.tags
+
+    def test_dataset_reads_each_file_once(self):
+        """Проверяет по профилировщику, что movies.csv читается один раз, а заголовок - в том же чтении"""
+        Profiler.reset()
+        Profiler.enable()
+        try:
+            dataset = MovieLensDataset("./ml_latest_small")
+            dataset.get_ratings()
+            dataset.get_movies()
+        finally:
+            Profiler.disable()
+        report = Profiler.report()
+        assert report["methods"]["Movies.get_first_1000_values"]["calls"] == 1
+        assert report["methods"]["Ratings.get_first_1000_values"]["calls"] == 1
+        assert report["caches"]["MovieLensDataset.movies"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        Profiler.reset()
+
+################ DATASOURCE ################
+
+    @pytest.fixture
+    def zip_dataset(self, tmp_path):
+        import zipfile
+
+        path = str(tmp_path / "ml-latest-small.zip")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in ("movies", "ratings", "tags", "links"):
+                archive.write(f"./ml_latest_small/{name}.csv", f"ml-latest-small/{name}.csv")
+        return path
+
+    def test_source_zip(self, zip_dataset):
+        """Проверяет чтение всех таблиц прямо из zip-архива"""
+        dataset = MovieLensDataset(zip_dataset)
+        assert dataset.path("ratings") == zip_dataset + "/ml-latest-small/ratings.csv"
+        ratings = dataset.get_ratings()
+        csv = Ratings("./ml_latest_small/ratings.csv")
+        assert ratings.ratings == csv.ratings
+        assert ratings.movies == csv.movies
+        assert list(ratings.iter_ratings()) == list(csv.iter_ratings())
+        assert dataset.get_tags().tags == Tags("./ml_latest_small/tags.csv").tags
+        assert Ratings(zip_dataset + "/ml-latest-small/ratings.csv").movies_filepath == zip_dataset + "/ml-latest-small/movies.csv"
+        assert DataSource.size(dataset.path("ratings")) == os.path.getsize("./ml_latest_small/ratings.csv")
+
+    def test_source_gzip(self, tmp_path):
+        """Проверяет чтение csv, сжатых gzip, и поиск movies.csv.gz рядом с ratings.csv.gz"""
+        import gzip
+
+        for name in ("movies", "ratings"):
+            with open(f"./ml_latest_small/{name}.csv", "rb") as source, gzip.open(tmp_path / f"{name}.csv.gz", "wb") as target:
+                target.write(source.read())
+        ratings = MovieLensDataset(str(tmp_path)).get_ratings()
+        assert ratings.filepath.endswith("ratings.csv.gz")
+        assert ratings.movies_filepath.endswith("movies.csv.gz")
+        csv = Ratings("./ml_latest_small/ratings.csv")
+        assert ratings.External(ratings).stats() == csv.External(csv).stats()
+        with pytest.raises(Exception):
+            ratings.UserOffsets(ratings).build()
+
+    def test_source_plain(self):
+        """Проверяет, что обычные пути не считаются сжатыми"""
+        assert DataSource.split("./ml_latest_small/ratings.csv") == ("./ml_latest_small/ratings.csv", None)
+        assert not DataSource.is_compressed("./ml_latest_small/ratings.csv")
+        assert DataSource.exists("./ml_latest_small/ratings.csv")
+        assert not DataSource.exists("./ml_latest_small/ratings.csv.gz")
+
+################ QUERYSERVICE() ################
+
+    @staticmethod
+    async def http_get(port, targets):
+        """Отправляет запросы по одному keep-alive соединению и возвращает список (код, JSON)"""
+        import asyncio
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        for target in targets:
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                if line.lower().startswith(b"content-length"):
+                    length = int(line.split(b":")[1])
+            responses.append((status, json.loads(await reader.readexactly(length))))
+        writer.close()
+        return responses
+
+    def test_service_results(self):
+        """Проверяет, что ответы сервиса совпадают с результатами методов и ошибки возвращаются кодами"""
+        import asyncio
+
+        dataset = MovieLensDataset("./ml_latest_small")
+        service = QueryService(dataset, port=0)
+
+        async def scenario():
+            server = await service.start()
+            async with server:
+                return await self.http_get(service.port, [
+                    "/movies/dist_by_genres",
+                    "/ratings/top_by_ratings?n=5&metric=mean",
+                    "/tags/tags_with?word=Comedy",
+                    "/users/top_controversial_users?n=3",
+                    "/ratings/top_by_ratings?n=5&metric=max",
+                    "/ratings/top_by_ratings?n=five",
+                    "/ratings/__init__",
+                    "/stats",
+                ])
+
+        responses = asyncio.run(scenario())
+        ratings = dataset.get_ratings()
+        assert responses[0] == (200, dataset.get_movies().dist_by_genres())
+        assert responses[1] == (200, ratings.inner_movies.top_by_ratings(5, "mean"))
+        assert responses[2] == (200, dataset.get_tags().tags_with("Comedy"))
+        assert responses[3] == (200, {str(user): value for user, value in ratings.Users(ratings).top_controversial_users(3).items()})
+        assert [status for status, _ in responses[4:7]] == [400, 400, 404]
+        assert responses[7][1]["requests"] == 8
+
+    def test_service_coalescing(self):
+        """Проверяет, что одинаковые одновременные запросы вычисляются один раз, а повторные берутся из кэша"""
+        import asyncio
+
+        service = QueryService(MovieLensDataset("./ml_latest_small"), port=0)
+
+        async def scenario():
+            server = await service.start()
+            async with server:
+                first = await asyncio.gather(*(self.http_get(service.port, ["/ratings/top_controversial?n=10"]) for _ in range(10)))
+                second = await self.http_get(service.port, ["/ratings/top_controversial?n=10"])
+                return first, second
+
+        first, second = asyncio.run(scenario())
+        assert all(response == first[0] for response in first) and second == first[0]
+        assert service.counters["computed"] == 1
+        assert service.counters["coalesced"] + service.counters["cache_hits"] == 10
+        assert service.counters["coalesced"] >= 1
+
+    def test_service_localhost_only(self):
+        """Проверяет, что сервис нельзя открыть на внешнем адресе"""
+        with pytest.raises(Exception):
+            QueryService(MovieLensDataset("./ml_latest_small"), host="0.0.0.0")
+
+################ IMPORT ################
+
+    def test_import_cold_start(self):
+        """Проверяет, что импорт модуля для статистики не загружает requests, bs4 и pytest.
+        Время и память импорта замеряет benchmark.py (import_cold_start), а не модульные тесты"""
+        code = "import json, sys\nimport movielens_analysis\nprint(json.dumps(list(sys.modules)))\n"
+        directory = os.path.dirname(os.path.abspath(movielens_analysis.__file__))
+        output = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True).stdout
+        assert not {"requests", "bs4", "pytest"} & set(json.loads(output))
+
+################ TAGS() ################
+
+    def test_most_words_return_type(self, tags_obj):
+        result = tags_obj.most_words(5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+
+    def test_most_words_dict_element_type(self, tags_obj):
+        result = tags_obj.most_words(5)
+        for tag, count in result.items():
+            assert isinstance(tag, str), f"Tag {tag} is not a string"
+            assert isinstance(count, int), f"Value {count} is not an integer"
+        
+    def test_most_words_sort(self, tags_obj):
+        result = tags_obj.most_words(5)
+        counts = list(result.values())
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_tags_longest_return_type(self, tags_obj):
+        result = tags_obj.longest(5)
+        assert isinstance(result, list), "Returned value is not a list"
+
+    def test_tags_longest_list_element_type(self, tags_obj):
+        result = tags_obj.longest(5)
+        for tag in result:
+            assert isinstance(tag, str), f"Tag {tag} is not a string"
+
+    def test_tags_longest_sort(self, tags_obj):
+        result = tags_obj.longest(5)
+        counts = [len(tag) for tag in result]
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_most_words_and_longest_return_type(self, tags_obj):
+        result = tags_obj.most_words_and_longest(5)
+        assert isinstance(result, list), "Returned value is not a list"
+
+    def test_most_words_and_longest_list_element_type(self, tags_obj):
+        result = tags_obj.most_words_and_longest(5)
+        for tag in result:
+            assert isinstance(tag, str), f"Tag {tag} is not a string"
+
+    def test_most_popular_return_type(self, tags_obj):
+        result = tags_obj.most_popular(5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+
+    def test_most_popular_dict_element_type(self, tags_obj):
+        result = tags_obj.most_popular(5)
+        for tag, count in result.items():
+            assert isinstance(tag, str), f"Tag {tag} is not a string"
+            assert isinstance(count, int), f"Value {count} is not an integer"
+
+    def test_most_popular_sort(self, tags_obj):
+        result = tags_obj.most_popular(5)
+        counts = list(result.values())
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_tags_with_return_type(self, tags_obj):
+        result = tags_obj.tags_with('comedy')
+        assert isinstance(result, list), "Returned value is not a list"
+
+    def test_tags_with_list_element_type(self, tags_obj):
+        result = tags_obj.tags_with('comedy')
+        for tag in result:
+            assert isinstance(tag, str), f"Tag {tag} is not a string"
+
+    def test_tags_with_sort(self, tags_obj):
+        result = tags_obj.tags_with('comedy')
+        assert result == sorted(result), "The data is not sorted correctly"
+
+################ LINKS() ################
+
+    def test_get_imdb_return_type(self, links_obj):
+        result = links_obj.get_imdb()
+        assert isinstance(result, list), "Returned value is not a list"
+
+    def test_get_imdb_list_elements_type(self, links_obj):
+        result = links_obj.get_imdb()
+        for movie in result:
+            assert isinstance(movie, list), f"Value {movie} is not a list"
+            assert isinstance(movie[0], str), f"movieId {movie[0]} is not a string"
+            assert isinstance(movie[1], str), f"Title {movie[1]} is not a string"
+            assert isinstance(movie[2], str), f"Director {movie[2]} is not a string"
+            assert isinstance(movie[3], int), f"Budget {movie[3]} is not an integer"
+            assert isinstance(movie[4], int), f"CWG {movie[4]} is not an integer"
+            assert isinstance(movie[5], int), f"Minutes {movie[5]} is not an integer"
+
+    def test_get_imdb_sort(self, links_obj):
+        result = links_obj.get_imdb()
+        counts = [movie[0] for movie in result]
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_top_directors_return_type(self, links_obj):
+        result = links_obj.top_directors(5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+
+    def test_top_directors_dict_elements_type(self, links_obj):
+        result = links_obj.top_directors(5)
+        for director, count in result.items():
+            assert isinstance(director, str), f"Director {director} is not a string"
+            assert isinstance(count, int), f"value {count} is not an integer"
+
+    def test_top_directors_sort(self, links_obj):
+        result = links_obj.top_directors(5)
+        counts = list(result.values())
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_most_expensive_return_type(self, links_obj):
+        result = links_obj.most_expensive(5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+
+    def test_most_expensive_dict_element_type(self, links_obj):
+        result = links_obj.most_expensive(5)
+        for movie, budget in result.items():
+            assert isinstance(movie, str), f"Title {movie} is not a string"
+            assert isinstance(budget, int), f"Value {budget} is not an integer"
+
+    def test_most_expensive_sort(self, links_obj):
+        result = links_obj.most_expensive(5)
+        counts = list(result.values())
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_most_profitable_return_type(self, links_obj):
+        result = links_obj.most_profitable(5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+
+    def test_most_profitable_dict_element_type(self, links_obj):
+        result = links_obj.most_profitable(5)
+        for movie, profit in result.items():
+            assert isinstance(movie, str), f"Title {movie} is not a string"
+            assert isinstance(profit, int), f"Value {profit} is not an integer"
+
+    def test_most_profitable_sort(self, links_obj):
+        result = links_obj.most_profitable(5)
+        counts = list(result.values())
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_links_longest_return_type(self, links_obj):
+        result = links_obj.longest(5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+
+    def test_links_longest_dict_element_type(self, links_obj):
+        result = links_obj.longest(5)
+        for movie, minutes in result.items():
+            assert isinstance(movie, str), f"Title {movie} is not a string"
+            assert isinstance(minutes, int), f"Value {minutes} is not an integer"
+
+    def test_links_longest_sort(self, links_obj):
+        result = links_obj.longest(5)
+        counts = list(result.values())
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"
+
+    def test_top_cost_per_minute_return_type(self, links_obj):
+        result = links_obj.top_cost_per_minute(5)
+        assert isinstance(result, dict), "Returned value is not a dictionary"
+
+    def test_top_cost_per_minute_dict_element_type(self, links_obj):
+        result = links_obj.top_cost_per_minute(5)
+        for movie, cost in result.items():
+            assert isinstance(movie, str), f"Title {movie} is not a string"
+            assert isinstance(cost, float), f"Value {cost} is not a float"
+
+    def test_top_cost_per_minute_sort(self, links_obj):
+        result = links_obj.top_cost_per_minute(5)
+        counts = list(result.values())
+        assert counts == sorted(counts, reverse=True), "The data is not sorted correctly"